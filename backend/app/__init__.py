@@ -1,9 +1,23 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_migrate import Migrate
 from flask_cors import CORS
 from .celery_worker import celery
 from .config import Config
 from .database import db
+from .common.pagination import PaginationError
+from .common.projection import ProjectionError
+from .common.matrix import MatrixError
+from .common.scores import ScoreFileError
+from .common.user_cache import user_cache
+from .common.revocation import revocation_list
+from .common.token_cache import token_cache
+from .common.password_hasher import password_hasher, HasherBusyError
+from .common.program_cache import program_cache
+from .common.process_pool import process_pool
+from .common.versioning import init_versioning
+from .common.json_provider import JSONProvider
+from .common.serializers import serializers
+from .services.simulation import SimulationError
 from .auth.views import auth_bp
 from .user.views import user_bp
 from .program.views import program_bp
@@ -17,6 +31,8 @@ from .tag.views import tag_bp
 from .material.views import material_bp
 from .comment.views import comment_bp
 from .notification.views import notification_bp
+from .trace.views import trace_bp
+from .assessment.views import assessment_bp
 from flasgger import Swagger
 
 migrate = Migrate()
@@ -28,6 +44,7 @@ def create_app(config_object=Config):
 
     # Load app configuration
     app.config.from_object(config_object)
+    app.json = JSONProvider(app)
 
     # Initialize Celery
     celery.conf.update(app.config)
@@ -46,6 +63,34 @@ def create_app(config_object=Config):
     app.register_blueprint(material_bp)
     app.register_blueprint(comment_bp)
     app.register_blueprint(notification_bp)
+    app.register_blueprint(trace_bp)
+    app.register_blueprint(assessment_bp)
+
+    # Invalid limit/cursor/order_by/fields arguments on list endpoints
+    @app.errorhandler(PaginationError)
+    @app.errorhandler(ProjectionError)
+    def handle_query_argument_error(e):
+        return jsonify(message=str(e)), 400
+
+    # Weight matrix uploads that cannot be parsed or name unknown rows/columns
+    @app.errorhandler(MatrixError)
+    def handle_matrix_error(e):
+        return jsonify(message=str(e)), 400
+
+    # Score uploads that are not a readable CSV with the expected columns
+    @app.errorhandler(ScoreFileError)
+    def handle_score_file_error(e):
+        return jsonify(message=str(e)), 400
+
+    # What-if scenarios naming unknown rows or invalid weights
+    @app.errorhandler(SimulationError)
+    def handle_simulation_error(e):
+        return jsonify(message=str(e)), 400
+
+    # Login/registration bursts beyond the bcrypt queue limit
+    @app.errorhandler(HasherBusyError)
+    def handle_hasher_busy(e):
+        return jsonify(message=str(e)), 503, {'Retry-After': '1'}
 
     # Initialize Swagger
     swagger = Swagger(app)
@@ -53,5 +98,15 @@ def create_app(config_object=Config):
     # Initialize Database and Migrations
     db.init_app(app)
     migrate.init_app(app, db)
+    init_versioning()
+    serializers.init_app(app)
+
+    # Initialize per-process auth caches and the password hashing pool
+    user_cache.init_app(app)
+    revocation_list.init_app(app)
+    token_cache.init_app(app)
+    password_hasher.init_app(app)
+    program_cache.init_app(app)
+    process_pool.init_app(app)
 
     return app
@@ -0,0 +1,168 @@
+from flask import Blueprint, request, jsonify, current_app
+from app.models.models import Program
+from flasgger import swag_from
+from app.common.decorators import token_required, role_required
+from app.common.versioning import versioned
+from app.common.program_cache import program_cache, program_version
+from app.common.scores import read_score_lines, SCORE_FILE_PARAMETERS, SCORE_REPORT_SCHEMA
+from app.services.services import import_scores
+from app.services.attainment import (program_attainment, programs_attainment,
+                                     missing_programs, ATTAINMENT_TABLES)
+
+assessment_bp = Blueprint('assessment', __name__, url_prefix='/programs')
+
+
+PROGRAM_ID_PARAMETER = {
+    'name': 'program_id',
+    'in': 'path',
+    'type': 'integer',
+    'required': True,
+    'description': 'The ID of the program'
+}
+
+LEVELS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'observations': {'type': 'array', 'items': {'type': 'number'}},
+        'attributes': {'type': 'array', 'items': {'type': 'number'}},
+        'objectives': {'type': 'array', 'items': {'type': 'number'}}
+    }
+}
+
+ATTAINMENT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'program_id': {'type': 'integer'},
+        'observations': {'type': 'array', 'items': {'type': 'object'}},
+        'attributes': {'type': 'array', 'items': {'type': 'object'}},
+        'objectives': {'type': 'array', 'items': {'type': 'object'}},
+        'overall': dict(LEVELS_SCHEMA, description='Mean attainment of every student'),
+        'cohorts': {
+            'type': 'object',
+            'description': 'Cohort name to its mean attainment',
+            'additionalProperties': LEVELS_SCHEMA
+        },
+        'students': {'type': 'array', 'items': LEVELS_SCHEMA}
+    }
+}
+
+
+def _flag(name: str, default: bool) -> bool:
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+@assessment_bp.route('/<int:program_id>/scores', methods=['POST'])
+@token_required
+@role_required('admin')
+@swag_from({
+    'tags': ['Assessment'],
+    'description': 'Load student module scores from a CSV file. Students are created or updated by '
+                   'student number and existing scores are overwritten, so a file can be loaded again.',
+    'consumes': ['multipart/form-data', 'text/csv'],
+    'parameters': [PROGRAM_ID_PARAMETER] + SCORE_FILE_PARAMETERS,
+    'responses': {
+        200: {
+            'description': 'Import report, invalid rows are skipped and listed by line',
+            'schema': SCORE_REPORT_SCHEMA
+        },
+        400: {
+            'description': 'The file is missing, unreadable or lacks a required column'
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def upload_scores(current_user, program_id: int):
+    if not Program.query.get(program_id):
+        return jsonify(message='Program not found'), 404
+    report = import_scores(program_id, read_score_lines(),
+                           chunk_size=current_app.config.get('SCORE_IMPORT_CHUNK_SIZE', 5000))
+    return jsonify(report), 200
+
+
+@assessment_bp.route('/<int:program_id>/attainment', methods=['GET'])
+@token_required
+@role_required('staff')
+@versioned(*ATTAINMENT_TABLES)
+@swag_from({
+    'tags': ['Assessment'],
+    'description': 'How well the students of a program attain every observation, graduate attribute '
+                   'and objective, from their module scores propagated through the link and relation '
+                   'weights. Values are on the 0 to 100 score scale, null where no score reaches the target.',
+    'parameters': [
+        PROGRAM_ID_PARAMETER,
+        {
+            'name': 'students',
+            'in': 'query',
+            'type': 'boolean',
+            'required': False,
+            'default': True,
+            'description': 'Include the attainment of every student, not only the cohort means'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Attainment per cohort and per student',
+            'schema': ATTAINMENT_SCHEMA
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def get_program_attainment(current_user, program_id: int):
+    if not Program.query.get(program_id):
+        return jsonify(message='Program not found'), 404
+    per_student = _flag('students', True)
+    result = program_cache.get_or_compute(
+        ('attainment', program_id, per_student), program_version(ATTAINMENT_TABLES),
+        lambda: program_attainment(program_id, per_student=per_student))
+    return jsonify(result), 200
+
+
+@assessment_bp.route('/attainment', methods=['GET'])
+@token_required
+@role_required('staff')
+@versioned(*ATTAINMENT_TABLES)
+@swag_from({
+    'tags': ['Assessment'],
+    'description': 'Cohort attainment of several programs, computed in parallel.',
+    'parameters': [
+        {
+            'name': 'program_ids',
+            'in': 'query',
+            'type': 'string',
+            'required': True,
+            'description': 'Comma separated IDs of the programs'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Cohort attainment of each program, in the requested order',
+            'schema': {'type': 'array', 'items': ATTAINMENT_SCHEMA}
+        },
+        400: {
+            'description': 'Missing or invalid program IDs'
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def get_programs_attainment(current_user):
+    try:
+        program_ids = [int(value) for value in request.args.get('program_ids', '').split(',')
+                       if value.strip()]
+    except ValueError:
+        return jsonify(message='program_ids must be a comma separated list of program IDs'), 400
+    if not program_ids:
+        return jsonify(message='program_ids is required'), 400
+    program_ids = list(dict.fromkeys(program_ids))
+    missing = missing_programs(program_ids)
+    if missing:
+        return jsonify(message=f'Programs not found: {", ".join(map(str, missing))}'), 404
+    return jsonify(programs_attainment(program_ids)), 200
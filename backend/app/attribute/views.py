@@ -3,6 +3,11 @@ from app import db
 from app.models.models import Attribute, Program
 from flasgger import swag_from
 from app.common.decorators import token_required, role_required
+from app.common.versioning import versioned
+from app.common.pagination import paginate, PAGINATION_PARAMETERS
+from app.common.projection import parse_fields, FIELDS_PARAMETER
+from app.common.serializers import serializers
+from app.services import cascade
 
 attribute_bp = Blueprint('attribute_bp', __name__,
                          url_prefix='/graduate-attributes')
@@ -85,17 +90,13 @@ def create_attribute(current_user):
     db.session.add(new_attribute)
     db.session.commit()
 
-    return jsonify({
-        'attribute_id': new_attribute.attribute_id,
-        'name': new_attribute.name,
-        'description': new_attribute.description,
-        'program_id': new_attribute.program_id
-    }), 201
+    return jsonify(serializers[Attribute](new_attribute)), 201
 
 
 @attribute_bp.route('/<int:attribute_id>', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('attribute')
 @swag_from({
     'tags': ['Graduate Attribute'],
     'description': 'Get details of a specific graduate attribute',
@@ -141,12 +142,7 @@ def create_attribute(current_user):
 def get_attribute(current_user, attribute_id: int):
     attribute = Attribute.query.get(attribute_id)
     if attribute:
-        return jsonify({
-            'attribute_id': attribute.attribute_id,
-            'name': attribute.name,
-            'description': attribute.description,
-            'program_id': attribute.program_id
-        }), 200
+        return jsonify(serializers[Attribute](attribute)), 200
     else:
         return jsonify(message='Attribute not found'), 404
 
@@ -227,12 +223,7 @@ def update_attribute(current_user, attribute_id: int):
     attribute.program_id = data.get('program_id', attribute.program_id)
     db.session.commit()
 
-    return jsonify({
-        'attribute_id': attribute.attribute_id,
-        'name': attribute.name,
-        'description': attribute.description,
-        'program_id': attribute.program_id
-    }), 200
+    return jsonify(serializers[Attribute](attribute)), 200
 
 
 @attribute_bp.route('/<int:attribute_id>', methods=['DELETE'])
@@ -240,7 +231,8 @@ def update_attribute(current_user, attribute_id: int):
 @role_required('admin')
 @swag_from({
     'tags': ['Graduate Attribute'],
-    'description': 'Delete a specific graduate attribute',
+    'description': 'Delete a specific graduate attribute, together with its observations, their '
+                   'links and its relations',
     'parameters': [
         {
             'name': 'attribute_id',
@@ -253,6 +245,13 @@ def update_attribute(current_user, attribute_id: int):
     'responses': {
         200: {
             'description': 'Attribute successfully deleted',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'message': {'type': 'string'},
+                    'deleted': {'type': 'object', 'description': 'Rows deleted per table'}
+                }
+            }
         },
         404: {
             'description': 'Attribute not found'
@@ -262,9 +261,8 @@ def update_attribute(current_user, attribute_id: int):
 def delete_attribute(current_user, attribute_id: int):
     attribute = Attribute.query.get(attribute_id)
     if attribute:
-        db.session.delete(attribute)
-        db.session.commit()
-        return jsonify(message='Attribute deleted'), 200
+        deleted = cascade.delete_attribute(attribute_id)
+        return jsonify(message='Attribute deleted', deleted=deleted), 200
     else:
         return jsonify(message='Attribute not found'), 404
 
@@ -272,6 +270,7 @@ def delete_attribute(current_user, attribute_id: int):
 @attribute_bp.route('', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('attribute')
 @swag_from({
     'tags': ['Graduate Attribute'],
     'description': 'List all graduate attributes, with optional query parameters for filtering by program ID and/or name',
@@ -290,7 +289,7 @@ def delete_attribute(current_user, attribute_id: int):
             'required': False,
             'description': 'Filter attributes by name, case insensitive, partial match'
         }
-    ],
+    ] + PAGINATION_PARAMETERS + [FIELDS_PARAMETER],
     'responses': {
         200: {
             'description': 'A list of all attributes',
@@ -330,19 +329,15 @@ def delete_attribute(current_user, attribute_id: int):
 def list_attributes(current_user):
     program_id = request.args.get('program_id')
     name = request.args.get('name')
-    query = Attribute.query
+    serializer = serializers[Attribute].only(parse_fields(Attribute))
+    query = serializer.select()
 
     if program_id:
         query = query.filter(Attribute.program_id == program_id)
     if name:
         query = query.filter(Attribute.name.ilike(f'%{name}%'))
 
-    attributes = query.all()
-    attributes_list = [{
-        'attribute_id': attr.attribute_id,
-        'name': attr.name,
-        'description': attr.description,
-        'program_id': attr.program_id
-    } for attr in attributes]
+    attributes, next_cursor = paginate(query, {'name': Attribute.name})
+    attributes_list = serializer.rows(attributes)
 
-    return jsonify(attributes=attributes_list), 200
+    return jsonify(attributes=attributes_list, next_cursor=next_cursor), 200
@@ -1,7 +1,9 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from app.services.services import register_user, login_user, logout_user, update_password
 from flasgger.utils import swag_from
+from app.models.models import User
 from app.common.decorators import token_required
+from app.common.serializers import serializers
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -69,7 +71,7 @@ def register():
     if username and password and role:
         user = register_user(username, password, role)
         if user:
-            return jsonify(user=user.serialize()), 201
+            return jsonify(user=serializers[User](user)), 201
         return jsonify(message='Registration failed'), 400
 
     return jsonify(message='Username, password, and role are required'), 400
@@ -143,12 +145,13 @@ def login():
         if result:
             token = result['token']
             user = result['user']
-            return jsonify(token=token, user=user.serialize()), 200
+            return jsonify(token=token, user=serializers[User](user)), 200
         return jsonify(message='Authentication failed'), 401
     return jsonify(message='Username and password are required'), 400
 
 
 @auth_bp.route('/logout', methods=['POST'])
+@token_required
 @swag_from({
     'tags': ['Authentication'],
     'description': 'Logs out the current user',
@@ -170,9 +173,8 @@ def login():
         }
     }
 })
-def logout():
-    # ...
-    logout_user()
+def logout(current_user):
+    logout_user(g.token_claims)
     return jsonify(message='Logged out'), 200
 
 
@@ -3,6 +3,9 @@ from app import db
 from app.models.models import Comment, Material, Module, Tag
 from flasgger import swag_from
 from app.common.decorators import token_required
+from app.common.pagination import paginate, PAGINATION_PARAMETERS
+from app.common.streaming import stream_json, wants_stream, STREAM_PARAMETER
+from app.common.serializers import serializers
 from app.tasks import send_notification
 
 comment_bp = Blueprint('comment_bp', __name__, url_prefix='/comments')
@@ -89,7 +92,7 @@ def get_comment(current_user, comment_id: int):
     if not comment:
         return jsonify({'message': 'Comment not found.'}), 404
 
-    return jsonify(comment.serialize()), 200
+    return jsonify(serializers[Comment](comment)), 200
 
 
 @comment_bp.route('/<int:comment_id>', methods=['PUT'])
@@ -132,7 +135,7 @@ def update_comment(current_user, comment_id: int):
     comment.text = data.get('text', comment.text)
     db.session.commit()
 
-    return jsonify(comment.serialize()), 200
+    return jsonify(serializers[Comment](comment)), 200
 
 
 @comment_bp.route('/<int:comment_id>', methods=['DELETE'])
@@ -188,20 +191,23 @@ def delete_comment(current_user, comment_id: int):
             'description': 'Filter comments created before this date'},
         {'name': 'created_after', 'in': 'query', 'type': 'string',
             'description': 'Filter comments created after this date'}
-    ],
+    ] + PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         '200': {
             'description': 'A list of comments',
             'examples': {
-                'application/json': [
-                    {
-                        'comment_id': 1,
-                        'text': 'Great material!',
-                        'created_at': '2023-11-06T12:00:00',
-                        'user_id': 2,
-                        'material_id': 5
-                    }
-                ]
+                'application/json': {
+                    'comments': [
+                        {
+                            'comment_id': 1,
+                            'text': 'Great material!',
+                            'created_at': '2023-11-06T12:00:00',
+                            'user_id': 2,
+                            'material_id': 5
+                        }
+                    ],
+                    'next_cursor': None
+                }
             }
         }
     }
@@ -212,7 +218,8 @@ def list_comments(current_user):
     created_before = request.args.get('created_before')
     created_after = request.args.get('created_after')
 
-    query = Comment.query
+    serializer = serializers[Comment]
+    query = serializer.select()
 
     if user_id:
         query = query.filter_by(user_id=user_id)
@@ -223,6 +230,10 @@ def list_comments(current_user):
     if created_after:
         query = query.filter(Comment.created_at > created_after)
 
-    comments = query.all()
+    if wants_stream():
+        return stream_json('comments', query.order_by(Comment.comment_id), serializer.row)
+
+    comments, next_cursor = paginate(
+        query, {'created_at': Comment.created_at}, default='-created_at')
 
-    return jsonify([comment.serialize() for comment in comments]), 200
+    return jsonify(comments=serializer.rows(comments), next_cursor=next_cursor), 200
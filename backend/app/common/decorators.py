@@ -1,7 +1,18 @@
+import jwt
 from functools import wraps
-from flask import request, jsonify
-from app.services.services import decode_token
-from app.models.models import User
+from flask import request, jsonify, g, current_app
+from app.services.services import decode_token, is_token_revoked
+from app.common.user_cache import user_cache, CachedUser
+
+
+def _user_from_claims(data):
+    '''
+    Build the current user from the signed claims alone (stateless mode).
+    Tokens issued before username was part of the claims fall back to the cache.
+    '''
+    if 'username' in data:
+        return CachedUser(data['user_id'], data['username'], data['role'])
+    return user_cache.get(data['user_id'])
 
 
 def token_required(f):
@@ -17,13 +28,24 @@ def token_required(f):
 
         try:
             data = decode_token(token)
-            current_user = User.query.filter_by(
-                user_id=data['user_id']).first()
+            if is_token_revoked(data):
+                return jsonify({'message': 'Token has been revoked!'}), 401
+            if current_app.config.get('AUTH_STATELESS'):
+                current_user = _user_from_claims(data)
+            else:
+                current_user = user_cache.get(data['user_id'])
             if current_user is None:
-                raise RuntimeError('User not found.')
-        except Exception as e:
-            return jsonify({'message': str(e)}), 401
+                return jsonify({'message': 'User not found!'}), 401
+        except jwt.ExpiredSignatureError:
+            return jsonify({'message': 'Token has expired!'}), 401
+        except (jwt.InvalidTokenError, KeyError):
+            return jsonify({'message': 'Token is invalid!'}), 401
+        except Exception:
+            # Database and other internal errors are logged, not echoed to the client
+            current_app.logger.exception('Could not authenticate request')
+            return jsonify({'message': 'Internal server error'}), 500
 
+        g.token_claims = data
         return f(current_user, *args, **kwargs)
     
 
@@ -0,0 +1,74 @@
+import dataclasses
+import decimal
+import enum
+import json
+import uuid
+from datetime import date, datetime, time
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # in requirements.txt; without it the stdlib encoder is used
+    orjson = None
+
+
+def _default(o):
+    '''
+    Canonical encoding shared by both encoders: Decimal as a JSON number,
+    datetime/date/time as ISO 8601 strings and Enum members as their value.
+    '''
+    if isinstance(o, decimal.Decimal):
+        return int(o) if o == o.to_integral_value() and o.is_finite() else float(o)
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, enum.Enum):
+        return o.value
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class JSONProvider(DefaultJSONProvider):
+    '''
+    Flask JSON provider with one encoding for Decimal, datetime and Enum
+    columns. Uses orjson when it is installed and falls back to the
+    standard library otherwise; both produce the same values.
+    '''
+    default = staticmethod(_default)
+    ensure_ascii = False
+    sort_keys = True
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.fast = orjson is not None and app.config.get('JSON_FAST_ENCODER', True)
+
+    def _orjson_options(self, indent: bool = False) -> int:
+        options = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs) -> str:
+        if self.fast and not kwargs:
+            return orjson.dumps(obj, default=_default, option=self._orjson_options()).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.fast and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not self.fast:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=_default,
+                            option=self._orjson_options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,156 @@
+import csv
+import io
+from flask import request
+from typing import Dict, List, Optional
+
+try:
+    import openpyxl
+except ImportError:  # optional, only needed for .xlsx uploads
+    openpyxl = None
+
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+MATRIX_PARAMETERS = [
+    {
+        'name': 'file',
+        'in': 'formData',
+        'type': 'file',
+        'required': False,
+        'description': 'CSV or XLSX sheet. The first row holds the column keys, the first '
+                       'column the row keys, the other cells the weights. Blank cells mean no pair'
+    },
+    {
+        'name': 'body',
+        'in': 'body',
+        'required': False,
+        'schema': {
+            'type': 'object',
+            'properties': {
+                'matrix': {
+                    'type': 'object',
+                    'description': 'Dense grid {row key: {column key: weight or null}}',
+                    'additionalProperties': {
+                        'type': 'object',
+                        'additionalProperties': {'type': 'integer'}
+                    }
+                }
+            }
+        }
+    }
+]
+
+MATRIX_REPORT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'inserted': {'type': 'integer'},
+        'updated': {'type': 'integer'},
+        'deleted': {'type': 'integer'},
+        'unchanged': {'type': 'integer'},
+        'elapsed_seconds': {'type': 'number'}
+    }
+}
+
+
+class MatrixError(ValueError):
+    '''Raised when an uploaded weight matrix cannot be read or applied.'''
+    pass
+
+
+def _key(value) -> str:
+    # Spreadsheets turn module numbers such as 801001 into floats
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return '' if value is None else str(value).strip()
+
+
+def _weight(value, row: str, column: str) -> Optional[int]:
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise MatrixError(f'Invalid weight {value!r} at row {row}, column {column}.')
+    if not number.is_integer():
+        raise MatrixError(f'Invalid weight {value!r} at row {row}, column {column}.')
+    return int(number)
+
+
+def _from_table(rows: List[list]) -> Dict[str, Dict[str, Optional[int]]]:
+    rows = [row for row in rows if any(_key(cell) for cell in row)]
+    if len(rows) < 2:
+        raise MatrixError('The matrix needs a header row and at least one data row.')
+    columns = [_key(cell) for cell in rows[0][1:]]
+    while columns and not columns[-1]:
+        columns.pop()
+    if not columns or not all(columns):
+        raise MatrixError('Every column of the header row needs a key.')
+    if len(set(columns)) != len(columns):
+        raise MatrixError('The header row repeats a column key.')
+
+    grid = {}
+    for row in rows[1:]:
+        key = _key(row[0])
+        if not key:
+            raise MatrixError('Every data row needs a key in its first cell.')
+        if key in grid:
+            raise MatrixError(f'Row {key} appears more than once.')
+        cells = list(row[1:len(columns) + 1]) + [None] * (len(columns) + 1 - len(row))
+        grid[key] = {column: _weight(value, key, column) for column, value in zip(columns, cells)}
+    return grid
+
+
+def _from_json(matrix) -> Dict[str, Dict[str, Optional[int]]]:
+    if not isinstance(matrix, dict) or not matrix:
+        raise MatrixError('No matrix supplied.')
+    columns = []
+    for cells in matrix.values():
+        if not isinstance(cells, dict):
+            raise MatrixError('Each matrix row must be an object of column key to weight.')
+        columns.extend(_key(column) for column in cells if _key(column) not in columns)
+    grid = {}
+    for row, cells in matrix.items():
+        key = _key(row)
+        cells = {_key(column): value for column, value in cells.items()}
+        grid[key] = {column: _weight(cells.get(column), key, column) for column in columns}
+    return grid
+
+
+def _xlsx_rows(stream) -> List[list]:
+    if openpyxl is None:
+        raise MatrixError('XLSX upload requires openpyxl, upload the sheet as CSV instead.')
+    try:
+        workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    except Exception:
+        raise MatrixError('The file is not a readable XLSX workbook.')
+    try:
+        return [list(row) for row in workbook.worksheets[0].iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+
+def _csv_rows(data) -> List[list]:
+    try:
+        text = data.decode('utf-8-sig') if isinstance(data, bytes) else data
+        return list(csv.reader(io.StringIO(text)))
+    except (UnicodeDecodeError, csv.Error):
+        raise MatrixError('The file is not a readable UTF-8 CSV.')
+
+
+def read_matrix() -> Dict[str, Dict[str, Optional[int]]]:
+    '''
+    Read the weight matrix of the current request as {row key: {column key:
+    weight}}. Blank cells are kept as None so the caller knows the pair is
+    covered by the matrix but should not exist.
+    '''
+    if 'file' in request.files:
+        upload = request.files['file']
+        if upload.filename.lower().endswith('.xlsx') or upload.mimetype == XLSX_MIMETYPE:
+            return _from_table(_xlsx_rows(io.BytesIO(upload.read())))
+        return _from_table(_csv_rows(upload.read()))
+    if request.mimetype == 'text/csv':
+        return _from_table(_csv_rows(request.get_data(as_text=True)))
+    if request.mimetype == XLSX_MIMETYPE:
+        return _from_table(_xlsx_rows(io.BytesIO(request.get_data())))
+    data = request.get_json(silent=True)
+    return _from_json(data.get('matrix') if isinstance(data, dict) else None)
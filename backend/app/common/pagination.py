@@ -0,0 +1,226 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from flask import request, current_app
+from sqlalchemy import and_, or_, inspect
+from sqlalchemy.orm import undefer
+from sqlalchemy.sql import CompoundSelect, Select
+from app.database import db
+from sqlalchemy.types import DateTime, Numeric
+from typing import Dict, List, Optional, Tuple
+
+
+PAGINATION_PARAMETERS = [
+    {
+        'name': 'limit',
+        'in': 'query',
+        'type': 'integer',
+        'required': False,
+        'description': 'Maximum number of items to return (capped by PAGE_MAX_LIMIT)'
+    },
+    {
+        'name': 'cursor',
+        'in': 'query',
+        'type': 'string',
+        'required': False,
+        'description': 'Opaque cursor taken from the next_cursor field of the previous page'
+    },
+    {
+        'name': 'order_by',
+        'in': 'query',
+        'type': 'string',
+        'required': False,
+        'description': 'Sort field, prefix with "-" for descending order'
+    }
+]
+
+
+class PaginationError(ValueError):
+    '''Raised when the pagination query parameters are invalid.'''
+    pass
+
+
+def _encode_cursor(order_by: str, values: list) -> str:
+    payload = json.dumps([order_by, values], separators=(',', ':'),
+                         default=str)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, list]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        order_by, values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor.')
+    if not isinstance(order_by, str) or not isinstance(values, list):
+        raise PaginationError('Invalid cursor.')
+    return order_by, values
+
+
+def _coerce(column, value):
+    '''
+    Turn a JSON value from a cursor back into the python type of the column.
+    '''
+    if value is None:
+        return None
+    try:
+        if isinstance(column.type, DateTime):
+            return datetime.fromisoformat(value)
+        if isinstance(column.type, Numeric):
+            return Decimal(value)
+    except (ValueError, TypeError, ArithmeticError):
+        raise PaginationError('Invalid cursor.')
+    return value
+
+
+def _parse_limit() -> int:
+    default = current_app.config.get('PAGE_DEFAULT_LIMIT', 50)
+    maximum = current_app.config.get('PAGE_MAX_LIMIT', 500)
+    limit = request.args.get('limit')
+    if limit is None or limit == '':
+        return default
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise PaginationError('Limit must be an integer.')
+    if limit < 1:
+        raise PaginationError('Limit must be a positive integer.')
+    return min(limit, maximum)
+
+
+def _primary_key(query):
+    if isinstance(query, Select):
+        table = next(iter(query.selected_columns)).table
+        return table.primary_key.columns.values()[0]
+    entity = query.column_descriptions[0]['entity']
+    return inspect(entity).primary_key[0]
+
+
+def _selects_rows(query) -> bool:
+    '''True for Core selects and with_entities(...) queries, which return row tuples.'''
+    if isinstance(query, Select):
+        return True
+    description = query.column_descriptions[0]
+    return description['expr'] is not description['entity']
+
+
+def _selected_names(query) -> set:
+    if isinstance(query, Select):
+        return set(query.selected_columns.keys())
+    return {description['name'] for description in query.column_descriptions}
+
+
+def fetch_all(query) -> list:
+    '''
+    Run a Query, or a Core Select (or UNION/EXCEPT of selects) on the
+    session's connection. The latter skips ORM result processing and
+    returns plain rows.
+    '''
+    if isinstance(query, (Select, CompoundSelect)):
+        return db.session.connection().execute(query).all()
+    return query.all()
+
+
+def _nullable(column) -> bool:
+    return getattr(getattr(column, 'expression', column), 'nullable', True)
+
+
+def _keyset_filter(columns: List, values: list, descending: bool):
+    '''
+    Build "(c1, c2, ...) > (v1, v2, ...)" expanded into plain comparisons,
+    so that it works on every backend and can be served by a composite index.
+    NULLs sort after every value in both directions (see _ordering), so
+    nothing comes after a NULL but other NULLs.
+    '''
+    clauses = []
+    for i, column in enumerate(columns):
+        if values[i] is None:
+            continue
+        equal = [columns[j].is_(None) if values[j] is None else columns[j] == values[j]
+                 for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        if _nullable(column):
+            step = or_(step, column.is_(None))
+        clauses.append(and_(*equal, step))
+    return or_(*clauses)
+
+
+def _ordering(columns: List, descending: bool) -> list:
+    # "column IS NULL" first puts NULLs last on every backend, MySQL has no NULLS LAST
+    ordering = []
+    for column in columns:
+        if _nullable(column):
+            ordering.append(column.is_(None).asc())
+        ordering.append(column.desc() if descending else column.asc())
+    return ordering
+
+
+def paginate(query, sort_fields: Dict[str, object], default: Optional[str] = None):
+    '''
+    Apply keyset pagination to a query using the limit, cursor and order_by
+    request arguments.
+
+    sort_fields maps the public field names accepted by order_by to columns.
+    The primary key of the queried model is always appended as a tie-breaker
+    so the ordering is total and stable; NULL sort values come last in both
+    directions. Returns the rows of the current page
+    and the cursor of the next one (None on the last page).
+
+    The query may be an ORM Query or a Core Select. When it returns row
+    tuples, sort columns that were not selected are appended after the
+    selected ones.
+    '''
+    pk = _primary_key(query)
+    limit = _parse_limit()
+    cursor = request.args.get('cursor')
+    order_by = request.args.get('order_by') or default or pk.key
+
+    if cursor:
+        cursor_order_by, values = _decode_cursor(cursor)
+        if request.args.get('order_by') and cursor_order_by != order_by:
+            raise PaginationError('Cursor does not match order_by.')
+        order_by = cursor_order_by
+
+    descending = order_by.startswith('-')
+    field = order_by.lstrip('-')
+    if field == pk.key:
+        columns = [pk]
+    elif field in sort_fields:
+        columns = [sort_fields[field], pk]
+    else:
+        raise PaginationError(
+            f'Cannot order by {field}. Allowed: {", ".join(sorted(set(sort_fields) | {pk.key}))}.')
+
+    if cursor:
+        if len(values) != len(columns):
+            raise PaginationError('Invalid cursor.')
+        values = [_coerce(column, value)
+                  for column, value in zip(columns, values)]
+        query = query.filter(_keyset_filter(columns, values, descending))
+
+    # The sort key is needed for the next cursor even if ?fields= left it out
+    if _selects_rows(query):
+        selected = _selected_names(query)
+        query = query.add_columns(*[column for column in columns if column.key not in selected])
+    else:
+        query = query.options(*[undefer(column) for column in columns[:-1]])
+    query = query.order_by(*_ordering(columns, descending))
+    rows = fetch_all(query.limit(limit + 1))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor(
+            order_by, [_cursor_value(getattr(last, column.key)) for column in columns])
+
+    return rows, next_cursor
+
+
+def _cursor_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
@@ -0,0 +1,123 @@
+import os
+import threading
+import bcrypt
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+
+# bcrypt only reads this many bytes; bcrypt >= 5 rejects longer input
+MAX_PASSWORD_BYTES = 72
+
+
+def password_error(password: str) -> Optional[str]:
+    '''Why bcrypt cannot hash the password, or None if it can.'''
+    if '\x00' in password:
+        return 'Password must not contain NUL characters'
+    if len(password.encode('utf-8')) > MAX_PASSWORD_BYTES:
+        return f'Password must be at most {MAX_PASSWORD_BYTES} bytes'
+    return None
+
+
+class HasherBusyError(RuntimeError):
+    '''Raised when too many password hashes are already queued.'''
+    pass
+
+
+class PasswordHasher:
+    '''
+    Runs bcrypt on a small, bounded thread pool.
+
+    bcrypt releases the GIL, so hashing on worker threads keeps the rest of
+    the process responsive, while the pool size caps how many cores a login
+    burst can take. Requests beyond max_pending are refused instead of
+    queueing without limit.
+    '''
+
+    def __init__(self, rounds: int = 12, workers: int = None, max_pending: int = 64):
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_ROUNDS', self.rounds)
+        self.workers = app.config.get('BCRYPT_WORKERS') or self.workers
+        self.max_pending = app.config.get('BCRYPT_MAX_PENDING', self.max_pending)
+        with self._lock:
+            self._shutdown()
+            self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False)
+        self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created lazily, and again after a fork, since threads don't survive it
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='bcrypt')
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusyError(
+                'Too many password operations in progress, please retry.')
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def _submit_waiting(self, fn, *args):
+        # Batches wait for a slot instead of failing, and count towards
+        # max_pending like single requests do
+        self._slots.acquire()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash_many(self, passwords: List[str]) -> List[Optional[str]]:
+        '''
+        Hash a batch on every pool thread at once. The batch is submitted one
+        pool-width at a time so interactive logins can interleave with it.
+        A password bcrypt refuses gets None instead of failing the batch.
+        '''
+        hashed = []
+        for start in range(0, len(passwords), self.workers):
+            chunk = passwords[start:start + self.workers]
+            futures = [self._submit_waiting(bcrypt.hashpw, password.encode('utf-8'),
+                                            bcrypt.gensalt(rounds=self.rounds))
+                       for password in chunk]
+            for future in futures:
+                try:
+                    hashed.append(future.result().decode('utf-8'))
+                except ValueError:
+                    hashed.append(None)
+        return hashed
+
+    def check(self, password: str, hashed_password: str) -> bool:
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        '''True if the hash was made with a different cost than configured.'''
+        try:
+            return int(hashed_password.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+password_hasher = PasswordHasher()
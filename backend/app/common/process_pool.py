@@ -0,0 +1,53 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, List
+
+
+class ProcessPool:
+    '''
+    A lazily started pool of worker processes for CPU-bound NumPy work that
+    spans several programs, such as attainment for every program at once.
+
+    Workers are spawned rather than forked so they never inherit the web
+    worker's database connections or threads. With one worker, or a
+    single task, the work runs in the calling process.
+    '''
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.workers = app.config.get('ATTAINMENT_WORKERS') or self.workers
+        with self._lock:
+            self._shutdown()
+
+    def _shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False)
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily, and again in a forked web worker
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'))
+                    self._pid = os.getpid()
+        return self._executor
+
+    def map(self, fn: Callable, tasks: Iterable) -> List:
+        '''Apply fn to every task, in parallel when it pays off, keeping the order.'''
+        tasks = list(tasks)
+        if self.workers <= 1 or len(tasks) <= 1:
+            return [fn(task) for task in tasks]
+        return list(self._get_executor().map(fn, tasks))
+
+
+process_pool = ProcessPool()
@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+from app.common.versioning import table_versions
+
+
+# Every table a program-wide computation reads
+PROGRAM_TABLES = ('program', 'attribute', 'objective', 'attrobjrel',
+                  'observation', 'module', 'modobsrel')
+
+
+def program_version(tables=PROGRAM_TABLES) -> str:
+    '''
+    Data version of the program tables. Table versions are global, so a
+    write to any program changes it; that only costs a recomputation.
+    '''
+    versions, _ = table_versions(tables)
+    return ','.join(f'{table}:{versions[table]}' for table in sorted(versions))
+
+
+class ProgramCache:
+    '''
+    Per-process LRU cache of values derived from a program's data, such as
+    the contribution matrix. Each entry remembers the data version it was
+    computed from and is recomputed once the version moves on.
+    '''
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('PROGRAM_CACHE_SIZE', self.maxsize)
+        self.clear()
+
+    def get_or_compute(self, key: Hashable, version: str, compute: Callable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+
+        if self.maxsize > 0:
+            with self._lock:
+                self._entries[key] = (version, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize
+            }
+
+
+program_cache = ProgramCache()
@@ -0,0 +1,43 @@
+from flask import request
+from sqlalchemy import inspect
+from typing import Iterable, List
+
+
+FIELDS_PARAMETER = {
+    'name': 'fields',
+    'in': 'query',
+    'type': 'string',
+    'required': False,
+    'description': 'Comma separated list of fields to return, or * for all of them. '
+                   'Large text fields such as description are left out unless requested'
+}
+
+
+class ProjectionError(ValueError):
+    '''Raised when ?fields= names a field the model does not have.'''
+    pass
+
+
+def parse_fields(model, deferred: Iterable[str] = ('description',)) -> List[str]:
+    '''
+    Return the column names requested through ?fields=, in model order.
+    Without the argument every column except the deferred ones is returned.
+    The primary key is always included.
+    '''
+    mapper = inspect(model)
+    columns = [attr.key for attr in mapper.column_attrs]
+    pk = mapper.primary_key[0].key
+    requested = request.args.get('fields')
+
+    if not requested:
+        wanted = set(columns) - set(deferred)
+    elif requested.strip() == '*':
+        wanted = set(columns)
+    else:
+        wanted = {name.strip() for name in requested.split(',') if name.strip()}
+        unknown = wanted - set(columns)
+        if unknown:
+            raise ProjectionError(
+                f'Unknown fields: {", ".join(sorted(unknown))}. Allowed: {", ".join(columns)}.')
+    wanted.add(pk)
+    return [name for name in columns if name in wanted]
@@ -0,0 +1,125 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from app.models.models import RevokedToken
+
+
+class BloomFilter:
+    '''
+    Fixed-size bloom filter over strings. A negative answer is definitive,
+    a positive one has to be confirmed against the exact set.
+    '''
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = int(-capacity * math.log(error_rate) / (math.log(2) ** 2)) or 8
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationList:
+    '''
+    In-memory mirror of the revoked_token table.
+
+    Lookups only touch memory: the bloom filter rejects almost every valid
+    token and the exact dict confirms the rest. The table is re-read at most
+    once per sync interval, so the database sees one small query per worker
+    and interval instead of one per request.
+
+    Each key keeps its revocation time as well, so a "user:<id>" key only
+    rejects the tokens issued before it and a new user that gets the same
+    id is not locked out.
+    '''
+
+    def __init__(self, capacity: int = 100000, sync_interval: float = 5):
+        self.capacity = capacity
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._bloom = BloomFilter(self.capacity)
+        self._revoked = {}  # key -> (expires_at, revoked_at)
+        self._watermark = None
+        self._next_sync = 0
+
+    def init_app(self, app):
+        self.capacity = app.config.get('REVOCATION_CAPACITY', self.capacity)
+        self.sync_interval = app.config.get(
+            'REVOCATION_SYNC_INTERVAL', self.sync_interval)
+        with self._lock:
+            self._reset()
+
+    def add(self, key: str, expires_at: datetime, revoked_at: datetime):
+        with self._lock:
+            self._bloom.add(key)
+            self._revoked[key] = (expires_at, revoked_at)
+
+    def is_revoked(self, key: str, issued_at: datetime = None) -> bool:
+        '''
+        Whether key is revoked. With issued_at only a revocation recorded
+        after that time counts.
+        '''
+        self._maybe_sync()
+        if key not in self._bloom:
+            return False
+        entry = self._revoked.get(key)
+        if entry is None or entry[0] <= datetime.utcnow():
+            return False
+        return issued_at is None or issued_at < entry[1]
+
+    def _maybe_sync(self):
+        if time.monotonic() < self._next_sync:
+            return
+        with self._lock:
+            if time.monotonic() < self._next_sync:
+                return
+            self._next_sync = time.monotonic() + self.sync_interval
+        self.sync()
+
+    def sync(self):
+        '''Pull revocations recorded by other workers since the last sync.'''
+        now = datetime.utcnow()
+        query = RevokedToken.query.filter(RevokedToken.expires_at > now)
+        if self._watermark is not None:
+            # Overlap with the previous window so rows committed slightly out
+            # of order are not missed; re-reading a key is harmless.
+            since = self._watermark - timedelta(seconds=self.sync_interval)
+            query = query.filter(RevokedToken.revoked_at >= since)
+        rows = query.with_entities(
+            RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at).all()
+
+        with self._lock:
+            # Expired keys can't be removed from a bloom filter, so rebuild it
+            # once they make up most of its capacity.
+            if len(self._revoked) + len(rows) > self.capacity:
+                live = {key: entry for key, entry in self._revoked.items() if entry[0] > now}
+                self._bloom = BloomFilter(self.capacity)
+                for key in live:
+                    self._bloom.add(key)
+                self._revoked = live
+            for jti, expires_at, revoked_at in rows:
+                self._bloom.add(jti)
+                self._revoked[jti] = (expires_at, revoked_at)
+                if self._watermark is None or revoked_at > self._watermark:
+                    self._watermark = revoked_at
+            if self._watermark is None:
+                self._watermark = now
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,56 @@
+import io
+from flask import request
+
+
+SCORE_FILE_PARAMETERS = [
+    {
+        'name': 'file',
+        'in': 'formData',
+        'type': 'file',
+        'required': False,
+        'description': 'CSV with a header row and the columns student (student number), module '
+                       '(module number) and score (0 to 100), plus optional name and cohort. '
+                       'The file can also be sent as a text/csv body'
+    }
+]
+
+SCORE_REPORT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'imported': {'type': 'integer'},
+        'students': {'type': 'integer'},
+        'failed': {'type': 'integer'},
+        'errors': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'line': {'type': 'integer'},
+                    'student': {'type': 'string'},
+                    'message': {'type': 'string'}
+                }
+            }
+        },
+        'elapsed_seconds': {'type': 'number'},
+        'rows_per_second': {'type': 'number'}
+    }
+}
+
+
+class ScoreFileError(ValueError):
+    '''Raised when an uploaded score file cannot be read.'''
+    pass
+
+
+def read_score_lines():
+    '''
+    The score CSV of the current request as a text stream, so large files
+    are parsed as they are read instead of being loaded whole.
+    '''
+    if 'file' in request.files:
+        stream = request.files['file'].stream
+    elif request.mimetype == 'text/csv':
+        stream = request.stream
+    else:
+        raise ScoreFileError('Upload the scores as a CSV file or a text/csv body.')
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
@@ -0,0 +1,107 @@
+from operator import attrgetter
+from sqlalchemy import inspect, select
+from typing import Callable, Dict, Iterable, List
+from app.database import db
+from app.models.models import User, Module
+
+
+class Serializer:
+    '''
+    Row-to-dict function for one model, compiled from its column metadata.
+
+    The field names and an attrgetter for them are computed once, so turning
+    an object into a dict is one C-level attribute fetch plus dict(zip()).
+    row() takes a tuple whose leading values are in field order, which is
+    what the Core statement from select() returns.
+    '''
+    __slots__ = ('model', 'fields', 'columns', '_getter', '_formatters', '_subsets')
+
+    # Upper bound on cached ?fields= projections per model
+    max_subsets = 64
+
+    def __init__(self, model, fields: Iterable[str], formatters: Dict[str, Callable] = None):
+        self.model = model
+        self.fields = tuple(fields)
+        mapped_columns = inspect(model).columns
+        self.columns = tuple(mapped_columns[name] for name in self.fields)
+        getter = attrgetter(*self.fields)
+        if len(self.fields) == 1:
+            self._getter = lambda obj: (getter(obj),)
+        else:
+            self._getter = getter
+        self._formatters = tuple((name, formatter) for name, formatter in (formatters or {}).items()
+                                 if name in self.fields)
+        self._subsets = {}
+
+    def __call__(self, obj) -> dict:
+        return self.row(self._getter(obj))
+
+    def row(self, values) -> dict:
+        # zip() stops at the last field, extra trailing columns are ignored
+        data = dict(zip(self.fields, values))
+        for name, formatter in self._formatters:
+            data[name] = formatter(data[name])
+        return data
+
+    def many(self, objs) -> List[dict]:
+        return [self(obj) for obj in objs]
+
+    def rows(self, rows) -> List[dict]:
+        row = self.row
+        return [row(values) for values in rows]
+
+    def select(self):
+        '''
+        Core SELECT of this serializer's table columns. Filter it like a
+        query (filter, filter_by, join) and hand it to paginate() or
+        stream_json(), which run it on the session's connection and return
+        plain rows without building ORM instances.
+        '''
+        return select(*self.columns)
+
+    def only(self, fields: Iterable[str]) -> 'Serializer':
+        '''Return the serializer for a subset of the fields, e.g. from parse_fields.'''
+        fields = tuple(fields)
+        if fields == self.fields:
+            return self
+        serializer = self._subsets.get(fields)
+        if serializer is None:
+            serializer = Serializer(self.model, fields, dict(self._formatters))
+            if len(self._subsets) < self.max_subsets:
+                self._subsets[fields] = serializer
+        return serializer
+
+
+class SerializerRegistry:
+    '''One compiled Serializer per mapped model, built when the app starts.'''
+
+    def __init__(self):
+        self._options = {}
+        self._serializers = {}
+
+    def register(self, model, exclude: Iterable[str] = (), formatters: Dict[str, Callable] = None):
+        '''Customise the serializer of a model before init_app compiles it.'''
+        self._options[model] = (tuple(exclude), formatters or {})
+        self._serializers.pop(model, None)
+
+    def init_app(self, app):
+        for mapper in db.Model.registry.mappers:
+            if mapper.class_ not in self._serializers:
+                self._compile(mapper.class_)
+
+    def _compile(self, model) -> Serializer:
+        exclude, formatters = self._options.get(model, ((), {}))
+        fields = [attr.key for attr in inspect(model).column_attrs if attr.key not in exclude]
+        serializer = self._serializers[model] = Serializer(model, fields, formatters)
+        return serializer
+
+    def __getitem__(self, model) -> Serializer:
+        serializer = self._serializers.get(model)
+        if serializer is None:
+            serializer = self._compile(model)
+        return serializer
+
+
+serializers = SerializerRegistry()
+serializers.register(User, exclude=('password',))
+serializers.register(Module, formatters={'offered_by': lambda offered_by: offered_by or ''})
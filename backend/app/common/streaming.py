@@ -0,0 +1,56 @@
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy.sql import Select
+from app.database import db
+from typing import Callable
+
+
+STREAM_PARAMETER = {
+    'name': 'stream',
+    'in': 'query',
+    'type': 'boolean',
+    'required': False,
+    'description': 'Stream every matching row instead of returning one page. '
+                   'limit, cursor and order_by are ignored'
+}
+
+
+def wants_stream() -> bool:
+    return request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def _batches(query, batch_size: int):
+    if isinstance(query, Select):
+        # Core statements use a server side cursor where the driver has one
+        result = db.session.connection().execution_options(
+            stream_results=True).execute(query)
+        yield from result.partitions(batch_size)
+        return
+    batch = []
+    for row in query.yield_per(batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_json(key: str, query, serialize: Callable, batch_size: int = None) -> Response:
+    '''
+    Send {"<key>": [...], "next_cursor": null} while the query is still
+    being read. query is an ORM Query or a Core Select. Rows are fetched
+    batch_size at a time and each batch is encoded and flushed before the
+    next one is loaded, so memory use does not grow with the number of rows.
+    '''
+    batch_size = batch_size or current_app.config.get('STREAM_BATCH_SIZE', 1000)
+    dumps = current_app.json.dumps
+
+    def generate():
+        yield '{"%s":[' % key
+        first = True
+        for batch in _batches(query, batch_size):
+            yield ('' if first else ',') + ','.join([dumps(serialize(row)) for row in batch])
+            first = False
+        yield '],"next_cursor":null}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
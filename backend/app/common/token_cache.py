@@ -0,0 +1,66 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    '''
+    LRU of already verified JWT claims, keyed by a hash of the raw token.
+
+    An entry lives until the token's exp claim, after which the token is
+    decoded again (and rejected) by the regular path. Revocation is checked
+    on the returned claims by the caller, so a cached token that has been
+    logged out is still refused.
+    '''
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('TOKEN_CACHE_SIZE', self.maxsize)
+        self.clear()
+
+    def get_or_decode(self, token: str, decode):
+        key = hashlib.sha256(token.encode('utf-8')).digest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+            self.misses += 1
+
+        claims = decode(token)
+        exp = claims.get('exp')
+        if self.maxsize > 0 and exp is not None:
+            with self._lock:
+                self._entries[key] = (claims, exp)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return claims
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize
+            }
+
+
+token_cache = TokenCache()
@@ -0,0 +1,96 @@
+from datetime import datetime
+from sqlalchemy import and_, bindparam, func, or_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from typing import Dict, Iterable, List, Sequence
+from app.database import db
+
+
+_dialect_inserts = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+    'mysql': mysql.insert,
+    'mariadb': mysql.insert,
+}
+
+
+def dialect_insert(dialect: str):
+    '''The dialect's insert() with ON CONFLICT / ON DUPLICATE KEY support, or None.'''
+    return _dialect_inserts.get(dialect)
+
+
+def _dedupe(rows: Iterable[Dict], keys: Sequence[str]) -> List[Dict]:
+    # One statement may not touch the same key twice, the last row wins
+    unique = {}
+    for row in rows:
+        unique[tuple(row[key] for key in keys)] = row
+    return list(unique.values())
+
+
+def upsert(model, rows: Iterable[Dict], keys: Sequence[str], update: Sequence[str] = (),
+           keep_null: Sequence[str] = ()):
+    '''
+    Insert rows into the model's table in one statement. Rows whose keys
+    (a unique constraint) already exist get their update columns
+    overwritten instead, or are left alone when update is empty. Update
+    columns listed in keep_null are only overwritten with non-null values.
+
+    Uses INSERT ... ON CONFLICT on PostgreSQL and SQLite and INSERT ... ON
+    DUPLICATE KEY UPDATE on MySQL, so concurrent writers cannot create
+    duplicate pairs. Other backends read the existing keys in one query and
+    apply a bulk insert plus a bulk update. The caller commits.
+    '''
+    rows = _dedupe(rows, keys)
+    if not rows:
+        return
+    table = model.__table__
+    assignments = {}
+    if update and 'updated_at' in table.c:
+        # Column onupdate defaults do not fire for the conflict branch
+        assignments['updated_at'] = datetime.utcnow()
+
+    dialect = db.session.get_bind().dialect.name
+    insert = _dialect_inserts.get(dialect)
+    if insert is None:
+        _upsert_portable(table, rows, keys, update, keep_null, assignments)
+        return
+
+    def value(column, new):
+        return func.coalesce(new, table.c[column]) if column in keep_null else new
+
+    statement = insert(table)
+    if dialect in ('mysql', 'mariadb'):
+        assignments.update({column: value(column, statement.inserted[column]) for column in update})
+        # ON DUPLICATE KEY needs an assignment, a no-op one ignores the row
+        statement = statement.on_duplicate_key_update(
+            assignments or {keys[0]: table.c[keys[0]]})
+    elif update:
+        assignments.update({column: value(column, statement.excluded[column]) for column in update})
+        statement = statement.on_conflict_do_update(index_elements=list(keys), set_=assignments)
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=list(keys))
+    db.session.execute(statement, rows)
+
+
+def _upsert_portable(table, rows: List[Dict], keys: Sequence[str], update: Sequence[str],
+                     keep_null: Sequence[str], assignments: Dict):
+    pk = table.primary_key.columns.values()[0]
+    key_columns = [table.c[key] for key in keys]
+    existing = {
+        tuple(row[1:]): row[0] for row in db.session.execute(
+            table.select().with_only_columns(pk, *key_columns).where(or_(*[
+                and_(*[column == row[column.key] for column in key_columns]) for row in rows])))}
+
+    inserts, updates = [], []
+    for row in rows:
+        row_pk = existing.get(tuple(row[key] for key in keys))
+        if row_pk is None:
+            inserts.append(row)
+        elif update:
+            updates.append(dict({f'_{column}': row[column] for column in update}, _pk=row_pk))
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+    if updates:
+        assignments.update({
+            column: func.coalesce(bindparam(f'_{column}'), table.c[column]) if column in keep_null
+            else bindparam(f'_{column}') for column in update})
+        db.session.execute(table.update().where(pk == bindparam('_pk')).values(assignments), updates)
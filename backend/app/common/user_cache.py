@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from app.models.models import User
+
+
+class CachedUser:
+    '''
+    Lightweight, session-independent copy of the User columns the views need.
+    '''
+    __slots__ = ('user_id', 'username', 'role')
+
+    def __init__(self, user_id: int, username: str, role: str):
+        self.user_id = user_id
+        self.username = username
+        self.role = role
+
+    @classmethod
+    def from_user(cls, user: User) -> 'CachedUser':
+        return cls(user.user_id, user.username, user.role)
+
+    def serialize(self):
+        return {
+            'user_id': self.user_id,
+            'username': self.username,
+            'role': self.role
+        }
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+
+class UserCache:
+    '''
+    Per-process LRU cache of users keyed by user_id, with a TTL so that
+    changes made through other workers are picked up eventually.
+    '''
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('USER_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        self.clear()
+
+    def get(self, user_id: int) -> Optional[CachedUser]:
+        '''Return the cached user, loading it from the database on a miss.'''
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        user = User.query.filter_by(user_id=user_id).first()
+        if user is None:
+            return None
+        cached = CachedUser.from_user(user)
+
+        if self.maxsize > 0:
+            with self._lock:
+                self._entries[user_id] = (cached, now + self.ttl)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl
+            }
+
+
+user_cache = UserCache()
@@ -0,0 +1,127 @@
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, make_response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from app.models.models import TableVersion
+from app.common.upsert import dialect_insert
+
+
+_version_table = TableVersion.__table__
+
+
+def bump_versions(connection, tables):
+    '''
+    Increment the version of each table inside the caller's transaction,
+    so the new version becomes visible together with the data it describes.
+    Tables are bumped in a fixed order to avoid lock-order deadlocks.
+    '''
+    now = datetime.utcnow()
+    dialect = connection.dialect.name
+    insert = dialect_insert(dialect)
+    for table_name in sorted(tables):
+        if insert is not None:
+            # A single statement, so two first writes to a table cannot
+            # both try to insert its row
+            statement = insert(_version_table).values(
+                table_name=table_name, version=1, updated_at=now)
+            bumped = {'version': _version_table.c.version + 1, 'updated_at': now}
+            if dialect in ('mysql', 'mariadb'):
+                statement = statement.on_duplicate_key_update(bumped)
+            else:
+                statement = statement.on_conflict_do_update(
+                    index_elements=['table_name'], set_=bumped)
+            connection.execute(statement)
+            continue
+        result = connection.execute(
+            _version_table.update()
+            .where(_version_table.c.table_name == table_name)
+            .values(version=_version_table.c.version + 1, updated_at=now))
+        if result.rowcount == 0:
+            connection.execute(_version_table.insert().values(
+                table_name=table_name, version=1, updated_at=now))
+
+
+def _after_flush(session, flush_context):
+    tables = set()
+    for obj in session.new | session.deleted:
+        tables.add(obj.__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            tables.add(obj.__table__.name)
+    tables.discard(_version_table.name)
+    if tables:
+        bump_versions(session.connection(), tables)
+
+
+def _do_orm_execute(orm_execute_state):
+    # Bulk query.delete()/update() and session.execute(insert(...)) skip the
+    # flush, so catch them here before they run.
+    statement = orm_execute_state.statement
+    if isinstance(statement, UpdateBase):
+        table_name = statement.table.name
+        if table_name != _version_table.name:
+            bump_versions(orm_execute_state.session.connection(), {table_name})
+
+
+def init_versioning():
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'do_orm_execute', _do_orm_execute)
+
+
+def table_versions(tables):
+    '''Return ({table: version}, last modification time) for the given tables.'''
+    rows = TableVersion.query.filter(TableVersion.table_name.in_(tables)).with_entities(
+        TableVersion.table_name, TableVersion.version, TableVersion.updated_at).all()
+    versions = {table_name: 0 for table_name in tables}
+    last_modified = None
+    for table_name, version, updated_at in rows:
+        versions[table_name] = version
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    return versions, last_modified
+
+
+def versioned(*tables):
+    '''
+    Make a GET view conditional on the versions of the tables it reads.
+
+    The ETag is derived from the request URL and the table versions, so a
+    matching If-None-Match (or an If-Modified-Since not older than the last
+    write) is answered with 304 before the view runs and loads any rows.
+    '''
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            versions, last_modified = table_versions(tables)
+            key = request.full_path + '|' + ','.join(
+                f'{table}:{versions[table]}' for table in sorted(versions))
+            etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+            if last_modified is not None:
+                # HTTP dates have whole seconds; round up so a second write in
+                # the same second is still newer than the date a client holds
+                last_modified = last_modified.replace(microsecond=0) + timedelta(seconds=1)
+
+            not_modified = False
+            if request.if_none_match:
+                not_modified = etag in request.if_none_match
+            elif request.if_modified_since and last_modified is not None:
+                not_modified = last_modified <= request.if_modified_since.replace(tzinfo=None)
+
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # Only once that second is over, or a later write could share it
+            if last_modified is not None and last_modified <= datetime.utcnow():
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return decorated
+    return decorator
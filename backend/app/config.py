@@ -13,10 +13,41 @@ class Config:
     JWT_SECRET = '123456'
     JWT_EXPIRATION = 86400  # in seconds
     JWT_ALGORITHM = 'HS256'
+    # Authorize from the signed token claims without loading the user.
+    # Role and username changes then take effect at the next login.
+    AUTH_STATELESS = False
+    # Token revocation (logout)
+    REVOCATION_CAPACITY = 100000
+    REVOCATION_SYNC_INTERVAL = 5  # in seconds
+    # Password hashing
+    BCRYPT_ROUNDS = 12
+    BCRYPT_WORKERS = None  # defaults to the number of CPUs
+    BCRYPT_MAX_PENDING = 64
+    BULK_USER_CHUNK_SIZE = 500
+    # Verified token claims cache (per process)
+    TOKEN_CACHE_SIZE = 4096
+    # Authenticated user cache (per process)
+    USER_CACHE_SIZE = 1024
+    USER_CACHE_TTL = 60  # in seconds
     # File manager
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg',
                           'jpeg', 'gif', 'docx', 'doc', 'xlsx', 'xls'}
+    # Use orjson for responses when it is installed
+    JSON_FAST_ENCODER = True
+    # Pagination
+    PAGE_DEFAULT_LIMIT = 50
+    PAGE_MAX_LIMIT = 500
+    # Rows fetched and flushed per batch by ?stream=true list responses
+    STREAM_BATCH_SIZE = 1000
+    # Per-process cache of program-wide computations (contribution matrix)
+    PROGRAM_CACHE_SIZE = 128
+    # Student score CSV imports, rows written per chunk
+    SCORE_IMPORT_CHUNK_SIZE = 5000
+    # Processes computing attainment for several programs at once
+    ATTAINMENT_WORKERS = None  # defaults to the number of CPUs
+    # Link and relation weight history, a program snapshot every N logged changes
+    HISTORY_SNAPSHOT_INTERVAL = 1000
 
 
 class ProductionConfig(Config):
@@ -1,8 +1,16 @@
 from flask import Blueprint, request, jsonify
 from app import db
-from app.models.models import Module, Observation, ModObsRel
+from app.models.models import Module, Observation, ModObsRel, Program
 from flasgger import swag_from
 from app.common.decorators import token_required, role_required
+from app.common.versioning import versioned
+from app.common.pagination import paginate, fetch_all, PAGINATION_PARAMETERS
+from app.common.streaming import stream_json, wants_stream, STREAM_PARAMETER
+from app.common.serializers import serializers
+from app.common.upsert import upsert
+from app.common.matrix import read_matrix, MATRIX_PARAMETERS, MATRIX_REPORT_SCHEMA
+from app.services.history import track_weights
+from app.services.services import import_link_matrix
 
 link_bp = Blueprint('link_bp', __name__)
 
@@ -83,32 +91,24 @@ def create_or_update_link(current_user):
     if not Module.query.get(module_id):
         return jsonify(message='Module ID is invalid or does not exist'), 400
 
-    # Check if the link already exists
-    link = ModObsRel.query.filter_by(
-        observation_id=observation_id, module_id=module_id).first()
+    # Upsert on the (module_id, observation_id) unique constraint, the lookup only
+    # decides which response to send
+    key = {'observation_id': observation_id, 'module_id': module_id}
+    exists = db.session.query(ModObsRel.mod_obs_id).filter_by(**key).first() is not None
+    with track_weights(ModObsRel, ModObsRel.module_id == module_id,
+                       ModObsRel.observation_id == observation_id):
+        upsert(ModObsRel, [dict(key, weight=weight)], tuple(key), update=('weight',))
+    db.session.commit()
 
-    if link:
-        # Update the existing link
-        link.weight = weight
-        db.session.commit()
+    if exists:
         return jsonify(message='Link updated'), 200
-    else:
-        # Create a new link
-        new_link = ModObsRel(
-            observation_id=observation_id, module_id=module_id, weight=weight)
-        db.session.add(new_link)
-        db.session.commit()
-        return jsonify({
-            'mod_obs_id': new_link.mod_obs_id,
-            'observation_id': new_link.observation_id,
-            'module_id': new_link.module_id,
-            'weight': new_link.weight
-        }), 201
+    return jsonify(serializers[ModObsRel](ModObsRel.query.filter_by(**key).one())), 201
 
 
 @link_bp.route('/links/<int:mod_obs_id>', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('modobsrel')
 @swag_from({
     'tags': ['Link'],
     'description': 'Retrieve a specific link between a module and an observation by its ID.',
@@ -148,12 +148,7 @@ def create_or_update_link(current_user):
 def get_link(current_user, mod_obs_id: int):
     attr_obj_rel = ModObsRel.query.get(mod_obs_id)
     if attr_obj_rel:
-        return jsonify({
-            'mod_obs_id': attr_obj_rel.mod_obs_id,
-            'observation_id': attr_obj_rel.observation_id,
-            'module_id': attr_obj_rel.module_id,
-            'weight': attr_obj_rel.weight
-        }), 200
+        return jsonify(serializers[ModObsRel](attr_obj_rel)), 200
     else:
         return jsonify(message='Link not found'), 404
 
@@ -197,7 +192,8 @@ def get_link(current_user, mod_obs_id: int):
 def delete_link(current_user, mod_obs_id: int):
     attr_obj_rel = ModObsRel.query.get(mod_obs_id)
     if attr_obj_rel:
-        db.session.delete(attr_obj_rel)
+        with track_weights(ModObsRel, ModObsRel.mod_obs_id == mod_obs_id):
+            db.session.delete(attr_obj_rel)
         db.session.commit()
         return jsonify(message='Link deleted'), 200
     else:
@@ -207,6 +203,7 @@ def delete_link(current_user, mod_obs_id: int):
 @link_bp.route('/links', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('modobsrel', 'module')
 @swag_from({
     'tags': ['Link'],
     'description': 'List all link or filter by specific observation or module ID.',
@@ -224,8 +221,15 @@ def delete_link(current_user, mod_obs_id: int):
             'type': 'integer',
             'required': False,
             'description': 'Filter by a specific module ID'
+        },
+        {
+            'name': 'program_id',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Filter by the program of the module'
         }
-    ],
+    ] + PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
             'description': 'List of links',
@@ -252,22 +256,25 @@ def delete_link(current_user, mod_obs_id: int):
 def list_links(current_user):
     observation_id = request.args.get('observation_id')
     module_id = request.args.get('module_id')
-    query = ModObsRel.query
+    program_id = request.args.get('program_id')
+    serializer = serializers[ModObsRel]
+    query = serializer.select()
 
     if observation_id:
         query = query.filter(ModObsRel.observation_id == observation_id)
     if module_id:
         query = query.filter(ModObsRel.module_id == module_id)
+    if program_id:
+        query = query.join(Module, Module.module_id == ModObsRel.module_id).filter(
+            Module.program_id == program_id)
 
-    links = query.all()
-    links_list = [{
-        'mod_obs_id': rel.mod_obs_id,
-        'observation_id': rel.observation_id,
-        'module_id': rel.module_id,
-        'weight': rel.weight
-    } for rel in links]
+    if wants_stream():
+        return stream_json('links', query.order_by(ModObsRel.mod_obs_id), serializer.row)
 
-    return jsonify(links=links_list), 200
+    links, next_cursor = paginate(query, {'weight': ModObsRel.weight})
+    links_list = serializer.rows(links)
+
+    return jsonify(links=links_list, next_cursor=next_cursor), 200
 
 
 @link_bp.route('/modules/<int:module_id>/supports', methods=['POST'])
@@ -330,26 +337,15 @@ def create_or_update_module_supports(current_user, module_id: int):
     if not observations:
         return jsonify(message='Observations data is required'), 400
 
-    for obj in observations:
-        # Check for existing link
-        existing_link = ModObsRel.query.filter_by(
-            observation_id=obj['observation_id'],
-            module_id=module_id
-        ).first()
-
-        if existing_link:
-            # Update existing link
-            existing_link.weight = obj.get(
-                'weight', existing_link.weight)
-        else:
-            # Create new link
-            new_link = ModObsRel(
-                observation_id=obj['observation_id'],
-                module_id=module_id,
-                weight=obj.get('weight', 1)
-            )
-            db.session.add(new_link)
-
+    # Pairs sent without a weight keep their current one, or get 1 when new
+    keys = ('module_id', 'observation_id')
+    with track_weights(ModObsRel, ModObsRel.module_id == module_id):
+        upsert(ModObsRel, [
+            {'module_id': module_id, 'observation_id': obj['observation_id'], 'weight': obj['weight']}
+            for obj in observations if 'weight' in obj], keys, update=('weight',))
+        upsert(ModObsRel, [
+            {'module_id': module_id, 'observation_id': obj['observation_id'], 'weight': 1}
+            for obj in observations if 'weight' not in obj], keys)
     db.session.commit()
     return jsonify(message='Supports created or updated successfully'), 201
 
@@ -357,6 +353,7 @@ def create_or_update_module_supports(current_user, module_id: int):
 @link_bp.route('/modules/<int:module_id>/supports', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('modobsrel')
 @swag_from({
     'tags': ['Module'],
     'description': 'Retrieve all links (supports) for a given module.',
@@ -393,13 +390,9 @@ def create_or_update_module_supports(current_user, module_id: int):
     }
 })
 def get_module_supports(current_user, module_id):
-    supports = ModObsRel.query.filter_by(module_id=module_id).all()
-    supports_data = [{
-        'mod_obs_id': support.mod_obs_id,
-        'observation_id': support.observation_id,
-        'module_id': support.module_id,
-        'weight': support.weight
-    } for support in supports]
+    serializer = serializers[ModObsRel]
+    supports = fetch_all(serializer.select().filter_by(module_id=module_id))
+    supports_data = serializer.rows(supports)
 
     return jsonify(supports=supports_data), 200
 
@@ -426,7 +419,8 @@ def get_module_supports(current_user, module_id):
     }
 })
 def delete_module_supports(current_user, module_id: int):
-    ModObsRel.query.filter_by(module_id=module_id).delete()
+    with track_weights(ModObsRel, ModObsRel.module_id == module_id):
+        ModObsRel.query.filter_by(module_id=module_id).delete()
     db.session.commit()
     return jsonify(message='Supports deleted successfully'), 200
 
@@ -476,24 +470,10 @@ def create_or_update_observation_supported_by(current_user, observation_id: int)
     if not modules:
         return jsonify(message='Modules data is required'), 400
 
-    for attr in modules:
-        link = ModObsRel.query.filter_by(
-            observation_id=observation_id,
-            module_id=attr['module_id']
-        ).first()
-
-        if link:
-            # Update the existing link
-            link.weight = attr.get('weight', 1)
-        else:
-            # Create a new link
-            new_link = ModObsRel(
-                observation_id=observation_id,
-                module_id=attr['module_id'],
-                weight=attr.get('weight', 1)
-            )
-            db.session.add(new_link)
-
+    with track_weights(ModObsRel, ModObsRel.observation_id == observation_id):
+        upsert(ModObsRel, [
+            {'module_id': attr['module_id'], 'observation_id': observation_id, 'weight': attr.get('weight', 1)}
+            for attr in modules], ('module_id', 'observation_id'), update=('weight',))
     db.session.commit()
     return jsonify(message='Supported by links created or updated successfully'), 201
 
@@ -501,6 +481,7 @@ def create_or_update_observation_supported_by(current_user, observation_id: int)
 @link_bp.route('/observations/<int:observation_id>/supported-by', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('modobsrel')
 @swag_from({
     'tags': ['Observation'],
     'description': 'List all links where an observation is supported by modules.',
@@ -540,13 +521,9 @@ def create_or_update_observation_supported_by(current_user, observation_id: int)
     }
 })
 def get_observation_supported_by(current_user, observation_id: int):
-    links = ModObsRel.query.filter_by(observation_id=observation_id).all()
-    links_list = [{
-        'mod_obs_id': link.mod_obs_id,
-        'observation_id': link.observation_id,
-        'module_id': link.module_id,
-        'weight': link.weight
-    } for link in links]
+    serializer = serializers[ModObsRel]
+    links = fetch_all(serializer.select().filter_by(observation_id=observation_id))
+    links_list = serializer.rows(links)
 
     if not links_list:
         return jsonify(message='No links found for this observation'), 404
@@ -579,6 +556,45 @@ def get_observation_supported_by(current_user, observation_id: int):
     }
 })
 def delete_observation_supported_by(current_user, observation_id: int):
-    ModObsRel.query.filter_by(observation_id=observation_id).delete()
+    with track_weights(ModObsRel, ModObsRel.observation_id == observation_id):
+        ModObsRel.query.filter_by(observation_id=observation_id).delete()
     db.session.commit()
     return jsonify(message='Supported by links deleted successfully'), 200
+
+
+@link_bp.route('/programs/<int:program_id>/links/matrix', methods=['PUT'])
+@token_required
+@role_required('admin')
+@swag_from({
+    'tags': ['Link'],
+    'description': 'Replace the module x observation weights of a program with a whole matrix. Rows are keyed by '
+                   'module number and columns by observation name. Pairs whose row and column are both in the '
+                   'matrix are inserted, updated or deleted to match it in one transaction; other pairs '
+                   'are left alone.',
+    'consumes': ['application/json', 'multipart/form-data', 'text/csv'],
+    'parameters': [
+        {
+            'name': 'program_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The ID of the program'
+        }
+    ] + MATRIX_PARAMETERS,
+    'responses': {
+        200: {
+            'description': 'Counts of the rows that were changed',
+            'schema': MATRIX_REPORT_SCHEMA
+        },
+        400: {
+            'description': 'The matrix could not be read or uses unknown keys'
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def replace_link_matrix(current_user, program_id: int):
+    if not Program.query.get(program_id):
+        return jsonify(message='Program not found'), 404
+    return jsonify(import_link_matrix(program_id, read_matrix())), 200
@@ -3,6 +3,10 @@ from app import db
 from app.models.models import Material, Module, Tag
 from app.common.local_storage import LocalFileManager
 from app.common.decorators import token_required
+from app.common.pagination import paginate, PAGINATION_PARAMETERS
+from app.common.streaming import stream_json, wants_stream, STREAM_PARAMETER
+from app.common.projection import parse_fields, FIELDS_PARAMETER
+from app.common.serializers import serializers
 from app.tasks import send_notification
 from werkzeug.utils import secure_filename
 from flasgger import swag_from
@@ -161,16 +165,7 @@ def create_material(current_user):
     send_notification.delay(
         current_user.user_id, f'New material uploaded: \n{module.name}\n{tag.name}\n{new_material.title}')
 
-    return jsonify({
-        'material_id': new_material.material_id,
-        'title': new_material.title,
-        'description': new_material.description,
-        'file_path': new_material.file_path,
-        'user_id': new_material.user_id,
-        'module_id': new_material.module_id,
-        'tag_id': new_material.tag_id,
-        'created_at': new_material.created_at
-    }), 201
+    return jsonify(serializers[Material](new_material)), 201
 
 
 @material_bp.route('/<int:material_id>', methods=['PUT'])
@@ -322,17 +317,7 @@ def update_material(current_user, material_id: int):
     send_notification.delay(
         current_user.user_id, f'The material is updated successfully: \n{Module.query.get(material.module_id).name}\n{Tag.query.get(material.tag_id).name}\n{material.title}')
 
-    return jsonify({
-        'material_id': material.material_id,
-        'title': material.title,
-        'description': material.description,
-        'file_path': material.file_path,
-        'user_id': material.user_id,
-        'module_id': material.module_id,
-        'tag_id': material.tag_id,
-        'created_at': material.created_at,
-        'updated_at': material.updated_at
-    }), 200
+    return jsonify(serializers[Material](material)), 200
 
 
 @material_bp.route('/<int:material_id>', methods=['DELETE'])
@@ -528,7 +513,7 @@ def get_material(current_user, material_id: int):
             'description': 'Filter materials by tag ID',
             'required': False
         }
-    ],
+    ] + PAGINATION_PARAMETERS + [FIELDS_PARAMETER, STREAM_PARAMETER],
     'responses': {
         '200': {
             'description': 'A list of materials',
@@ -553,7 +538,8 @@ def get_material(current_user, material_id: int):
     }
 })
 def get_materials_list(current_user):
-    materials_query = Material.query
+    serializer = serializers[Material].only(parse_fields(Material))
+    materials_query = serializer.select()
 
     # Optional filters
     title_filter = request.args.get('title')
@@ -568,20 +554,18 @@ def get_materials_list(current_user):
     if tag_id_filter:
         materials_query = materials_query.filter_by(tag_id=tag_id_filter)
 
-    materials = materials_query.all()
-    materials_data = [{
-        'material_id': material.material_id,
-        'title': material.title,
-        'description': material.description,
-        'file_path': material.file_path,
-        'user_id': material.user_id,
-        'module_id': material.module_id,
-        'tag_id': material.tag_id,
-        'created_at': material.created_at,
-        'updated_at': material.updated_at
-    } for material in materials]
-
-    return jsonify(materials=materials_data), 200
+    if wants_stream():
+        return stream_json('materials', materials_query.order_by(Material.material_id),
+                           serializer.row)
+
+    materials, next_cursor = paginate(materials_query, {
+        'title': Material.title,
+        'created_at': Material.created_at,
+        'updated_at': Material.updated_at
+    })
+    materials_data = serializer.rows(materials)
+
+    return jsonify(materials=materials_data, next_cursor=next_cursor), 200
 
 
 @material_bp.route('/<int:material_id>/download', methods=['GET'])
@@ -10,13 +10,6 @@ class User(db.Model):
     role = db.Column(
         db.Enum('admin', 'staff', 'auditor', 'guest'), nullable=False)
 
-    def serialize(self):
-        return {
-            'user_id': self.user_id,
-            'username': self.username,
-            'role': self.role
-        }
-
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -27,10 +20,12 @@ class Program(db.Model):
     name = db.Column(db.String, nullable=False)
     description = db.Column(db.Text)
     version = db.Column(db.String)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     # Relationships
-    attributes = db.relationship('Attribute', backref='program', lazy=True)
-    objectives = db.relationship('Objective', backref='program', lazy=True)
-    modules = db.relationship('Module', backref='program', lazy=True)
+    attributes = db.relationship('Attribute', backref='program', lazy=True, passive_deletes=True)
+    objectives = db.relationship('Objective', backref='program', lazy=True, passive_deletes=True)
+    modules = db.relationship('Module', backref='program', lazy=True, passive_deletes=True)
 
     def __repr__(self):
         return f'<Program {self.name}>'
@@ -42,7 +37,9 @@ class Objective(db.Model):
     name = db.Column(db.String, nullable=False)
     description = db.Column(db.Text)
     program_id = db.Column(db.Integer, db.ForeignKey(
-        'program.program_id'), nullable=False)
+        'program.program_id', ondelete='CASCADE'), nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f'<Objective {self.name}>'
@@ -54,9 +51,12 @@ class Attribute(db.Model):
     name = db.Column(db.String, nullable=False)
     description = db.Column(db.Text)
     program_id = db.Column(db.Integer, db.ForeignKey(
-        'program.program_id'), nullable=False)
+        'program.program_id', ondelete='CASCADE'), nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     observations = db.relationship(
-        'Observation', backref='attribute', lazy=True)
+        'Observation', backref='attribute', lazy=True, passive_deletes=True)
+    relations = db.relationship('AttrObjRel', lazy=True, viewonly=True)
 
     def __repr__(self):
         return f'<Attribute {self.name}>'
@@ -64,12 +64,15 @@ class Attribute(db.Model):
 
 class AttrObjRel(db.Model):
     __tablename__ = 'attrobjrel'
+    __table_args__ = (db.UniqueConstraint('attribute_id', 'objective_id', name='uq_attrobjrel_attribute_id_objective_id'),)
     attr_obj_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     attribute_id = db.Column(db.Integer, db.ForeignKey(
-        'attribute.attribute_id'), nullable=False)
+        'attribute.attribute_id', ondelete='CASCADE'), nullable=False)
     objective_id = db.Column(db.Integer, db.ForeignKey(
-        'objective.objective_id'), nullable=False)
+        'objective.objective_id', ondelete='CASCADE'), nullable=False)
     weight = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f'<AttrObjRel {self.attr_obj_id}>'
@@ -82,7 +85,9 @@ class Observation(db.Model):
     name = db.Column(db.String, nullable=False)
     description = db.Column(db.Text)
     attribute_id = db.Column(db.Integer, db.ForeignKey(
-        'attribute.attribute_id'), nullable=False)
+        'attribute.attribute_id', ondelete='CASCADE'), nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f'<Observation {self.name}>'
@@ -105,8 +110,11 @@ class Module(db.Model):
     offered_by = db.Column(db.String)
     description = db.Column(db.Text)
     program_id = db.Column(db.Integer, db.ForeignKey(
-        'program.program_id'), nullable=False)
-    materials = db.relationship('Material', backref='module', lazy=True)
+        'program.program_id', ondelete='CASCADE'), nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    materials = db.relationship('Material', backref='module', lazy=True, passive_deletes=True)
+    links = db.relationship('ModObsRel', lazy=True, viewonly=True)
 
     def __repr__(self):
         return f'<Module {self.name}>'
@@ -114,17 +122,52 @@ class Module(db.Model):
 
 class ModObsRel(db.Model):
     __tablename__ = 'modobsrel'
+    __table_args__ = (db.UniqueConstraint('module_id', 'observation_id', name='uq_modobsrel_module_id_observation_id'),)
     mod_obs_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     module_id = db.Column(db.Integer, db.ForeignKey(
-        'module.module_id'), nullable=False)
+        'module.module_id', ondelete='CASCADE'), nullable=False)
     observation_id = db.Column(db.Integer, db.ForeignKey(
-        'observation.observation_id'), nullable=False)
+        'observation.observation_id', ondelete='CASCADE'), nullable=False)
     weight = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f'<ModObsRel {self.mod_obs_id}>'
 
 
+class Student(db.Model):
+    __tablename__ = 'student'
+    __table_args__ = (db.UniqueConstraint('program_id', 'number', name='uq_student_program_id_number'),)
+    student_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    number = db.Column(db.String, nullable=False)  # Student number, unique per program
+    name = db.Column(db.String)
+    cohort = db.Column(db.String, index=True)
+    program_id = db.Column(db.Integer, db.ForeignKey(
+        'program.program_id', ondelete='CASCADE'), nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Student {self.number}>'
+
+
+class Score(db.Model):
+    __tablename__ = 'score'
+    __table_args__ = (db.UniqueConstraint('student_id', 'module_id', name='uq_score_student_id_module_id'),)
+    score_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    student_id = db.Column(db.Integer, db.ForeignKey(
+        'student.student_id', ondelete='CASCADE'), nullable=False)
+    module_id = db.Column(db.Integer, db.ForeignKey(
+        'module.module_id', ondelete='CASCADE'), nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)  # 0 to 100
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Score {self.score_id}>'
+
+
 class Tag(db.Model):
     __tablename__ = 'tag'
     tag_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -132,6 +175,8 @@ class Tag(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey(
         'user.user_id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f'<Tag {self.name}>'
@@ -149,7 +194,7 @@ class Material(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey(
         'user.user_id'), nullable=False)
     module_id = db.Column(db.Integer, db.ForeignKey(
-        'module.module_id'), nullable=False)
+        'module.module_id', ondelete='CASCADE'), nullable=False)
     tag_id = db.Column(db.Integer, db.ForeignKey('tag.tag_id'), nullable=False)
 
     def __repr__(self):
@@ -160,20 +205,12 @@ class Comment(db.Model):
     __tablename__ = 'comment'
     comment_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     text = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(
+        db.DateTime, default=datetime.utcnow, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey(
         'user.user_id'), nullable=False)
     material_id = db.Column(db.Integer, db.ForeignKey(
-        'material.material_id'), nullable=False)
-
-    def serialize(self):
-        return {
-            'comment_id': self.comment_id,
-            'text': self.text,
-            'created_at': self.created_at.isoformat(),
-            'user_id': self.user_id,
-            'material_id': self.material_id
-        }
+        'material.material_id', ondelete='CASCADE'), nullable=False)
 
     def __repr__(self):
         return f'<Comment {self.comment_id}>'
@@ -184,17 +221,66 @@ class Notification(db.Model):
     notification_id = db.Column(
         db.Integer, primary_key=True, autoincrement=True)
     message = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(
+        db.DateTime, default=datetime.utcnow, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey(
         'user.user_id'), nullable=False)  # Receiver of the Notification
 
-    def serialize(self):
-        return {
-            'notification_id': self.notification_id,
-            'message': self.message,
-            'user_id': self.user_id,
-            'created_at': self.created_at.isoformat()
-        }
-
     def __repr__(self):
         return f'<Notification {self.notification_id}>'
+
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_token'
+    # Token jti, or "user:<user_id>" to revoke every token of a user
+    jti = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
+
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_version'
+    # Bumped on every write to the table, see app.common.versioning
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<TableVersion {self.table_name} {self.version}>'
+
+
+class WeightChange(db.Model):
+    __tablename__ = 'weight_change'
+    __table_args__ = (db.Index('ix_weight_change_program', 'program_id', 'change_id'),)
+    # Append-only log of ModObsRel and AttrObjRel edits, see app.services.history
+    change_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    program_id = db.Column(db.Integer, db.ForeignKey(
+        'program.program_id', ondelete='CASCADE'), nullable=False)
+    table_name = db.Column(db.String(16), nullable=False)  # modobsrel or attrobjrel
+    row_id = db.Column(db.Integer, nullable=False)  # module_id or attribute_id
+    column_id = db.Column(db.Integer, nullable=False)  # observation_id or objective_id
+    weight = db.Column(db.Integer)  # None when the pair was removed
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<WeightChange {self.change_id}>'
+
+
+class WeightSnapshot(db.Model):
+    __tablename__ = 'weight_snapshot'
+    __table_args__ = (db.Index('ix_weight_snapshot_program', 'program_id', 'change_id'),)
+    # Both weight tables of a program after every change up to change_id
+    snapshot_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    program_id = db.Column(db.Integer, db.ForeignKey(
+        'program.program_id', ondelete='CASCADE'), nullable=False)
+    change_id = db.Column(db.Integer, nullable=False)
+    links = db.Column(db.LargeBinary, nullable=False)
+    relations = db.Column(db.LargeBinary, nullable=False)
+    taken_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<WeightSnapshot {self.snapshot_id}>'
@@ -3,6 +3,12 @@ from app import db
 from app.models.models import Module, Program
 from flasgger import swag_from
 from app.common.decorators import token_required, role_required
+from app.common.versioning import versioned
+from app.common.pagination import paginate, PAGINATION_PARAMETERS
+from app.common.streaming import stream_json, wants_stream, STREAM_PARAMETER
+from app.common.projection import parse_fields, FIELDS_PARAMETER
+from app.common.serializers import serializers
+from app.services import cascade
 
 module_bp = Blueprint('module_bp', __name__,
                       url_prefix='/modules')
@@ -218,28 +224,13 @@ def create_module(current_user):
     db.session.add(new_module)
     db.session.commit()
 
-    return jsonify({
-        'module_id': new_module.module_id,
-        'name': new_module.name,
-        'name_en': new_module.name_en,
-        'nature': new_module.nature,
-        'category': new_module.category,
-        'number': new_module.number,
-        'credit': str(new_module.credit),
-        'lec_hours': new_module.lec_hours,
-        'lab_hours': new_module.lab_hours,
-        'oncampus_prac': new_module.oncampus_prac,
-        'offcampus_prac': new_module.offcampus_prac,
-        'term': new_module.term,
-        'offered_by': new_module.offered_by,
-        'description': new_module.description,
-        'program_id': new_module.program_id
-    }), 201
+    return jsonify(serializers[Module](new_module)), 201
 
 
 @module_bp.route('/<int:module_id>', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('module')
 @swag_from({
     'tags': ['Module'],
     'description': 'Get details of a specific module by ID.',
@@ -278,23 +269,7 @@ def create_module(current_user):
 def get_module(current_user, module_id: int):
     module = Module.query.get(module_id)
     if module:
-        return jsonify({
-            'module_id': module.module_id,
-            'name': module.name,
-            'name_en': module.name_en,
-            'nature': module.nature,
-            'category': module.category,
-            'number': module.number,
-            'credit': str(module.credit),
-            'lec_hours': module.lec_hours,
-            'lab_hours': module.lab_hours,
-            'oncampus_prac': module.oncampus_prac,
-            'offcampus_prac': module.offcampus_prac,
-            'term': module.term,
-            'offered_by': module.offered_by or '',
-            'description': module.description,
-            'program_id': module.program_id
-        }), 200
+        return jsonify(serializers[Module](module)), 200
     else:
         return jsonify(message='Module not found'), 404
 
@@ -421,7 +396,8 @@ def update_module(current_user, module_id: int):
 @role_required('admin')
 @swag_from({
     'tags': ['Module'],
-    'description': 'Delete a module by its ID.',
+    'description': 'Delete a module by its ID, together with its links, materials, comments and '
+                   'scores. Uploaded material files are removed in the background.',
     'parameters': [
         {
             'name': 'module_id',
@@ -434,6 +410,13 @@ def update_module(current_user, module_id: int):
     'responses': {
         200: {
             'description': 'Module deleted successfully',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'message': {'type': 'string'},
+                    'deleted': {'type': 'object', 'description': 'Rows deleted per table'}
+                }
+            }
         },
         404: {
             'description': 'Module not found',
@@ -445,15 +428,15 @@ def delete_module(current_user, module_id: int):
     if not module:
         return jsonify(message='Module not found'), 404
 
-    db.session.delete(module)
-    db.session.commit()
+    deleted = cascade.delete_module(module_id)
 
-    return jsonify(message='Module deleted successfully'), 200
+    return jsonify(message='Module deleted successfully', deleted=deleted), 200
 
 
 @module_bp.route('', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('module')
 @swag_from({
     'tags': ['Module'],
     'description': 'Retrieve a list of all modules',
@@ -473,7 +456,7 @@ def delete_module(current_user, module_id: int):
             'description': 'Filter by offering department',
         },
         # Add more filters as required
-    ],
+    ] + PAGINATION_PARAMETERS + [FIELDS_PARAMETER, STREAM_PARAMETER],
     'responses': {
         200: {
             'description': 'A list of modules',
@@ -539,7 +522,8 @@ def delete_module(current_user, module_id: int):
     }
 })
 def list_modules(current_user):
-    query = Module.query
+    serializer = serializers[Module].only(parse_fields(Module))
+    query = serializer.select()
     name = request.args.get('name')
     offered_by = request.args.get('offered_by')
 
@@ -548,23 +532,10 @@ def list_modules(current_user):
     if offered_by:
         query = query.filter(Module.offered_by.ilike(f'%{offered_by}%'))
 
-    modules = query.all()
-    modules_list = [{
-        'module_id': mod.module_id,
-        'name': mod.name,
-        'name_en': mod.name_en,
-        'nature': mod.nature,
-        'category': mod.category,
-        'number': mod.number,
-        'credit': mod.credit,
-        'lec_hours': mod.lec_hours,
-        'lab_hours': mod.lab_hours,
-        'oncampus_prac': mod.oncampus_prac,
-        'offcampus_prac': mod.offcampus_prac,
-        'term': mod.term,
-        'offered_by': mod.offered_by or '',
-        'description': mod.description,
-        'program_id': mod.program_id,
-    } for mod in modules]
+    if wants_stream():
+        return stream_json('modules', query.order_by(Module.module_id), serializer.row)
+
+    modules, next_cursor = paginate(query, {'name': Module.name})
+    modules_list = serializer.rows(modules)
 
-    return jsonify(modules=modules_list), 200
+    return jsonify(modules=modules_list, next_cursor=next_cursor), 200
@@ -3,6 +3,9 @@ from app import db
 from app.models.models import Notification
 from flasgger import swag_from
 from app.common.decorators import token_required, role_required
+from app.common.pagination import paginate, PAGINATION_PARAMETERS
+from app.common.streaming import stream_json, wants_stream, STREAM_PARAMETER
+from app.common.serializers import serializers
 
 notification_bp = Blueprint(
     'notification_bp', __name__, url_prefix='/notifications')
@@ -177,7 +180,7 @@ def get_notification(current_user, notification_id: int):
     if not notification:
         return jsonify({'message': 'Notification not found'}), 404
 
-    return jsonify(notification.serialize()), 200
+    return jsonify(serializers[Notification](notification)), 200
 
 
 @notification_bp.route('/<int:notification_id>', methods=['DELETE'])
@@ -253,34 +256,45 @@ def delete_notification(current_user, notification_id: int):
             'required': False,
             'description': 'Filter notifications created after a specific date and time'
         }
-    ],
+    ] + PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         '200': {
             'description': 'List of notifications',
             'content': {
                 'application/json': {
                     'schema': {
-                        'type': 'array',
-                        'items': {
-                            '$ref': '#/components/schemas/Notification'
+                        'type': 'object',
+                        'properties': {
+                            'notifications': {
+                                'type': 'array',
+                                'items': {
+                                    '$ref': '#/components/schemas/Notification'
+                                }
+                            },
+                            'next_cursor': {
+                                'type': 'string'
+                            }
                         }
                     },
                     'examples': {
                         'application/json': {
-                            'value': [
-                                {
-                                    'notification_id': 1,
-                                    'message': 'Notification message',
-                                    'user_id': 2,
-                                    'created_at': '2023-11-11T12:00:00Z'
-                                },
-                                {
-                                    'notification_id': 2,
-                                    'message': 'Another notification message',
-                                    'user_id': 3,
-                                    'created_at': '2023-11-10T11:00:00Z'
-                                }
-                            ]
+                            'value': {
+                                'notifications': [
+                                    {
+                                        'notification_id': 1,
+                                        'message': 'Notification message',
+                                        'user_id': 2,
+                                        'created_at': '2023-11-11T12:00:00Z'
+                                    },
+                                    {
+                                        'notification_id': 2,
+                                        'message': 'Another notification message',
+                                        'user_id': 3,
+                                        'created_at': '2023-11-10T11:00:00Z'
+                                    }
+                                ],
+                                'next_cursor': None
+                            }
                         }
                     }
                 }
@@ -292,7 +306,8 @@ def delete_notification(current_user, notification_id: int):
     }
 })
 def get_notifications(current_user):
-    query = Notification.query
+    serializer = serializers[Notification]
+    query = serializer.select()
     message = request.args.get('message')
     created_before = request.args.get('created_before')
     created_after = request.args.get('created_after')
@@ -304,5 +319,10 @@ def get_notifications(current_user):
     if created_after:
         query = query.filter(Notification.created_at >= created_after)
 
-    notifications = query.all()
-    return jsonify([notification.serialize() for notification in notifications]), 200
+    if wants_stream():
+        return stream_json('notifications', query.order_by(Notification.notification_id),
+                           serializer.row)
+
+    notifications, next_cursor = paginate(
+        query, {'created_at': Notification.created_at}, default='-created_at')
+    return jsonify(notifications=serializer.rows(notifications), next_cursor=next_cursor), 200
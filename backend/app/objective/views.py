@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify
 from app import db
-from app.models.models import Objective, Program
+from app.models.models import Objective, Program, AttrObjRel
 from flasgger import swag_from
 from app.common.decorators import token_required, role_required
+from app.common.versioning import versioned
+from app.common.pagination import paginate, PAGINATION_PARAMETERS
+from app.common.projection import parse_fields, FIELDS_PARAMETER
+from app.common.serializers import serializers
+from app.services.history import track_weights
 
 objective_bp = Blueprint('objective', __name__, url_prefix='/objectives')
 
@@ -81,12 +86,7 @@ def create_objective(current_user):
             name=name, description=description, program_id=program_id)
         db.session.add(new_objective)
         db.session.commit()
-        return jsonify({
-            'objective_id': new_objective.objective_id,
-            'name': new_objective.name,
-            'description': new_objective.description,
-            'program_id': new_objective.program_id
-        }), 201
+        return jsonify(serializers[Objective](new_objective)), 201
     else:
         return jsonify(message='Name and program ID are required'), 400
 
@@ -171,17 +171,13 @@ def update_objective(current_user, objective_id: int):
     objective.name = data.get('name', objective.name)
     objective.description = data.get('description', objective.description)
     db.session.commit()
-    return jsonify({
-        'objective_id': objective.objective_id,
-        'name': objective.name,
-        'description': objective.description,
-        'program_id': objective.program_id
-    }), 200
+    return jsonify(serializers[Objective](objective)), 200
 
 
 @objective_bp.route('/<int:objective_id>', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('objective')
 @swag_from({
     'tags': ['Objective'],
     'description': 'Get a specific objective by ID',
@@ -227,12 +223,7 @@ def update_objective(current_user, objective_id: int):
 def get_objective(current_user, objective_id: int):
     objective = Objective.query.get(objective_id)
     if objective:
-        return jsonify({
-            'objective_id': objective.objective_id,
-            'name': objective.name,
-            'description': objective.description,
-            'program_id': objective.program_id
-        }), 200
+        return jsonify(serializers[Objective](objective)), 200
     else:
         return jsonify(message='Objective not found'), 404
 
@@ -274,7 +265,10 @@ def get_objective(current_user, objective_id: int):
 def delete_objective(current_user, objective_id: int):
     objective = Objective.query.get(objective_id)
     if objective:
-        db.session.delete(objective)
+        # Deleted explicitly, SQLite does not enforce the ON DELETE CASCADE
+        with track_weights(AttrObjRel, AttrObjRel.objective_id == objective_id):
+            AttrObjRel.query.filter_by(objective_id=objective_id).delete()
+            db.session.delete(objective)
         db.session.commit()
         return jsonify(message='Objective deleted'), 200
     else:
@@ -284,6 +278,7 @@ def delete_objective(current_user, objective_id: int):
 @objective_bp.route('', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('objective')
 @swag_from({
     'tags': ['Objective'],
     'description': 'List all objectives, with optional query parameters for filtering by program ID and/or name',
@@ -302,7 +297,7 @@ def delete_objective(current_user, objective_id: int):
             'required': False,
             'description': 'Filter objectives by name, case insensitive, partial match'
         }
-    ],
+    ] + PAGINATION_PARAMETERS + [FIELDS_PARAMETER],
     'responses': {
         200: {
             'description': 'A list of objectives',
@@ -359,16 +354,12 @@ def delete_objective(current_user, objective_id: int):
 def list_objectives(current_user):
     program_id = request.args.get('program_id')
     name = request.args.get('name')
-    query = Objective.query
+    serializer = serializers[Objective].only(parse_fields(Objective))
+    query = serializer.select()
     if program_id:
         query = query.filter(Objective.program_id == program_id)
     if name:
         query = query.filter(Objective.name.ilike(f'%{name}%'))
-    objectives = query.all()
-    objectives_data = [{
-        'objective_id': obj.objective_id,
-        'name': obj.name,
-        'description': obj.description,
-        'program_id': obj.program_id
-    } for obj in objectives]
-    return jsonify(objectives=objectives_data), 200
+    objectives, next_cursor = paginate(query, {'name': Objective.name})
+    objectives_data = serializer.rows(objectives)
+    return jsonify(objectives=objectives_data, next_cursor=next_cursor), 200
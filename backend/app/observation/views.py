@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify
 from app import db
-from app.models.models import Observation, Attribute
+from app.models.models import Observation, Attribute, ModObsRel
 from flasgger import swag_from
 from app.common.decorators import token_required, role_required
+from app.common.versioning import versioned
+from app.common.pagination import paginate, PAGINATION_PARAMETERS
+from app.common.projection import parse_fields, FIELDS_PARAMETER
+from app.common.serializers import serializers
+from app.services.history import track_weights
 
 observation_bp = Blueprint('observation_bp', __name__,
                            url_prefix='/observations')
@@ -64,17 +69,13 @@ def create_observation(current_user):
     db.session.add(new_observation)
     db.session.commit()
 
-    return jsonify({
-        'observation_id': new_observation.observation_id,
-        'name': new_observation.name,
-        'description': new_observation.description,
-        'attribute_id': new_observation.attribute_id
-    }), 201
+    return jsonify(serializers[Observation](new_observation)), 201
 
 
 @observation_bp.route('/<int:observation_id>', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('observation')
 @swag_from({
     'tags': ['Observation'],
     'description': 'Get a specific observation by its ID.',
@@ -99,12 +100,7 @@ def create_observation(current_user):
 def get_observation(current_user, observation_id: int):
     observation = Observation.query.get(observation_id)
     if observation:
-        return jsonify({
-            'observation_id': observation.observation_id,
-            'name': observation.name,
-            'description': observation.description,
-            'attribute_id': observation.attribute_id
-        }), 200
+        return jsonify(serializers[Observation](observation)), 200
     else:
         return jsonify(message='Observation not found'), 404
 
@@ -172,12 +168,7 @@ def update_observation(current_user, observation_id: int):
         'attribute_id', observation.attribute_id)
     db.session.commit()
 
-    return jsonify({
-        'observation_id': observation.observation_id,
-        'name': observation.name,
-        'description': observation.description,
-        'attribute_id': observation.attribute_id
-    }), 200
+    return jsonify(serializers[Observation](observation)), 200
 
 
 @observation_bp.route('/<int:observation_id>', methods=['DELETE'])
@@ -207,7 +198,10 @@ def update_observation(current_user, observation_id: int):
 def delete_observation(current_user, observation_id: int):
     observation = Observation.query.get(observation_id)
     if observation:
-        db.session.delete(observation)
+        # Deleted explicitly, SQLite does not enforce the ON DELETE CASCADE
+        with track_weights(ModObsRel, ModObsRel.observation_id == observation_id):
+            ModObsRel.query.filter_by(observation_id=observation_id).delete()
+            db.session.delete(observation)
         db.session.commit()
         return jsonify(message='Observation deleted'), 200
     else:
@@ -217,6 +211,7 @@ def delete_observation(current_user, observation_id: int):
 @observation_bp.route('', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('observation')
 @swag_from({
     'tags': ['Observation'],
     'description': 'List all observations or search by attribute ID.',
@@ -228,7 +223,7 @@ def delete_observation(current_user, observation_id: int):
             'required': False,
             'description': 'The attribute ID to filter observations'
         }
-    ],
+    ] + PAGINATION_PARAMETERS + [FIELDS_PARAMETER],
     'responses': {
         200: {
             'description': 'List of observations retrieved successfully'
@@ -237,15 +232,12 @@ def delete_observation(current_user, observation_id: int):
 })
 def list_observations(current_user):
     attribute_id = request.args.get('attribute_id')
-    query = Observation.query
+    serializer = serializers[Observation].only(parse_fields(Observation))
+    query = serializer.select()
     if attribute_id:
         query = query.filter(Observation.attribute_id == attribute_id)
-    observations = query.all()
-    observations_data = [{
-        'observation_id': obs.observation_id,
-        'name': obs.name,
-        'description': obs.description,
-        'attribute_id': obs.attribute_id
-    } for obs in observations]
-
-    return jsonify(observations=observations_data), 200
+    observations, next_cursor = paginate(
+        query, {'name': Observation.name})
+    observations_data = serializer.rows(observations)
+
+    return jsonify(observations=observations_data, next_cursor=next_cursor), 200
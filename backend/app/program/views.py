@@ -3,6 +3,20 @@ from app import db
 from app.models.models import Program
 from flasgger import swag_from
 from app.common.decorators import token_required, role_required
+from app.common.versioning import versioned
+from app.common.pagination import paginate, PAGINATION_PARAMETERS
+from app.common.projection import parse_fields, FIELDS_PARAMETER
+from app.common.serializers import serializers
+from app.common.program_cache import program_cache, program_version, PROGRAM_TABLES
+from app.services.matrices import load_program_matrices, contribution
+from app.services.tree import load_program_tree
+from app.services.simulation import simulate
+from app.services.coverage import coverage_report
+from app.services.set_cover import minimal_modules, COSTS
+from app.services.clone import clone_program
+from app.services.diff import diff_programs, ENTITIES
+from app.services import cascade
+from app.services.history import parse_as_of
 
 program_bp = Blueprint('program', __name__, url_prefix='/programs')
 
@@ -85,8 +99,7 @@ def create_program(current_user):
             name=name, description=description, version=version)
         db.session.add(new_program)
         db.session.commit()
-        return jsonify(program_id=new_program.program_id, name=new_program.name,
-                       description=new_program.description, version=new_program.version), 201
+        return jsonify(serializers[Program](new_program)), 201
     else:
         return jsonify(message='Name is required.'), 400
 
@@ -94,6 +107,7 @@ def create_program(current_user):
 @program_bp.route('/<int:program_id>', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('program')
 @swag_from({
     'tags': ['Program'],
     'description': 'Get a specific program by its ID',
@@ -147,8 +161,7 @@ def create_program(current_user):
 def get_program(current_user, program_id: int):
     program = Program.query.get(program_id)
     if program:
-        return jsonify(program_id=program.program_id, name=program.name,
-                       description=program.description, version=program.version), 200
+        return jsonify(serializers[Program](program)), 200
     return jsonify(message='Program not found'), 404
 
 
@@ -237,8 +250,7 @@ def update_program(current_user, program_id: int):
         program.description = data.get('description', program.description)
         program.version = data.get('version', program.version)
         db.session.commit()
-        return jsonify(program_id=program.program_id, name=program.name,
-                       description=program.description, version=program.version), 200
+        return jsonify(serializers[Program](program)), 200
     else:
         return jsonify(message='Program not found.'), 404
 
@@ -248,7 +260,9 @@ def update_program(current_user, program_id: int):
 @role_required('admin')
 @swag_from({
     'tags': ['Program'],
-    'description': 'Delete a program by its ID',
+    'description': 'Delete a program by its ID, together with its objectives, graduate attributes, '
+                   'observations, modules, relations, links, materials, students and scores. '
+                   'Uploaded material files are removed in the background.',
     'parameters': [
         {
             'name': 'program_id',
@@ -266,6 +280,10 @@ def update_program(current_user, program_id: int):
                 'properties': {
                     'message': {
                         'type': 'string'
+                    },
+                    'deleted': {
+                        'type': 'object',
+                        'description': 'Rows deleted per table'
                     }
                 }
             }
@@ -287,9 +305,8 @@ def delete_program(current_user, program_id: int):
     program = Program.query.get(program_id)
 
     if program:
-        db.session.delete(program)
-        db.session.commit()
-        return jsonify(message='Program deleted.'), 200
+        deleted = cascade.delete_program(program_id)
+        return jsonify(message='Program deleted.', deleted=deleted), 200
     else:
         return jsonify(message='Program not found.'), 404
 
@@ -297,6 +314,7 @@ def delete_program(current_user, program_id: int):
 @program_bp.route('', methods=['GET'])
 @token_required
 @role_required('admin')
+@versioned('program')
 @swag_from({
     'tags': ['Program'],
     'description': 'List/search all programs with optional query parameters for filtering by name and/or version',
@@ -315,7 +333,7 @@ def delete_program(current_user, program_id: int):
             'required': False,
             'description': 'Filter programs by version'
         }
-    ],
+    ] + PAGINATION_PARAMETERS + [FIELDS_PARAMETER],
     'responses': {
         200: {
             'description': 'A list of filtered programs, if any filters are provided; otherwise all programs',
@@ -354,19 +372,551 @@ def delete_program(current_user, program_id: int):
 def list_programs(current_user):
     name = request.args.get('name')
     version = request.args.get('version')
-    query = Program.query
+    serializer = serializers[Program].only(parse_fields(Program))
+    query = serializer.select()
 
     if name:
         query = query.filter(Program.name.ilike(f'%{name}%'))
     if version:
         query = query.filter(Program.version.ilike(f'%{version}%'))
 
-    programs = query.all()
-    programs_data = [{
-        'program_id': program.program_id,
-        'name': program.name,
-        'description': program.description,
-        'version': program.version
-    } for program in programs]
+    programs, next_cursor = paginate(query, {'name': Program.name})
+    programs_data = serializer.rows(programs)
+
+    return jsonify(programs=programs_data, next_cursor=next_cursor), 200
+
+
+@program_bp.route('/<int:program_id>/contribution', methods=['GET'])
+@token_required
+@role_required('staff')
+@versioned(*PROGRAM_TABLES)
+@swag_from({
+    'tags': ['Program'],
+    'description': 'How much each module contributes to every observation, graduate attribute and '
+                   'objective of the program. Each table has one row per module and one column per '
+                   'target, in the order of the label lists. An observation column sums to 1 when any '
+                   'module links to it; an attribute or objective column sums to the share of it that '
+                   'is covered, below 1 when some of its observations have no links.',
+    'parameters': [
+        {
+            'name': 'program_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The ID of the program'
+        },
+        {
+            'name': 'as_of',
+            'in': 'query',
+            'type': 'string',
+            'format': 'date-time',
+            'required': False,
+            'description': 'ISO 8601 time (UTC unless an offset is given); use the link and relation '
+                           'weights logged at that time instead of the current ones'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Contribution tables',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'program_id': {'type': 'integer'},
+                    'modules': {'type': 'array', 'items': {'type': 'object'}},
+                    'observations': {'type': 'array', 'items': {'type': 'object'}},
+                    'attributes': {'type': 'array', 'items': {'type': 'object'}},
+                    'objectives': {'type': 'array', 'items': {'type': 'object'}},
+                    'module_observation': {
+                        'type': 'array',
+                        'items': {'type': 'array', 'items': {'type': 'number'}}
+                    },
+                    'module_attribute': {
+                        'type': 'array',
+                        'items': {'type': 'array', 'items': {'type': 'number'}}
+                    },
+                    'module_objective': {
+                        'type': 'array',
+                        'items': {'type': 'array', 'items': {'type': 'number'}}
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid as_of'
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def get_program_contribution(current_user, program_id: int):
+    try:
+        as_of = parse_as_of(request.args.get('as_of'))
+    except ValueError:
+        return jsonify(message='as_of must be an ISO 8601 date or time'), 400
+    if not Program.query.get(program_id):
+        return jsonify(message='Program not found'), 404
+    result = program_cache.get_or_compute(
+        ('contribution', program_id, as_of), program_version(),
+        lambda: contribution(load_program_matrices(program_id, as_of)))
+    return jsonify(result), 200
+
+
+@program_bp.route('/<int:program_id>/simulate', methods=['POST'])
+@token_required
+@role_required('staff')
+@swag_from({
+    'tags': ['Program'],
+    'description': 'Try a what-if weighting without touching the live data. The scenario is applied '
+                   'to an in-memory copy of the program and the contribution, attainment and coverage '
+                   'are returned along with their change from the live program. Added modules have no '
+                   'scores, so they only change the contribution and coverage.',
+    'parameters': [
+        {
+            'name': 'program_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The ID of the program'
+        },
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'links': {
+                        'type': 'array',
+                        'description': 'Module-observation weights to set, 0 removes the link',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'module_id': {'type': 'integer'},
+                                'observation_id': {'type': 'integer'},
+                                'weight': {'type': 'number'}
+                            }
+                        }
+                    },
+                    'relations': {
+                        'type': 'array',
+                        'description': 'Attribute-objective weights to set, 0 removes the relation',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'attribute_id': {'type': 'integer'},
+                                'objective_id': {'type': 'integer'},
+                                'weight': {'type': 'number'}
+                            }
+                        }
+                    },
+                    'remove_modules': {'type': 'array', 'items': {'type': 'integer'}},
+                    'add_modules': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'name': {'type': 'string'},
+                                'links': {
+                                    'type': 'array',
+                                    'items': {
+                                        'type': 'object',
+                                        'properties': {
+                                            'observation_id': {'type': 'integer'},
+                                            'weight': {'type': 'number'}
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Simulated results and their deltas from the live program',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'modules': {'type': 'array', 'items': {'type': 'object'}},
+                    'contribution': {'type': 'object'},
+                    'contribution_delta': {'type': 'object'},
+                    'coverage': {
+                        'type': 'object',
+                        'properties': {
+                            'lost': {'type': 'object'},
+                            'gained': {'type': 'object'}
+                        }
+                    },
+                    'attainment': {'type': 'object'},
+                    'attainment_delta': {'type': 'object'}
+                }
+            }
+        },
+        400: {
+            'description': 'The scenario names unknown rows or has invalid weights'
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def simulate_program(current_user, program_id: int):
+    if not Program.query.get(program_id):
+        return jsonify(message='Program not found'), 404
+    return jsonify(simulate(program_id, request.get_json(silent=True))), 200
+
 
-    return jsonify(programs=programs_data), 200
+@program_bp.route('/<int:program_id>/tree', methods=['GET'])
+@token_required
+@role_required('staff')
+@versioned(*PROGRAM_TABLES)
+@swag_from({
+    'tags': ['Program'],
+    'description': 'The whole program in one response: objectives, graduate attributes with their '
+                   'observations, modules, module-observation links and attribute-objective relations. '
+                   'With as_of, links and relations are the weights logged at that time, keyed by ids only.',
+    'parameters': [
+        {
+            'name': 'program_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The ID of the program'
+        },
+        {
+            'name': 'as_of',
+            'in': 'query',
+            'type': 'string',
+            'format': 'date-time',
+            'required': False,
+            'description': 'ISO 8601 time (UTC unless an offset is given); use the link and relation '
+                           'weights logged at that time instead of the current ones'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Program hierarchy',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'program': {'type': 'object'},
+                    'objectives': {'type': 'array', 'items': {'type': 'object'}},
+                    'attributes': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'observations': {'type': 'array', 'items': {'type': 'object'}}
+                            }
+                        }
+                    },
+                    'modules': {'type': 'array', 'items': {'type': 'object'}},
+                    'links': {'type': 'array', 'items': {'type': 'object'}},
+                    'relations': {'type': 'array', 'items': {'type': 'object'}}
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid as_of'
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def get_program_tree(current_user, program_id: int):
+    try:
+        as_of = parse_as_of(request.args.get('as_of'))
+    except ValueError:
+        return jsonify(message='as_of must be an ISO 8601 date or time'), 400
+    tree = program_cache.get_or_compute(
+        ('tree', program_id, as_of), program_version(), lambda: load_program_tree(program_id, as_of))
+    if tree is None:
+        return jsonify(message='Program not found'), 404
+    return jsonify(tree), 200
+
+
+@program_bp.route('/<int:program_id>/coverage-report', methods=['GET'])
+@token_required
+@role_required('staff')
+@versioned(*PROGRAM_TABLES)
+@swag_from({
+    'tags': ['Program'],
+    'description': 'Coverage health of a program: observations no module supports, graduate '
+                   'attributes with no supported observation, objectives no attribute relates to, '
+                   'modules supporting the same observations and observations that hang on a '
+                   'single module. Only pairs with a positive weight count as support.',
+    'parameters': [
+        {
+            'name': 'program_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The ID of the program'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Coverage report',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'program_id': {'type': 'integer'},
+                    'unsupported_observations': {'type': 'array', 'items': {'type': 'object'}},
+                    'unsupported_attributes': {'type': 'array', 'items': {'type': 'object'}},
+                    'unrelated_objectives': {'type': 'array', 'items': {'type': 'object'}},
+                    'duplicate_modules': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'modules': {'type': 'array', 'items': {'type': 'object'}},
+                                'observations': {'type': 'array', 'items': {'type': 'integer'}}
+                            }
+                        }
+                    },
+                    'single_module_observations': {'type': 'array', 'items': {'type': 'object'}},
+                    'summary': {
+                        'type': 'object',
+                        'description': 'Number of entries in each list',
+                        'additionalProperties': {'type': 'integer'}
+                    }
+                }
+            }
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def get_program_coverage_report(current_user, program_id: int):
+    if not Program.query.get(program_id):
+        return jsonify(message='Program not found'), 404
+    report = program_cache.get_or_compute(
+        ('coverage', program_id), program_version(),
+        lambda: coverage_report(load_program_matrices(program_id)))
+    return jsonify(report), 200
+
+
+@program_bp.route('/<int:program_id>/minimal-modules', methods=['GET'])
+@token_required
+@role_required('staff')
+@versioned(*PROGRAM_TABLES)
+@swag_from({
+    'tags': ['Program'],
+    'description': 'Candidate curricula for a redesign: the fewest modules, or the fewest credits, '
+                   'that still give every observation a link of at least min_weight. Returns a greedy '
+                   'solution and a branch and bound one that is proven optimal unless the time limit '
+                   'runs out. Observations no module links to strongly enough are listed apart.',
+    'parameters': [
+        {
+            'name': 'program_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The ID of the program'
+        },
+        {
+            'name': 'cost',
+            'in': 'query',
+            'type': 'string',
+            'enum': list(COSTS),
+            'default': 'count',
+            'description': 'Minimize the number of modules or their total credit'
+        },
+        {
+            'name': 'min_weight',
+            'in': 'query',
+            'type': 'number',
+            'default': 1,
+            'description': 'Weakest link weight that counts as covering an observation'
+        },
+        {
+            'name': 'time_limit_ms',
+            'in': 'query',
+            'type': 'integer',
+            'default': 200,
+            'description': 'Time budget of the exact search, at most 5000'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Greedy and exact module sets',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'greedy': {'type': 'object'},
+                    'exact': {'type': 'object'},
+                    'uncoverable_observations': {'type': 'array', 'items': {'type': 'object'}}
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid cost, min_weight or time_limit_ms'
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def get_minimal_modules(current_user, program_id: int):
+    cost = request.args.get('cost', 'count')
+    if cost not in COSTS:
+        return jsonify(message=f'cost must be one of {", ".join(COSTS)}'), 400
+    try:
+        min_weight = float(request.args.get('min_weight', 1))
+        time_limit = int(request.args.get('time_limit_ms', 200))
+    except ValueError:
+        return jsonify(message='min_weight must be a number and time_limit_ms an integer'), 400
+    if not min_weight > 0 or not 0 <= time_limit <= 5000:
+        return jsonify(message='min_weight must be above 0 and time_limit_ms from 0 to 5000'), 400
+    if not Program.query.get(program_id):
+        return jsonify(message='Program not found'), 404
+    result = program_cache.get_or_compute(
+        ('minimal-modules', program_id, cost, min_weight, time_limit), program_version(),
+        lambda: minimal_modules(load_program_matrices(program_id), cost, min_weight, time_limit / 1000))
+    return jsonify(result), 200
+
+
+@program_bp.route('/<int:program_id>/clone', methods=['POST'])
+@token_required
+@role_required('admin')
+@swag_from({
+    'tags': ['Program'],
+    'description': 'Create a new program version by copying a program with its objectives, graduate '
+                   'attributes, observations, modules, relations and links in one transaction. '
+                   'Materials, students and scores are not copied.',
+    'parameters': [
+        {
+            'name': 'program_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The ID of the program to copy'
+        },
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': False,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'name': {'type': 'string', 'description': 'Defaults to the source name'},
+                    'version': {'type': 'string', 'description': 'Defaults to the source version'},
+                    'description': {'type': 'string', 'description': 'Defaults to the source description'}
+                }
+            }
+        }
+    ],
+    'responses': {
+        201: {
+            'description': 'Program copied',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'program': {'type': 'object'},
+                    'copied': {
+                        'type': 'object',
+                        'description': 'Rows copied per table',
+                        'additionalProperties': {'type': 'integer'}
+                    },
+                    'elapsed_seconds': {'type': 'number'}
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid name, version or description'
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def clone_program_version(current_user, program_id: int):
+    data = request.get_json(silent=True) or {}
+    fields = {field: data.get(field) for field in ('name', 'version', 'description')}
+    if any(value is not None and not isinstance(value, str) for value in fields.values()):
+        return jsonify(message='name, version and description must be strings'), 400
+    result = clone_program(program_id, **fields)
+    if result is None:
+        return jsonify(message='Program not found'), 404
+    result['program'] = serializers[Program](result['program'])
+    return jsonify(result), 201
+
+
+@program_bp.route('/<int:program_id>/diff/<int:other_id>', methods=['GET'])
+@token_required
+@role_required('staff')
+@versioned(*PROGRAM_TABLES)
+@swag_from({
+    'tags': ['Program'],
+    'description': 'What changed from one program version to another. Modules are matched by number '
+                   '(or name when they have none), objectives, graduate attributes and observations by '
+                   'name, and relations and links by the keys of both ends. Changed entities list the '
+                   'old and new value of every field that differs.',
+    'parameters': [
+        {
+            'name': 'program_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The ID of the earlier program version'
+        },
+        {
+            'name': 'other_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The ID of the later program version'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Structured diff',
+            'schema': {
+                'type': 'object',
+                'properties': dict({
+                    'source_id': {'type': 'integer'},
+                    'target_id': {'type': 'integer'},
+                    'summary': {'type': 'object'}
+                }, **{
+                    entity: {
+                        'type': 'object',
+                        'properties': {
+                            'added': {'type': 'array', 'items': {'type': 'object'}},
+                            'removed': {'type': 'array', 'items': {'type': 'object'}},
+                            'changed': {
+                                'type': 'array',
+                                'items': {
+                                    'type': 'object',
+                                    'properties': {
+                                        'key': {'type': 'object'},
+                                        'changes': {
+                                            'type': 'object',
+                                            'description': 'Field to [old value, new value]'
+                                        }
+                                    }
+                                }
+                            },
+                            'unchanged': {'type': 'integer'}
+                        }
+                    } for entity in ENTITIES
+                })
+            }
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def get_program_diff(current_user, program_id: int, other_id: int):
+    for pid in (program_id, other_id):
+        if not Program.query.get(pid):
+            return jsonify(message=f'Program {pid} not found'), 404
+    result = program_cache.get_or_compute(
+        ('diff', program_id, other_id), program_version(),
+        lambda: diff_programs(program_id, other_id))
+    return jsonify(result), 200
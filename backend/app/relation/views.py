@@ -1,8 +1,16 @@
 from flask import Blueprint, request, jsonify
 from app import db
-from app.models.models import Attribute, Objective, AttrObjRel
+from app.models.models import Attribute, Objective, AttrObjRel, Program
 from flasgger import swag_from
 from app.common.decorators import token_required, role_required
+from app.common.versioning import versioned
+from app.common.pagination import paginate, fetch_all, PAGINATION_PARAMETERS
+from app.common.streaming import stream_json, wants_stream, STREAM_PARAMETER
+from app.common.serializers import serializers
+from app.common.upsert import upsert
+from app.common.matrix import read_matrix, MATRIX_PARAMETERS, MATRIX_REPORT_SCHEMA
+from app.services.history import track_weights
+from app.services.services import import_relation_matrix
 
 relation_bp = Blueprint('relation_bp', __name__)
 
@@ -83,32 +91,24 @@ def create_or_update_relation(current_user):
     if not Attribute.query.get(attribute_id):
         return jsonify(message='Attribute ID is invalid or does not exist'), 400
 
-    # Check if the relation already exists
-    relation = AttrObjRel.query.filter_by(
-        objective_id=objective_id, attribute_id=attribute_id).first()
+    # Upsert on the (attribute_id, objective_id) unique constraint, the lookup only
+    # decides which response to send
+    key = {'objective_id': objective_id, 'attribute_id': attribute_id}
+    exists = db.session.query(AttrObjRel.attr_obj_id).filter_by(**key).first() is not None
+    with track_weights(AttrObjRel, AttrObjRel.attribute_id == attribute_id,
+                       AttrObjRel.objective_id == objective_id):
+        upsert(AttrObjRel, [dict(key, weight=weight)], tuple(key), update=('weight',))
+    db.session.commit()
 
-    if relation:
-        # Update the existing relation
-        relation.weight = weight
-        db.session.commit()
+    if exists:
         return jsonify(message='Relation updated'), 200
-    else:
-        # Create a new relation
-        new_relation = AttrObjRel(
-            objective_id=objective_id, attribute_id=attribute_id, weight=weight)
-        db.session.add(new_relation)
-        db.session.commit()
-        return jsonify({
-            'attr_obj_id': new_relation.attr_obj_id,
-            'objective_id': new_relation.objective_id,
-            'attribute_id': new_relation.attribute_id,
-            'weight': new_relation.weight
-        }), 201
+    return jsonify(serializers[AttrObjRel](AttrObjRel.query.filter_by(**key).one())), 201
 
 
 @relation_bp.route('/relations/<int:attr_obj_id>', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('attrobjrel')
 @swag_from({
     'tags': ['Relation'],
     'description': 'Retrieve a specific relationship between an attribute and an objective by its ID.',
@@ -148,12 +148,7 @@ def create_or_update_relation(current_user):
 def get_relation(current_user, attr_obj_id: int):
     attr_obj_rel = AttrObjRel.query.get(attr_obj_id)
     if attr_obj_rel:
-        return jsonify({
-            'attr_obj_id': attr_obj_rel.attr_obj_id,
-            'objective_id': attr_obj_rel.objective_id,
-            'attribute_id': attr_obj_rel.attribute_id,
-            'weight': attr_obj_rel.weight
-        }), 200
+        return jsonify(serializers[AttrObjRel](attr_obj_rel)), 200
     else:
         return jsonify(message='Relation not found'), 404
 
@@ -197,7 +192,8 @@ def get_relation(current_user, attr_obj_id: int):
 def delete_relation(current_user, attr_obj_id: int):
     attr_obj_rel = AttrObjRel.query.get(attr_obj_id)
     if attr_obj_rel:
-        db.session.delete(attr_obj_rel)
+        with track_weights(AttrObjRel, AttrObjRel.attr_obj_id == attr_obj_id):
+            db.session.delete(attr_obj_rel)
         db.session.commit()
         return jsonify(message='Relation deleted'), 200
     else:
@@ -207,6 +203,7 @@ def delete_relation(current_user, attr_obj_id: int):
 @relation_bp.route('/relations', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('attrobjrel', 'attribute')
 @swag_from({
     'tags': ['Relation'],
     'description': 'List all relationships or filter by specific objective or attribute ID.',
@@ -224,8 +221,15 @@ def delete_relation(current_user, attr_obj_id: int):
             'type': 'integer',
             'required': False,
             'description': 'Filter by a specific attribute ID'
+        },
+        {
+            'name': 'program_id',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Filter by the program of the attribute'
         }
-    ],
+    ] + PAGINATION_PARAMETERS + [STREAM_PARAMETER],
     'responses': {
         200: {
             'description': 'List of relations',
@@ -252,22 +256,25 @@ def delete_relation(current_user, attr_obj_id: int):
 def list_relations(current_user):
     objective_id = request.args.get('objective_id')
     attribute_id = request.args.get('attribute_id')
-    query = AttrObjRel.query
+    program_id = request.args.get('program_id')
+    serializer = serializers[AttrObjRel]
+    query = serializer.select()
 
     if objective_id:
         query = query.filter(AttrObjRel.objective_id == objective_id)
     if attribute_id:
         query = query.filter(AttrObjRel.attribute_id == attribute_id)
+    if program_id:
+        query = query.join(Attribute, Attribute.attribute_id == AttrObjRel.attribute_id).filter(
+            Attribute.program_id == program_id)
 
-    relations = query.all()
-    relations_list = [{
-        'attr_obj_id': rel.attr_obj_id,
-        'objective_id': rel.objective_id,
-        'attribute_id': rel.attribute_id,
-        'weight': rel.weight
-    } for rel in relations]
+    if wants_stream():
+        return stream_json('relations', query.order_by(AttrObjRel.attr_obj_id), serializer.row)
 
-    return jsonify(relations=relations_list), 200
+    relations, next_cursor = paginate(query, {'weight': AttrObjRel.weight})
+    relations_list = serializer.rows(relations)
+
+    return jsonify(relations=relations_list, next_cursor=next_cursor), 200
 
 
 @relation_bp.route('/graduate-attributes/<int:attribute_id>/supports', methods=['POST'])
@@ -330,26 +337,15 @@ def create_or_update_attribute_supports(current_user, attribute_id: int):
     if not objectives:
         return jsonify(message='Objectives data is required'), 400
 
-    for obj in objectives:
-        # Check for existing relation
-        existing_relation = AttrObjRel.query.filter_by(
-            objective_id=obj['objective_id'],
-            attribute_id=attribute_id
-        ).first()
-
-        if existing_relation:
-            # Update existing relation
-            existing_relation.weight = obj.get(
-                'weight', existing_relation.weight)
-        else:
-            # Create new relation
-            new_relation = AttrObjRel(
-                objective_id=obj['objective_id'],
-                attribute_id=attribute_id,
-                weight=obj.get('weight', 1)
-            )
-            db.session.add(new_relation)
-
+    # Pairs sent without a weight keep their current one, or get 1 when new
+    keys = ('attribute_id', 'objective_id')
+    with track_weights(AttrObjRel, AttrObjRel.attribute_id == attribute_id):
+        upsert(AttrObjRel, [
+            {'attribute_id': attribute_id, 'objective_id': obj['objective_id'], 'weight': obj['weight']}
+            for obj in objectives if 'weight' in obj], keys, update=('weight',))
+        upsert(AttrObjRel, [
+            {'attribute_id': attribute_id, 'objective_id': obj['objective_id'], 'weight': 1}
+            for obj in objectives if 'weight' not in obj], keys)
     db.session.commit()
     return jsonify(message='Supports created or updated successfully'), 201
 
@@ -357,6 +353,7 @@ def create_or_update_attribute_supports(current_user, attribute_id: int):
 @relation_bp.route('/graduate-attributes/<int:attribute_id>/supports', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('attrobjrel')
 @swag_from({
     'tags': ['Graduate Attribute'],
     'description': 'Retrieve all relations (supports) for a given graduate attribute.',
@@ -393,13 +390,9 @@ def create_or_update_attribute_supports(current_user, attribute_id: int):
     }
 })
 def get_attribute_supports(current_user, attribute_id):
-    supports = AttrObjRel.query.filter_by(attribute_id=attribute_id).all()
-    supports_data = [{
-        'attr_obj_id': support.attr_obj_id,
-        'objective_id': support.objective_id,
-        'attribute_id': support.attribute_id,
-        'weight': support.weight
-    } for support in supports]
+    serializer = serializers[AttrObjRel]
+    supports = fetch_all(serializer.select().filter_by(attribute_id=attribute_id))
+    supports_data = serializer.rows(supports)
 
     return jsonify(supports=supports_data), 200
 
@@ -426,7 +419,8 @@ def get_attribute_supports(current_user, attribute_id):
     }
 })
 def delete_attribute_supports(current_user, attribute_id: int):
-    AttrObjRel.query.filter_by(attribute_id=attribute_id).delete()
+    with track_weights(AttrObjRel, AttrObjRel.attribute_id == attribute_id):
+        AttrObjRel.query.filter_by(attribute_id=attribute_id).delete()
     db.session.commit()
     return jsonify(message='Supports deleted successfully'), 200
 
@@ -476,24 +470,10 @@ def create_or_update_objective_supported_by(current_user, objective_id: int):
     if not attributes:
         return jsonify(message='Attributes data is required'), 400
 
-    for attr in attributes:
-        relation = AttrObjRel.query.filter_by(
-            objective_id=objective_id,
-            attribute_id=attr['attribute_id']
-        ).first()
-
-        if relation:
-            # Update the existing relation
-            relation.weight = attr.get('weight', 1)
-        else:
-            # Create a new relation
-            new_relation = AttrObjRel(
-                objective_id=objective_id,
-                attribute_id=attr['attribute_id'],
-                weight=attr.get('weight', 1)
-            )
-            db.session.add(new_relation)
-
+    with track_weights(AttrObjRel, AttrObjRel.objective_id == objective_id):
+        upsert(AttrObjRel, [
+            {'attribute_id': attr['attribute_id'], 'objective_id': objective_id, 'weight': attr.get('weight', 1)}
+            for attr in attributes], ('attribute_id', 'objective_id'), update=('weight',))
     db.session.commit()
     return jsonify(message='Supported by relations created or updated successfully'), 201
 
@@ -501,6 +481,7 @@ def create_or_update_objective_supported_by(current_user, objective_id: int):
 @relation_bp.route('/objectives/<int:objective_id>/supported-by', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('attrobjrel')
 @swag_from({
     'tags': ['Objective'],
     'description': 'List all relations where an objective is supported by attributes.',
@@ -540,13 +521,9 @@ def create_or_update_objective_supported_by(current_user, objective_id: int):
     }
 })
 def get_objective_supported_by(current_user, objective_id: int):
-    relations = AttrObjRel.query.filter_by(objective_id=objective_id).all()
-    relations_list = [{
-        'attr_obj_id': rel.attr_obj_id,
-        'objective_id': rel.objective_id,
-        'attribute_id': rel.attribute_id,
-        'weight': rel.weight
-    } for rel in relations]
+    serializer = serializers[AttrObjRel]
+    relations = fetch_all(serializer.select().filter_by(objective_id=objective_id))
+    relations_list = serializer.rows(relations)
 
     if not relations_list:
         return jsonify(message='No relations found for this objective'), 404
@@ -579,6 +556,45 @@ def get_objective_supported_by(current_user, objective_id: int):
     }
 })
 def delete_objective_supported_by(current_user, objective_id: int):
-    AttrObjRel.query.filter_by(objective_id=objective_id).delete()
+    with track_weights(AttrObjRel, AttrObjRel.objective_id == objective_id):
+        AttrObjRel.query.filter_by(objective_id=objective_id).delete()
     db.session.commit()
     return jsonify(message='Supported by relations deleted successfully'), 200
+
+
+@relation_bp.route('/programs/<int:program_id>/relations/matrix', methods=['PUT'])
+@token_required
+@role_required('admin')
+@swag_from({
+    'tags': ['Relation'],
+    'description': 'Replace the attribute x objective weights of a program with a whole matrix. Rows are keyed by '
+                   'attribute name and columns by objective name. Pairs whose row and column are both in the '
+                   'matrix are inserted, updated or deleted to match it in one transaction; other pairs '
+                   'are left alone.',
+    'consumes': ['application/json', 'multipart/form-data', 'text/csv'],
+    'parameters': [
+        {
+            'name': 'program_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The ID of the program'
+        }
+    ] + MATRIX_PARAMETERS,
+    'responses': {
+        200: {
+            'description': 'Counts of the rows that were changed',
+            'schema': MATRIX_REPORT_SCHEMA
+        },
+        400: {
+            'description': 'The matrix could not be read or uses unknown keys'
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def replace_relation_matrix(current_user, program_id: int):
+    if not Program.query.get(program_id):
+        return jsonify(message='Program not found'), 404
+    return jsonify(import_relation_matrix(program_id, read_matrix())), 200
@@ -0,0 +1,176 @@
+import numpy as np
+from itertools import chain
+from sqlalchemy import select
+from typing import List
+from app import db
+from app.models.models import Program, Student, Score
+from app.common.pagination import fetch_all
+from app.common.program_cache import PROGRAM_TABLES
+from app.common.process_pool import process_pool
+from app.services.matrices import load_program_matrices, _positions
+
+
+# Every table attainment reads
+ATTAINMENT_TABLES = PROGRAM_TABLES + ('student', 'score')
+
+LEVELS = ('observations', 'attributes', 'objectives')
+
+
+def weighted_mean(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    '''
+    For every column of weights (k x m), the weighted mean of the columns
+    of values (n x k) it points at. Missing values (NaN) are left out and
+    the remaining weights renormalized; the result is NaN where none of
+    the weighted values is present.
+    '''
+    present = ~np.isnan(values)
+    totals = np.where(present, values, 0.0) @ weights
+    norms = present.astype(np.float64) @ weights
+    return np.divide(totals, norms, out=np.full(totals.shape, np.nan), where=norms > 0)
+
+
+def attainment(scores: np.ndarray, module_observation: np.ndarray,
+               observation_attribute: np.ndarray, attribute_objective: np.ndarray):
+    '''
+    Propagate a students x modules score matrix through the program
+    weights. An observation is the link-weighted mean of the scores of
+    the modules supporting it, an attribute the mean of its observations
+    and an objective the relation-weighted mean of its attributes, all on
+    the 0 to 100 scale of the scores.
+    '''
+    observations = weighted_mean(scores, module_observation)
+    attributes = weighted_mean(observations, observation_attribute)
+    objectives = weighted_mean(attributes, attribute_objective)
+    return observations, attributes, objectives
+
+
+def column_means(values: np.ndarray) -> np.ndarray:
+    '''Mean of every column over the rows that have a value, NaN if none has.'''
+    present = ~np.isnan(values)
+    counts = present.sum(axis=0)
+    totals = np.where(present, values, 0.0).sum(axis=0)
+    return np.divide(totals, counts, out=np.full(totals.shape, np.nan), where=counts > 0)
+
+
+def _rounded(values: np.ndarray, decimals: int) -> list:
+    # NaN is not valid JSON, missing attainment is reported as null
+    rounded = np.round(values, decimals).astype(object)
+    rounded[np.isnan(values)] = None
+    return rounded.tolist()
+
+
+def cohort_means(levels, cohorts: np.ndarray):
+    '''
+    (students, mean of every level) over every student, and the same per
+    cohort as {cohort: (students, means)}, for per-student levels.
+    '''
+    overall = (len(cohorts), tuple(column_means(level) for level in levels))
+    labels, inverse = np.unique(cohorts, return_inverse=True)
+    groups = {}
+    for i, label in enumerate(labels.tolist()):
+        rows = np.flatnonzero(inverse == i)
+        groups[label] = (len(rows), tuple(column_means(level[rows]) for level in levels))
+    return overall, groups
+
+
+def _group(count: int, means, decimals: int) -> dict:
+    return dict({'students': count}, **{
+        name: _rounded(mean, decimals) for name, mean in zip(LEVELS, means)})
+
+
+def _attainment_task(task) -> dict:
+    '''Runs in a pool worker: only arrays go in and plain lists come out.'''
+    scores, module_observation, observation_attribute, attribute_objective, \
+        cohorts, per_student, decimals = task
+    levels = attainment(scores, module_observation, observation_attribute, attribute_objective)
+    overall, groups = cohort_means(levels, cohorts)
+    result = {
+        'overall': _group(*overall, decimals),
+        'cohorts': {label: _group(count, means, decimals) for label, (count, means) in groups.items()}
+    }
+    if per_student:
+        result['students'] = {name: _rounded(level, decimals) for name, level in zip(LEVELS, levels)}
+    return result
+
+
+def load_scores(program_id: int, modules: list):
+    '''
+    The program's students (sorted by id), their students x modules score
+    matrix with NaN where a module has no score, and their cohorts.
+    '''
+    students = [dict(row._mapping) for row in db.session.execute(
+        select(Student.student_id, Student.number, Student.name, Student.cohort)
+        .where(Student.program_id == program_id).order_by(Student.student_id))]
+    scores = np.full((len(students), len(modules)), np.nan)
+    # Hundreds of thousands of rows, read without ORM result processing
+    rows = fetch_all(
+        select(Score.student_id, Score.module_id, Score.score)
+        .join(Student, Student.student_id == Score.student_id)
+        .where(Student.program_id == program_id))
+    if rows:
+        # Ids and scores all fit a float64 exactly, one flat pass is much
+        # faster than transposing the rows
+        table = np.fromiter(chain.from_iterable(rows), dtype=np.float64,
+                            count=3 * len(rows)).reshape(-1, 3)
+        student_ids, module_ids = table[:, 0].astype(np.int64), table[:, 1].astype(np.int64)
+        values = table[:, 2]
+        student_positions, student_found = _positions(
+            np.array([row['student_id'] for row in students], dtype=np.int64), student_ids)
+        module_positions, module_found = _positions(
+            np.array([row['module_id'] for row in modules], dtype=np.int64), module_ids)
+        found = student_found & module_found
+        scores[student_positions[found], module_positions[found]] = values[found]
+    cohorts = np.array([row['cohort'] or '' for row in students], dtype=str)
+    return students, scores, cohorts
+
+
+def _load_task(program_id: int, per_student: bool, decimals: int):
+    matrices = load_program_matrices(program_id)
+    students, scores, cohorts = load_scores(program_id, matrices.modules)
+    task = (scores, matrices.module_observation, matrices.observation_attribute,
+            matrices.attribute_objective, cohorts, per_student, decimals)
+    return matrices, students, task
+
+
+def _labelled(matrices, students: list, result: dict) -> dict:
+    document = {
+        'program_id': matrices.program_id,
+        'observations': matrices.observations,
+        'attributes': matrices.attributes,
+        'objectives': matrices.objectives,
+        'overall': result['overall'],
+        'cohorts': result['cohorts']
+    }
+    if 'students' in result:
+        levels = result['students']
+        document['students'] = [
+            dict(student, observations=observations, attributes=attributes, objectives=objectives)
+            for student, observations, attributes, objectives in zip(
+                students, levels['observations'], levels['attributes'], levels['objectives'])]
+    return document
+
+
+def program_attainment(program_id: int, per_student: bool = True, decimals: int = 2) -> dict:
+    '''
+    Attainment of every observation, attribute and objective of a program,
+    over every student, per cohort and optionally per student.
+    '''
+    matrices, students, task = _load_task(program_id, per_student, decimals)
+    return _labelled(matrices, students, _attainment_task(task))
+
+
+def programs_attainment(program_ids: List[int], decimals: int = 2) -> List[dict]:
+    '''
+    Cohort attainment of several programs. The data is read here and the
+    NumPy work of each program runs on its own pool process.
+    '''
+    loaded = [_load_task(program_id, False, decimals) for program_id in program_ids]
+    results = process_pool.map(_attainment_task, [task for _, _, task in loaded])
+    return [_labelled(matrices, students, result)
+            for (matrices, students, _), result in zip(loaded, results)]
+
+
+def missing_programs(program_ids: List[int]) -> List[int]:
+    found = set(db.session.execute(
+        select(Program.program_id).where(Program.program_id.in_(program_ids))).scalars())
+    return [program_id for program_id in program_ids if program_id not in found]
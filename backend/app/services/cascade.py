@@ -0,0 +1,96 @@
+from flask import current_app
+from sqlalchemy import delete, select
+from typing import Dict, List
+from app import db
+from app.models.models import (Program, Attribute, Objective, AttrObjRel, Observation, Module,
+                               ModObsRel, Material, Comment, Student, Score, WeightChange,
+                               WeightSnapshot)
+from app.services.history import track_weights
+from app.tasks import remove_files
+
+
+def _delete(model, condition, counts: Dict[str, int]):
+    result = db.session.execute(
+        delete(model).where(condition).execution_options(synchronize_session=False))
+    counts[model.__tablename__] = counts.get(model.__tablename__, 0) + result.rowcount
+
+
+def _delete_modules(condition, counts: Dict[str, int]) -> List[str]:
+    '''Delete the modules matching condition with their materials, comments, scores and links.'''
+    modules = select(Module.module_id).where(condition)
+    materials = select(Material.material_id).where(Material.module_id.in_(modules))
+    paths = [path for path in db.session.execute(
+        select(Material.file_path).where(Material.module_id.in_(modules))).scalars() if path]
+    _delete(Comment, Comment.material_id.in_(materials), counts)
+    _delete(Material, Material.module_id.in_(modules), counts)
+    _delete(Score, Score.module_id.in_(modules), counts)
+    _delete(ModObsRel, ModObsRel.module_id.in_(modules), counts)
+    _delete(Module, condition, counts)
+    return paths
+
+
+def _delete_attributes(condition, counts: Dict[str, int]):
+    '''Delete the attributes matching condition with their observations, links and relations.'''
+    attributes = select(Attribute.attribute_id).where(condition)
+    observations = select(Observation.observation_id).where(Observation.attribute_id.in_(attributes))
+    _delete(ModObsRel, ModObsRel.observation_id.in_(observations), counts)
+    _delete(AttrObjRel, AttrObjRel.attribute_id.in_(attributes), counts)
+    _delete(Observation, Observation.attribute_id.in_(attributes), counts)
+    _delete(Attribute, condition, counts)
+
+
+def _remove_files_later(paths: List[str]):
+    # The rows are gone either way, a missing worker only leaves files behind
+    if not paths:
+        return
+    try:
+        remove_files.delay(paths)
+    except Exception:
+        current_app.logger.exception('Could not queue removal of %d uploaded files', len(paths))
+
+
+def delete_program(program_id: int) -> Dict[str, int]:
+    '''
+    Delete a program and everything under it with one set-based DELETE per
+    table, children first, in one transaction. Uploaded material files are
+    removed afterwards by a background task. Returns the rows deleted per
+    table.
+    '''
+    counts = {}
+    paths = _delete_modules(Module.program_id == program_id, counts)
+    _delete_attributes(Attribute.program_id == program_id, counts)
+    _delete(AttrObjRel, AttrObjRel.objective_id.in_(
+        select(Objective.objective_id).where(Objective.program_id == program_id)), counts)
+    _delete(Objective, Objective.program_id == program_id, counts)
+    _delete(Score, Score.student_id.in_(
+        select(Student.student_id).where(Student.program_id == program_id)), counts)
+    _delete(Student, Student.program_id == program_id, counts)
+    _delete(WeightChange, WeightChange.program_id == program_id, counts)
+    _delete(WeightSnapshot, WeightSnapshot.program_id == program_id, counts)
+    _delete(Program, Program.program_id == program_id, counts)
+    db.session.commit()
+    _remove_files_later(paths)
+    return counts
+
+
+def delete_module(module_id: int) -> Dict[str, int]:
+    '''Delete a module with its materials, comments, scores and links, see delete_program.'''
+    counts = {}
+    with track_weights(ModObsRel, ModObsRel.module_id == module_id):
+        paths = _delete_modules(Module.module_id == module_id, counts)
+    db.session.commit()
+    _remove_files_later(paths)
+    return counts
+
+
+def delete_attribute(attribute_id: int) -> Dict[str, int]:
+    '''Delete an attribute with its observations, links and relations, see delete_program.'''
+    counts = {}
+    observations = select(Observation.observation_id).where(Observation.attribute_id == attribute_id)
+    # One table per block, the first logged change of a program snapshots the other one as is
+    with track_weights(ModObsRel, ModObsRel.observation_id.in_(observations)):
+        _delete(ModObsRel, ModObsRel.observation_id.in_(observations), counts)
+    with track_weights(AttrObjRel, AttrObjRel.attribute_id == attribute_id):
+        _delete_attributes(Attribute.attribute_id == attribute_id, counts)
+    db.session.commit()
+    return counts
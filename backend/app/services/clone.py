@@ -0,0 +1,129 @@
+import time
+from datetime import datetime
+from sqlalchemy import func, literal, select, text
+from typing import Dict, Optional
+from app import db
+from app.models.models import Program, Attribute, Objective, AttrObjRel, Observation, Module, ModObsRel
+
+
+def _pk(model):
+    return model.__table__.primary_key.columns.values()[0]
+
+
+def _lock(models):
+    '''
+    Keep other writers from taking ids in these tables until commit, so the
+    block of ids read from MAX(pk) stays free. PostgreSQL locks the tables
+    against writes, InnoDB gap-locks the end of each primary key (under the
+    default REPEATABLE READ), SQLite already holds the database write lock
+    once the new program row is flushed.
+    '''
+    dialect = db.session.get_bind().dialect.name
+    models = sorted(models, key=lambda model: model.__tablename__)
+    if dialect == 'postgresql':
+        db.session.execute(text('LOCK TABLE {} IN EXCLUSIVE MODE'.format(
+            ', '.join(model.__tablename__ for model in models))))
+    elif dialect in ('mysql', 'mariadb'):
+        for model in models:
+            pk = _pk(model)
+            db.session.execute(select(pk).order_by(pk.desc()).limit(1).with_for_update())
+
+
+def _mapping(model, source):
+    '''
+    (old_id, new_id) of the source rows of model: new ids are numbered
+    densely after the highest id in the table, in the order of the old ones.
+    '''
+    pk = _pk(model)
+    high = db.session.execute(select(func.max(pk))).scalar() or 0
+    return select(pk.label('old_id'),
+                  (literal(high) + func.row_number().over(order_by=pk)).label('new_id')) \
+        .where(source).subquery()
+
+
+def _copy(model, values: Dict, joins, source=None) -> int:
+    '''
+    INSERT ... SELECT the rows of model, with some columns replaced. joins
+    are (mapping, column) pairs; only rows whose column is in the mapping
+    are copied.
+    '''
+    table = model.__table__
+    columns = [column for column in table.c if column.key in values or not column.primary_key]
+    query = select(*[values.get(column.key, column) for column in columns]).select_from(table)
+    for mapping, column in joins:
+        query = query.join(mapping, mapping.c.old_id == column)
+    if source is not None:
+        query = query.where(source)
+    return db.session.execute(
+        table.insert().from_select([column.key for column in columns], query)).rowcount
+
+
+def _sync_sequences(models):
+    # Explicit ids do not advance PostgreSQL serial sequences
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for model in models:
+        table, pk = model.__table__, _pk(model)
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', '{pk.name}'), "
+            f"(SELECT COALESCE(MAX({pk.name}), 1) FROM {table.name}))"))
+
+
+def clone_program(program_id: int, name: Optional[str] = None, version: Optional[str] = None,
+                  description: Optional[str] = None) -> Optional[dict]:
+    '''
+    Copy a program with its objectives, attributes, observations, modules,
+    relations and links in one transaction, using one INSERT ... SELECT per
+    table so no row passes through Python. The copies of objectives,
+    attributes, observations and modules get a dense block of new ids
+    numbered with ROW_NUMBER() over the old ones, and relations and links
+    are remapped by joining that old -> new mapping. Materials, students
+    and scores are not copied. Returns None if the program does not exist.
+    '''
+    started = time.perf_counter()
+    program = db.session.get(Program, program_id)
+    if program is None:
+        return None
+    copy = Program(name=name or program.name,
+                   version=program.version if version is None else version,
+                   description=program.description if description is None else description)
+    db.session.add(copy)
+    db.session.flush()
+    now = literal(datetime.utcnow())
+
+    source = {model: model.program_id == program_id for model in (Objective, Attribute, Module)}
+    source[Observation] = Observation.attribute_id.in_(
+        select(Attribute.attribute_id).where(source[Attribute]))
+    _lock(source)
+    mappings = {model: _mapping(model, condition) for model, condition in source.items()}
+
+    counts = {}
+    for model in (Objective, Attribute, Module):
+        counts[model.__tablename__] = _copy(model, {
+            _pk(model).key: mappings[model].c.new_id,
+            'program_id': literal(copy.program_id),
+            'updated_at': now}, [(mappings[model], _pk(model))])
+    counts['observation'] = _copy(Observation, {
+        'observation_id': mappings[Observation].c.new_id,
+        'attribute_id': mappings[Attribute].c.new_id,
+        'updated_at': now}, [(mappings[Observation], Observation.observation_id),
+                             (mappings[Attribute], Observation.attribute_id)])
+    # Joining both mappings keeps only the pairs with both ends in the program
+    counts['attrobjrel'] = _copy(AttrObjRel, {
+        'attribute_id': mappings[Attribute].c.new_id,
+        'objective_id': mappings[Objective].c.new_id,
+        'updated_at': now}, [(mappings[Attribute], AttrObjRel.attribute_id),
+                             (mappings[Objective], AttrObjRel.objective_id)])
+    counts['modobsrel'] = _copy(ModObsRel, {
+        'module_id': mappings[Module].c.new_id,
+        'observation_id': mappings[Observation].c.new_id,
+        'updated_at': now}, [(mappings[Module], ModObsRel.module_id),
+                             (mappings[Observation], ModObsRel.observation_id)])
+    _sync_sequences((Objective, Attribute, Module, Observation))
+    db.session.commit()
+
+    return {
+        'program': copy,
+        'copied': counts,
+        'elapsed_seconds': round(time.perf_counter() - started, 3)
+    }
@@ -0,0 +1,67 @@
+import numpy as np
+from collections import defaultdict
+from typing import List
+from app.services.matrices import ProgramMatrices
+
+
+def bitsets(matrix: np.ndarray) -> List[int]:
+    '''One int per row with bit j set where the row is positive in column j.'''
+    packed = np.packbits(matrix > 0, axis=1, bitorder='little')
+    return [int.from_bytes(row.tobytes(), 'little') for row in packed]
+
+
+def bit_positions(mask: int) -> List[int]:
+    positions = []
+    while mask:
+        low = mask & -mask
+        positions.append(low.bit_length() - 1)
+        mask ^= low
+    return positions
+
+
+def coverage_report(matrices: ProgramMatrices) -> dict:
+    '''
+    Gaps, redundancy and concentration in a program's weights, all derived
+    from bitsets of the link and relation tables in one pass:
+
+    unsupported_observations   observations no module links to
+    unsupported_attributes     attributes none of whose observations is supported
+    unrelated_objectives       objectives no attribute relates to
+    duplicate_modules          groups of modules supporting the same observations
+    single_module_observations observations only one module supports
+
+    Only pairs with a positive weight count as support.
+    '''
+    module_observations = bitsets(matrices.module_observation)
+    observation_modules = bitsets(matrices.module_observation.T)
+    attribute_observations = bitsets(matrices.observation_attribute.T)
+    objective_attributes = bitsets(matrices.attribute_objective.T)
+    supported = 0
+    for mask in module_observations:
+        supported |= mask
+
+    groups = defaultdict(list)
+    for module, mask in enumerate(module_observations):
+        if mask:
+            groups[mask].append(module)
+
+    modules, observations = matrices.modules, matrices.observations
+    report = {
+        'program_id': matrices.program_id,
+        'unsupported_observations': [
+            observations[o] for o, mask in enumerate(observation_modules) if not mask],
+        'unsupported_attributes': [
+            matrices.attributes[a] for a, mask in enumerate(attribute_observations)
+            if not mask & supported],
+        'unrelated_objectives': [
+            matrices.objectives[j] for j, mask in enumerate(objective_attributes) if not mask],
+        'duplicate_modules': [
+            {'modules': [modules[m] for m in members],
+             'observations': [observations[o]['observation_id'] for o in bit_positions(mask)]}
+            for mask, members in groups.items() if len(members) > 1],
+        'single_module_observations': [
+            dict(observations[o], module=modules[mask.bit_length() - 1])
+            for o, mask in enumerate(observation_modules) if mask.bit_count() == 1]
+    }
+    report['summary'] = {name: len(value) for name, value in report.items() if isinstance(value, list)}
+    return report
@@ -0,0 +1,134 @@
+from sqlalchemy import func, select
+from typing import Callable, Dict, Tuple
+from app.models.models import Attribute, Objective, AttrObjRel, Observation, Module, ModObsRel
+from app.common.pagination import fetch_all
+
+
+MODULE_FIELDS = ('name', 'name_en', 'nature', 'category', 'credit', 'lec_hours', 'lab_hours',
+                 'oncampus_prac', 'offcampus_prac', 'term', 'offered_by', 'description')
+
+_module_key = func.coalesce(Module.number, Module.name)
+
+
+def _objectives(program_id: int):
+    return select(Objective.name, Objective.description).where(Objective.program_id == program_id)
+
+
+def _attributes(program_id: int):
+    return select(Attribute.name, Attribute.description).where(Attribute.program_id == program_id)
+
+
+def _observations(program_id: int):
+    return select(Observation.name, Observation.description, Attribute.name.label('attribute')) \
+        .join(Attribute, Attribute.attribute_id == Observation.attribute_id) \
+        .where(Attribute.program_id == program_id)
+
+
+def _modules(program_id: int):
+    return select(_module_key.label('number'), *[getattr(Module, field) for field in MODULE_FIELDS]) \
+        .where(Module.program_id == program_id)
+
+
+def _relations(program_id: int):
+    return select(Attribute.name.label('attribute'), Objective.name.label('objective'), AttrObjRel.weight) \
+        .join(Attribute, Attribute.attribute_id == AttrObjRel.attribute_id) \
+        .join(Objective, Objective.objective_id == AttrObjRel.objective_id) \
+        .where(Attribute.program_id == program_id)
+
+
+def _links(program_id: int):
+    return select(_module_key.label('module'), Observation.name.label('observation'), ModObsRel.weight) \
+        .join(Module, Module.module_id == ModObsRel.module_id) \
+        .join(Observation, Observation.observation_id == ModObsRel.observation_id) \
+        .where(Module.program_id == program_id)
+
+
+# Entity: (query for a program, number of leading columns forming the natural key)
+ENTITIES: Dict[str, Tuple[Callable, int]] = {
+    'objectives': (_objectives, 1),
+    'attributes': (_attributes, 1),
+    'observations': (_observations, 1),
+    'modules': (_modules, 1),
+    'relations': (_relations, 2),
+    'links': (_links, 2),
+}
+
+
+def _index(rows, key_size: int) -> Dict[tuple, tuple]:
+    '''
+    {natural key: row}. A key used by several rows (two observations with
+    the same name) gets an occurrence number appended, in the order of
+    the rows' content, so the pairing is stable.
+    '''
+    index, duplicates = {}, {}
+    for row in rows:
+        key = tuple(row[:key_size])
+        if key in index:
+            duplicates.setdefault(key, [index[key]]).append(row)
+        index[key] = row
+    for key, group in duplicates.items():
+        group.sort(key=lambda row: tuple('' if value is None else str(value) for value in row))
+        index[key] = group[0]
+        for occurrence, row in enumerate(group[1:], 2):
+            index[key + (occurrence,)] = row
+    return index
+
+
+def _missing(rows, other):
+    '''
+    The distinct rows of one query that have no equal row in the other,
+    what rows EXCEPT other returns. Written as NOT EXISTS because MySQL
+    only supports EXCEPT from 8.0.31; columns compare NULL-safe like
+    EXCEPT does.
+    '''
+    rows, other = rows.subquery(), other.subquery()
+    return select(rows).distinct().where(~select(1).select_from(other).where(*[
+        column.is_not_distinct_from(other_column)
+        for column, other_column in zip(rows.c, other.c)]).exists())
+
+
+def _entity_diff(source, target, key_size: int) -> dict:
+    '''
+    Diff one entity. The database returns only the rows that differ in
+    any column (source rows missing from target and the reverse), so
+    unchanged rows never reach Python and the work here grows with the
+    change. Rows of both sides sharing a natural key were changed, the
+    rest were added or removed.
+    '''
+    fields = tuple(column.name for column in source.selected_columns)
+    before = _index(fetch_all(_missing(source, target)), key_size)
+    after = _index(fetch_all(_missing(target, source)), key_size)
+    total = fetch_all(select(func.count()).select_from(source.subquery()))[0][0]
+    changed = before.keys() & after.keys()
+
+    def document(row):
+        return dict(zip(fields, row))
+
+    return {
+        'added': sorted((document(after[key]) for key in after.keys() - changed), key=str),
+        'removed': sorted((document(before[key]) for key in before.keys() - changed), key=str),
+        'changed': sorted([
+            {'key': dict(zip(fields[:key_size], key)),
+             'changes': {field: [old, new] for field, old, new in zip(
+                 fields[key_size:], before[key][key_size:], after[key][key_size:]) if old != new}}
+            for key in changed], key=str),
+        'unchanged': total - len(before)
+    }
+
+
+def diff_programs(source_id: int, target_id: int) -> dict:
+    '''
+    What changed from one program version to another. Entities are paired
+    by natural key: module number (or name when it has none), objective,
+    attribute and observation name, and the names at both ends of a
+    relation or link.
+    '''
+    result = {'source_id': source_id, 'target_id': target_id}
+    summary = {}
+    for name, (query, key_size) in ENTITIES.items():
+        diff = _entity_diff(query(source_id), query(target_id), key_size)
+        result[name] = diff
+        summary[name] = {change: len(diff[change]) for change in ('added', 'removed', 'changed')}
+        summary[name]['unchanged'] = diff['unchanged']
+    result['summary'] = summary
+    return result
@@ -0,0 +1,96 @@
+import numpy as np
+from typing import Iterable
+from app.common.program_cache import program_cache, program_version
+from app.services.matrices import ProgramMatrices, load_program_matrices
+
+
+def _rows(matrix: np.ndarray) -> tuple:
+    return tuple(tuple(np.flatnonzero(row).tolist()) for row in matrix)
+
+
+def _row_sets(matrix: np.ndarray) -> tuple:
+    return tuple(frozenset(np.flatnonzero(row).tolist()) for row in matrix)
+
+
+class ProgramGraph:
+    '''
+    Read-only snapshot of a program's traceability graph
+    module -> observation -> attribute -> objective.
+
+    Nodes are addressed by their position in the id-sorted label tuples and
+    every edge list is a tuple of positions, in both directions, so a
+    lookup is a couple of tuple indexings. The transitive module/objective
+    closure is computed once when the snapshot is built. Only pairs with a
+    positive weight count as support.
+    '''
+    __slots__ = ('program_id', 'modules', 'observations', 'attributes', 'objectives',
+                 'module_index', 'observation_index', 'attribute_index', 'objective_index',
+                 'module_observations', 'observation_modules', 'observation_attribute',
+                 'attribute_observations', 'attribute_objectives', 'objective_attributes',
+                 'module_objectives', 'objective_modules',
+                 'observation_covered', 'attribute_covered', 'objective_covered')
+
+    def __init__(self, matrices: ProgramMatrices):
+        self.program_id = matrices.program_id
+        self.modules = tuple(matrices.modules)
+        self.observations = tuple(matrices.observations)
+        self.attributes = tuple(matrices.attributes)
+        self.objectives = tuple(matrices.objectives)
+        self.module_index = {row['module_id']: i for i, row in enumerate(self.modules)}
+        self.observation_index = {row['observation_id']: i for i, row in enumerate(self.observations)}
+        self.attribute_index = {row['attribute_id']: i for i, row in enumerate(self.attributes)}
+        self.objective_index = {row['objective_id']: i for i, row in enumerate(self.objectives)}
+
+        module_observation = matrices.module_observation > 0
+        observation_attribute = matrices.observation_attribute > 0
+        attribute_objective = matrices.attribute_objective > 0
+        self.module_observations = _rows(module_observation)
+        self.observation_modules = _rows(module_observation.T)
+        self.observation_attribute = tuple(int(row.argmax()) for row in observation_attribute)
+        self.attribute_observations = _rows(observation_attribute.T)
+        self.attribute_objectives = _rows(attribute_objective)
+        self.objective_attributes = _rows(attribute_objective.T)
+
+        module_attribute = (module_observation.astype(np.int64) @ observation_attribute) > 0
+        module_objective = (module_attribute.astype(np.int64) @ attribute_objective) > 0
+        self.module_objectives = _row_sets(module_objective)
+        self.objective_modules = _row_sets(module_objective.T)
+
+        self.observation_covered = tuple(module_observation.any(axis=0).tolist())
+        self.attribute_covered = tuple(module_attribute.any(axis=0).tolist())
+        self.objective_covered = tuple(module_objective.any(axis=0).tolist())
+
+    def modules_supporting(self, objective: int) -> list:
+        '''Modules that reach the objective through any observation and attribute.'''
+        return [self.modules[i] for i in sorted(self.objective_modules[objective])]
+
+    def objectives_supported_by(self, module: int) -> list:
+        return [self.objectives[j] for j in sorted(self.module_objectives[module])]
+
+    def impact(self, dropped: Iterable[int]) -> dict:
+        '''
+        Observations, attributes and objectives that are covered now but
+        would lose all support if the given modules were dropped.
+        '''
+        dropped = set(dropped)
+        observations = {o for m in dropped for o in self.module_observations[m]
+                        if dropped.issuperset(self.observation_modules[o])}
+        attributes = {a for a in {self.observation_attribute[o] for o in observations}
+                      if not any(self.observation_covered[o] and o not in observations
+                                 for o in self.attribute_observations[a])}
+        objectives = {j for j in {j for a in attributes for j in self.attribute_objectives[a]}
+                      if not any(self.attribute_covered[a] and a not in attributes
+                                 for a in self.objective_attributes[j])}
+        return {
+            'modules': [self.modules[m] for m in sorted(dropped)],
+            'observations': [self.observations[o] for o in sorted(observations)],
+            'attributes': [self.attributes[a] for a in sorted(attributes)],
+            'objectives': [self.objectives[j] for j in sorted(objectives)]
+        }
+
+
+def program_graph(program_id: int) -> ProgramGraph:
+    '''The worker's snapshot of the program graph, rebuilt when the program data changes.'''
+    return program_cache.get_or_compute(
+        ('graph', program_id), program_version(),
+        lambda: ProgramGraph(load_program_matrices(program_id)))
@@ -0,0 +1,175 @@
+import zlib
+import numpy as np
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from flask import current_app
+from sqlalchemy import select, func
+from app import db
+from app.models.models import (Attribute, AttrObjRel, Module, ModObsRel, WeightChange,
+                               WeightSnapshot)
+
+
+# Weight table -> the model owning its rows, which carries the program_id
+_PARENTS = {
+    ModObsRel: (Module, Module.module_id, ModObsRel.module_id, ModObsRel.observation_id),
+    AttrObjRel: (Attribute, Attribute.attribute_id, AttrObjRel.attribute_id, AttrObjRel.objective_id)
+}
+
+
+def parse_as_of(value: Optional[str]) -> Optional[datetime]:
+    '''
+    Parse an ISO 8601 as_of parameter into a naive UTC datetime, the way
+    the timestamps are stored. Raises ValueError when it is malformed.
+    '''
+    if not value:
+        return None
+    as_of = datetime.fromisoformat(value)
+    if as_of.tzinfo is not None:
+        as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+    return as_of
+
+
+def _pairs(model, conditions) -> Dict[Tuple[int, int], Tuple[int, int]]:
+    '''{(row id, column id): (weight, program id)} of the pairs matching conditions.'''
+    parent, parent_id, row, column = _PARENTS[model]
+    return {(row_id, column_id): (weight, program_id)
+            for row_id, column_id, weight, program_id in db.session.execute(
+                select(row, column, model.weight, parent.program_id)
+                .join(parent, parent_id == row).where(*conditions))}
+
+
+def _program_weights(program_id: int) -> Dict[str, dict]:
+    '''Both current weight tables of a program as {table: {(row id, column id): weight}}.'''
+    weights = {}
+    for model, (parent, parent_id, row, column) in _PARENTS.items():
+        weights[model.__tablename__] = {
+            (row_id, column_id): weight for row_id, column_id, weight in db.session.execute(
+                select(row, column, model.weight).join(parent, parent_id == row)
+                .where(parent.program_id == program_id))}
+    return weights
+
+
+def _pack(pairs: dict) -> bytes:
+    array = np.array([(row, column, weight) for (row, column), weight in sorted(pairs.items())],
+                     dtype=np.int64).reshape(-1, 3)
+    return zlib.compress(array.tobytes())
+
+
+def _unpack(data: bytes) -> dict:
+    array = np.frombuffer(zlib.decompress(data), dtype=np.int64).reshape(-1, 3)
+    return {(row, column): weight for row, column, weight in array.tolist()}
+
+
+def _snapshot(program_id: int, change_id: int, weights: Dict[str, dict]):
+    db.session.add(WeightSnapshot(
+        program_id=program_id, change_id=change_id,
+        links=_pack(weights[ModObsRel.__tablename__]),
+        relations=_pack(weights[AttrObjRel.__tablename__])))
+
+
+def _record(table_name: str, changes: list):
+    '''
+    Append changes, (program id, row id, column id, old weight, new weight)
+    tuples, to the log. A program's first change is preceded by a baseline
+    snapshot of its weights as they were, and every HISTORY_SNAPSHOT_INTERVAL
+    changes are followed by a snapshot of the weights as they are now.
+    '''
+    programs = {change[0] for change in changes}
+    last_change = db.session.execute(select(func.max(WeightChange.change_id))).scalar() or 0
+    snapshotted = set(db.session.execute(
+        select(WeightSnapshot.program_id).where(WeightSnapshot.program_id.in_(programs))
+        .distinct()).scalars())
+    for program_id in programs - snapshotted:
+        weights = _program_weights(program_id)
+        pairs = weights[table_name]
+        for program, row_id, column_id, old, _ in changes:
+            if program != program_id:
+                continue
+            if old is None:
+                pairs.pop((row_id, column_id), None)
+            else:
+                pairs[(row_id, column_id)] = old
+        _snapshot(program_id, last_change, weights)
+
+    now = datetime.utcnow()
+    db.session.execute(WeightChange.__table__.insert(), [
+        {'program_id': program_id, 'table_name': table_name, 'row_id': row_id,
+         'column_id': column_id, 'weight': new, 'changed_at': now}
+        for program_id, row_id, column_id, _, new in changes])
+
+    interval = current_app.config.get('HISTORY_SNAPSHOT_INTERVAL', 1000)
+    for program_id in programs:
+        snapshot_change = db.session.execute(
+            select(func.max(WeightSnapshot.change_id))
+            .where(WeightSnapshot.program_id == program_id)).scalar()
+        pending, latest = db.session.execute(
+            select(func.count(), func.max(WeightChange.change_id)).where(
+                WeightChange.program_id == program_id,
+                WeightChange.change_id > snapshot_change)).one()
+        if pending >= interval:
+            _snapshot(program_id, latest, _program_weights(program_id))
+
+
+@contextmanager
+def track_weights(model, *conditions):
+    '''
+    Log the changes made inside the block to the ModObsRel or AttrObjRel
+    pairs matching conditions. The pairs are read before and after the
+    block, so any mix of ORM and bulk statements is captured as long as
+    the conditions select every row they touch. The caller commits.
+    '''
+    before = _pairs(model, conditions)
+    yield
+    after = _pairs(model, conditions)
+
+    changes = []
+    for key, (old, program_id) in before.items():
+        new = after.pop(key, (None, None))[0]
+        if new != old:
+            changes.append((program_id, key[0], key[1], old, new))
+    for key, (new, program_id) in after.items():
+        changes.append((program_id, key[0], key[1], None, new))
+    if changes:
+        _record(model.__tablename__, changes)
+
+
+def weights_as_of(program_id: int, as_of: datetime) -> Optional[Dict[str, dict]]:
+    '''
+    Both weight tables of a program as they were at as_of, as
+    {table: {(row id, column id): weight}}, rebuilt from the nearest
+    snapshot plus at most HISTORY_SNAPSHOT_INTERVAL logged changes.
+    Returns None when nothing changed since as_of, the current tables
+    then apply. Before the first logged change the baseline snapshot is
+    returned; older states are not known.
+    '''
+    changed_since = db.session.execute(select(WeightChange.change_id).where(
+        WeightChange.program_id == program_id, WeightChange.changed_at > as_of).limit(1)).first()
+    if changed_since is None:
+        return None
+
+    last_change = db.session.execute(select(func.max(WeightChange.change_id)).where(
+        WeightChange.program_id == program_id, WeightChange.changed_at <= as_of)).scalar()
+    query = select(WeightSnapshot).where(WeightSnapshot.program_id == program_id)
+    if last_change is None:
+        query = query.order_by(WeightSnapshot.change_id)
+    else:
+        query = query.where(WeightSnapshot.change_id <= last_change) \
+            .order_by(WeightSnapshot.change_id.desc())
+    snapshot = db.session.execute(query.limit(1)).scalar_one()
+    weights = {ModObsRel.__tablename__: _unpack(snapshot.links),
+               AttrObjRel.__tablename__: _unpack(snapshot.relations)}
+    if last_change is None:
+        return weights
+
+    for table_name, row_id, column_id, weight in db.session.execute(
+            select(WeightChange.table_name, WeightChange.row_id, WeightChange.column_id,
+                   WeightChange.weight).where(
+                WeightChange.program_id == program_id,
+                WeightChange.change_id > snapshot.change_id,
+                WeightChange.change_id <= last_change).order_by(WeightChange.change_id)):
+        if weight is None:
+            weights[table_name].pop((row_id, column_id), None)
+        else:
+            weights[table_name][(row_id, column_id)] = weight
+    return weights
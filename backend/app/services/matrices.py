@@ -0,0 +1,150 @@
+import numpy as np
+from datetime import datetime
+from sqlalchemy import select
+from app import db
+from app.models.models import Attribute, Objective, AttrObjRel, Observation, Module, ModObsRel
+from app.services.history import weights_as_of
+
+
+class ProgramMatrices:
+    '''
+    A program's weights as dense NumPy matrices, indexed by the position of
+    each module, observation, attribute and objective in the id-sorted
+    label lists:
+
+    module_observation     modules x observations, ModObsRel weights
+    observation_attribute  observations x attributes, 1 where the observation
+                           belongs to the attribute
+    attribute_objective    attributes x objectives, AttrObjRel weights
+    '''
+    __slots__ = ('program_id', 'modules', 'observations', 'attributes', 'objectives',
+                 'module_observation', 'observation_attribute', 'attribute_objective')
+
+    def __init__(self, program_id, modules, observations, attributes, objectives,
+                 module_observation, observation_attribute, attribute_objective):
+        self.program_id = program_id
+        self.modules = modules
+        self.observations = observations
+        self.attributes = attributes
+        self.objectives = objectives
+        self.module_observation = module_observation
+        self.observation_attribute = observation_attribute
+        self.attribute_objective = attribute_objective
+
+
+def _positions(ids: np.ndarray, values: np.ndarray):
+    '''
+    Positions of values in the sorted ids array, plus a mask of the values
+    that were found (pairs pointing outside the program are dropped).
+    '''
+    if not len(ids):
+        return np.zeros(len(values), dtype=np.intp), np.zeros(len(values), dtype=bool)
+    positions = np.searchsorted(ids, values)
+    positions = np.minimum(positions, len(ids) - 1)
+    return positions, ids[positions] == values
+
+
+def _assemble(shape, row_ids, column_ids, triplets) -> np.ndarray:
+    '''Build a dense matrix from (row id, column id, weight) triplets.'''
+    matrix = np.zeros(shape, dtype=np.float64)
+    if not triplets:
+        return matrix
+    rows, columns, weights = (np.asarray(values) for values in zip(*triplets))
+    row_positions, row_found = _positions(row_ids, rows)
+    column_positions, column_found = _positions(column_ids, columns)
+    found = row_found & column_found
+    np.add.at(matrix, (row_positions[found], column_positions[found]),
+              weights[found].astype(np.float64))
+    return matrix
+
+
+def load_program_matrices(program_id: int, as_of: datetime = None) -> ProgramMatrices:
+    '''
+    Load a program's labels and weights with six Core queries. With as_of
+    the weights are the ones logged at that time (see
+    app.services.history) over the current labels; pairs whose module,
+    observation, attribute or objective no longer exists are dropped.
+    '''
+    execute = db.session.execute
+    modules = [dict(row._mapping) for row in execute(
+        select(Module.module_id, Module.number, Module.name, Module.credit)
+        .where(Module.program_id == program_id).order_by(Module.module_id))]
+    attributes = [dict(row._mapping) for row in execute(
+        select(Attribute.attribute_id, Attribute.name)
+        .where(Attribute.program_id == program_id).order_by(Attribute.attribute_id))]
+    observations = [dict(row._mapping) for row in execute(
+        select(Observation.observation_id, Observation.name, Observation.attribute_id)
+        .join(Attribute, Attribute.attribute_id == Observation.attribute_id)
+        .where(Attribute.program_id == program_id).order_by(Observation.observation_id))]
+    objectives = [dict(row._mapping) for row in execute(
+        select(Objective.objective_id, Objective.name)
+        .where(Objective.program_id == program_id).order_by(Objective.objective_id))]
+    weights = weights_as_of(program_id, as_of) if as_of is not None else None
+    if weights is not None:
+        links = [(row, column, weight) for (row, column), weight
+                 in weights[ModObsRel.__tablename__].items()]
+        relations = [(row, column, weight) for (row, column), weight
+                     in weights[AttrObjRel.__tablename__].items()]
+    else:
+        links = execute(
+            select(ModObsRel.module_id, ModObsRel.observation_id, ModObsRel.weight)
+            .join(Module, Module.module_id == ModObsRel.module_id)
+            .where(Module.program_id == program_id)).all()
+        relations = execute(
+            select(AttrObjRel.attribute_id, AttrObjRel.objective_id, AttrObjRel.weight)
+            .join(Attribute, Attribute.attribute_id == AttrObjRel.attribute_id)
+            .where(Attribute.program_id == program_id)).all()
+
+    module_ids = np.array([row['module_id'] for row in modules], dtype=np.int64)
+    observation_ids = np.array([row['observation_id'] for row in observations], dtype=np.int64)
+    attribute_ids = np.array([row['attribute_id'] for row in attributes], dtype=np.int64)
+    objective_ids = np.array([row['objective_id'] for row in objectives], dtype=np.int64)
+
+    return ProgramMatrices(
+        program_id, modules, observations, attributes, objectives,
+        _assemble((len(modules), len(observations)), module_ids, observation_ids, links),
+        _assemble((len(observations), len(attributes)), observation_ids, attribute_ids,
+                  [(row['observation_id'], row['attribute_id'], 1) for row in observations]),
+        _assemble((len(attributes), len(objectives)), attribute_ids, objective_ids, relations))
+
+
+def normalize_columns(matrix: np.ndarray) -> np.ndarray:
+    '''Scale every column to sum to 1; empty columns stay 0.'''
+    sums = matrix.sum(axis=0)
+    return np.divide(matrix, sums, out=np.zeros_like(matrix), where=sums != 0)
+
+
+def contribution_tables(matrices: ProgramMatrices):
+    '''
+    Share of each module in every observation, attribute and objective,
+    as modules x observations, modules x attributes and modules x
+    objectives arrays.
+
+    module -> observation is the link weight over the observation's total.
+    An attribute is the mean of its observations and an objective the
+    relation-weighted mean of its attributes. An observation column sums
+    to 1 when any module links to it, 0 otherwise; an attribute or
+    objective column sums to the share of its observations (through its
+    attributes) that are covered, so a partly covered target stays below
+    1 and shows the gap.
+    '''
+    module_observation = normalize_columns(matrices.module_observation)
+    module_attribute = module_observation @ normalize_columns(matrices.observation_attribute)
+    module_objective = module_attribute @ normalize_columns(matrices.attribute_objective)
+    return module_observation, module_attribute, module_objective
+
+
+def contribution(matrices: ProgramMatrices, decimals: int = 4) -> dict:
+    '''The contribution tables of a program with their labels, see contribution_tables.'''
+    module_observation, module_attribute, module_objective = contribution_tables(matrices)
+    return {
+        'program_id': matrices.program_id,
+        'modules': [{'module_id': row['module_id'], 'number': row['number'], 'name': row['name']}
+                    for row in matrices.modules],
+        'observations': matrices.observations,
+        'attributes': matrices.attributes,
+        'objectives': matrices.objectives,
+        'module_observation': np.round(module_observation, decimals).tolist(),
+        'module_attribute': np.round(module_attribute, decimals).tolist(),
+        'module_objective': np.round(module_objective, decimals).tolist()
+    }
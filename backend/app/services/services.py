@@ -1,9 +1,21 @@
-import bcrypt
+import csv
 import jwt
+import time
+import uuid
 from datetime import datetime, timedelta
 from flask import current_app
 from app import db
-from app.models.models import User
+from sqlalchemy import bindparam, select
+from app.models.models import (User, RevokedToken, Attribute, Objective,
+                               AttrObjRel, Observation, Module, ModObsRel, Student, Score)
+from app.common.user_cache import user_cache
+from app.common.revocation import revocation_list
+from app.common.token_cache import token_cache
+from app.common.password_hasher import password_hasher, password_error
+from app.common.matrix import MatrixError
+from app.common.upsert import upsert
+from app.common.scores import ScoreFileError
+from app.services.history import track_weights
 
 # Hashing
 
@@ -14,28 +26,77 @@ from app.models.models import User
 #     # hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return password_hasher.hash(password)
 
 
 def check_password(password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return password_hasher.check(password, hashed_password)
 
 # JWT
 
 
-def generate_token(user_id: int, role: str):
+def generate_token(user_id: int, role: str, username: str = None):
     expiration = datetime.utcnow(
     ) + timedelta(seconds=current_app.config['JWT_EXPIRATION'])
+    # iat keeps its fraction so a per-user revocation can tell tokens issued
+    # in the same second apart
+    claims = {'user_id': user_id, 'role': role, 'jti': uuid.uuid4().hex,
+              'iat': time.time(), 'exp': expiration}
+    if username is not None:
+        claims['username'] = username
     return jwt.encode(
-        {'user_id': user_id, 'role': role, 'exp': expiration},
+        claims,
         current_app.config['JWT_SECRET'],
         algorithm=current_app.config['JWT_ALGORITHM']
     )
 
 
-def decode_token(token: str):
+def _verify_token(token: str):
     return jwt.decode(token, current_app.config['JWT_SECRET'], algorithms=[current_app.config['JWT_ALGORITHM']])
 
+
+def decode_token(token: str):
+    return token_cache.get_or_decode(token, _verify_token)
+
+
+def is_token_revoked(claims: dict) -> bool:
+    jti = claims.get('jti')
+    if jti and revocation_list.is_revoked(jti):
+        return True
+    # Tokens without iat predate it and count as issued before any revocation
+    issued_at = datetime.utcfromtimestamp(claims['iat']) if 'iat' in claims else datetime.min
+    return revocation_list.is_revoked(f'user:{claims["user_id"]}', issued_at)
+
+
+def revoke_token(jti: str, user_id: int, expires_at: datetime):
+    now = datetime.utcnow()
+    if expires_at <= now:
+        return
+    # Tokens issued before revoked_at are rejected. Rounded up to a whole
+    # second so the cutoff survives DATETIME columns without fractions.
+    revoked_at = now.replace(microsecond=0) + timedelta(seconds=1 if now.microsecond else 0)
+    revoked = RevokedToken.query.get(jti)
+    if revoked:
+        revoked.expires_at = max(revoked.expires_at, expires_at)
+        revoked.revoked_at = revoked_at
+    else:
+        db.session.add(RevokedToken(
+            jti=jti, user_id=user_id, expires_at=expires_at, revoked_at=revoked_at))
+    # Rows are only needed until the token would have expired anyway
+    RevokedToken.query.filter(RevokedToken.expires_at <= now).delete()
+    db.session.commit()
+    revocation_list.add(jti, expires_at, revoked_at)
+
+
+def revoke_user_tokens(user_id: int):
+    '''
+    Revoke every token issued to a user so far, e.g. when it is deleted.
+    Tokens issued afterwards, also to a new user given the same id, stay valid.
+    '''
+    expires_at = datetime.utcnow(
+    ) + timedelta(seconds=current_app.config['JWT_EXPIRATION'])
+    revoke_token(f'user:{user_id}', user_id, expires_at)
+
 # Authentication
 
 
@@ -47,16 +108,103 @@ def register_user(username: str, password: str, role: str) -> User:
     return new_user
 
 
+def register_users(rows: list, chunk_size: int = 500) -> dict:
+    '''
+    Create many users at once. Rows are validated, their passwords hashed in
+    parallel and each chunk written with a single executemany INSERT.
+    Invalid rows are skipped and reported with their 1-based row number.
+    '''
+    started = time.perf_counter()
+    roles = set(User.__table__.c.role.type.enums)
+    errors = []
+    created = 0
+    seen = set()
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        valid = []
+        for offset, row in enumerate(chunk):
+            number = start + offset + 1
+            if not isinstance(row, dict):
+                errors.append({'row': number, 'message': 'Row must be an object'})
+                continue
+            username = str(row.get('username') or '').strip()
+            password = row.get('password')
+            role = str(row.get('role') or '').strip()
+            if not username or not password or not role:
+                errors.append({'row': number, 'username': username,
+                               'message': 'Username, password, and role are required'})
+            elif not isinstance(password, str):
+                errors.append({'row': number, 'username': username,
+                               'message': 'Password must be a string'})
+            elif password_error(password):
+                errors.append({'row': number, 'username': username,
+                               'message': password_error(password)})
+            elif role not in roles:
+                errors.append({'row': number, 'username': username,
+                               'message': f'Invalid role {role}'})
+            elif username in seen:
+                errors.append({'row': number, 'username': username,
+                               'message': 'Duplicate username in request'})
+            else:
+                seen.add(username)
+                valid.append((number, username, password, role))
+
+        if not valid:
+            continue
+        existing = {username for (username,) in db.session.query(User.username).filter(
+            User.username.in_([username for _, username, _, _ in valid]))}
+        for number, username, _, _ in valid:
+            if username in existing:
+                errors.append({'row': number, 'username': username,
+                               'message': 'Username already exists'})
+        valid = [row for row in valid if row[1] not in existing]
+        if not valid:
+            continue
+
+        hashed = password_hasher.hash_many([password for _, _, password, _ in valid])
+        users = []
+        for (number, username, _, role), hashed_password in zip(valid, hashed):
+            if hashed_password is None:
+                errors.append({'row': number, 'username': username,
+                               'message': 'Password could not be hashed'})
+            else:
+                users.append({'username': username, 'password': hashed_password, 'role': role})
+        if users:
+            db.session.execute(User.__table__.insert(), users)
+            db.session.commit()
+        created += len(users)
+
+    elapsed = time.perf_counter() - started
+    errors.sort(key=lambda error: error['row'])
+    return {
+        'created': created,
+        'failed': len(errors),
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(len(rows) / elapsed, 1) if elapsed else None
+    }
+
+
 def login_user(username: str, password: str):
     user = User.query.filter_by(username=username).first()
     if user and check_password(password, user.password):
-        token = generate_token(user.user_id, user.role)
+        # Upgrade hashes made with an older cost factor while we have the password
+        if password_hasher.needs_rehash(user.password):
+            user.password = hash_password(password)
+            db.session.commit()
+        token = generate_token(user.user_id, user.role, user.username)
         return {'user': user, 'token': token}
     return None
 
 
-def logout_user():
-    return None
+def logout_user(claims: dict):
+    jti = claims.get('jti')
+    if jti is None:
+        return None
+    revoke_token(jti, claims['user_id'],
+                 datetime.utcfromtimestamp(claims['exp']))
+    return jti
 
 
 def update_password(username: str, password: str, new_password: str):
@@ -64,5 +212,194 @@ def update_password(username: str, password: str, new_password: str):
     if user and check_password(password, user.password):
         user.password = hash_password(new_password)
         db.session.commit()
+        user_cache.invalidate(user.user_id)
         return user
     return None
+
+
+def _key_map(rows, label: str, used) -> dict:
+    '''Map natural keys to ids, rejecting keys the matrix uses that are unknown or ambiguous.'''
+    ids, ambiguous = {}, set()
+    for key, id_ in rows:
+        key = '' if key is None else str(key).strip()
+        if key in ids:
+            ambiguous.add(key)
+        ids[key] = id_
+    unknown = sorted(set(used) - set(ids))
+    if unknown:
+        raise MatrixError(f'Unknown {label}: {", ".join(unknown)}.')
+    ambiguous = sorted(ambiguous & set(used))
+    if ambiguous:
+        raise MatrixError(f'Ambiguous {label}, used by more than one row: {", ".join(ambiguous)}.')
+    return ids
+
+
+def replace_matrix(model, row_field: str, column_field: str, row_ids: dict,
+                   column_ids: dict, grid: dict, chunk_size: int = 1000) -> dict:
+    '''
+    Make the weights of model match grid ({row key: {column key: weight}})
+    for every pair whose row and column appear in the grid; pairs outside
+    it are left alone. The current pairs are read in one query, the
+    difference is applied with one bulk INSERT, one executemany UPDATE and
+    chunked DELETEs, and everything is committed in one transaction.
+    '''
+    started = time.perf_counter()
+    table = model.__table__
+    pk = table.primary_key.columns.values()[0]
+    row_column, column_column = table.c[row_field], table.c[column_field]
+
+    columns = {column for cells in grid.values() for column in cells}
+    target = {(row_ids[row], column_ids[column]): weight
+              for row, cells in grid.items() for column, weight in cells.items()
+              if weight is not None}
+    scope = (row_column.in_({row_ids[row] for row in grid}),
+             column_column.in_({column_ids[column] for column in columns}))
+    current = db.session.execute(
+        select(pk, row_column, column_column, table.c.weight).where(*scope)).all()
+
+    updates, deletes, unchanged = [], [], 0
+    for id_, row_id, column_id, weight in current:
+        wanted = target.pop((row_id, column_id), None)
+        if wanted is None:
+            deletes.append(id_)
+        elif wanted != weight:
+            updates.append({'_id': id_, '_weight': wanted})
+        else:
+            unchanged += 1
+    inserts = [{row_field: row_id, column_field: column_id, 'weight': weight}
+               for (row_id, column_id), weight in target.items()]
+
+    with track_weights(model, *scope):
+        if inserts:
+            db.session.execute(table.insert(), inserts)
+        if updates:
+            db.session.execute(table.update().where(pk == bindparam('_id')).values(
+                weight=bindparam('_weight'), updated_at=datetime.utcnow()), updates)
+        for start in range(0, len(deletes), chunk_size):
+            db.session.execute(table.delete().where(pk.in_(deletes[start:start + chunk_size])))
+    db.session.commit()
+
+    return {
+        'inserted': len(inserts),
+        'updated': len(updates),
+        'deleted': len(deletes),
+        'unchanged': unchanged,
+        'elapsed_seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def import_link_matrix(program_id: int, grid: dict) -> dict:
+    '''Replace module x observation weights, keyed by module number and observation name.'''
+    columns = {column for cells in grid.values() for column in cells}
+    modules = _key_map(db.session.execute(
+        select(Module.number, Module.module_id).where(Module.program_id == program_id)),
+        'module numbers', grid)
+    observations = _key_map(db.session.execute(
+        select(Observation.name, Observation.observation_id).join(
+            Attribute, Attribute.attribute_id == Observation.attribute_id).where(
+            Attribute.program_id == program_id)),
+        'observations', columns)
+    return replace_matrix(ModObsRel, 'module_id', 'observation_id', modules, observations, grid)
+
+
+def import_relation_matrix(program_id: int, grid: dict) -> dict:
+    '''Replace attribute x objective weights, keyed by attribute and objective name.'''
+    columns = {column for cells in grid.values() for column in cells}
+    attributes = _key_map(db.session.execute(
+        select(Attribute.name, Attribute.attribute_id).where(Attribute.program_id == program_id)),
+        'attributes', grid)
+    objectives = _key_map(db.session.execute(
+        select(Objective.name, Objective.objective_id).where(Objective.program_id == program_id)),
+        'objectives', columns)
+    return replace_matrix(AttrObjRel, 'attribute_id', 'objective_id', attributes, objectives, grid)
+
+
+SCORE_COLUMNS = ('student', 'module', 'score')
+
+
+def _score_chunk(program_id: int, chunk: list, modules: dict, profile: tuple):
+    # Students first, so the scores of new students can be keyed by id. A
+    # student's rows are merged field by field, the last non-blank cell wins.
+    profiles = {}
+    for number, fields, _, _ in chunk:
+        merged = profiles.setdefault(number, dict({'program_id': program_id, 'number': number},
+                                                  **dict.fromkeys(profile)))
+        merged.update((column, value) for column, value in fields.items() if value is not None)
+    upsert(Student, profiles.values(), ('program_id', 'number'), update=profile,
+           keep_null=profile)  # a blank name or cohort cell keeps the stored one
+    numbers = list(profiles)
+    students = dict(db.session.execute(
+        select(Student.number, Student.student_id).where(
+            Student.program_id == program_id, Student.number.in_(numbers))).all())
+    upsert(Score, [
+        {'student_id': students[number], 'module_id': modules[module], 'score': score}
+        for number, _, module, score in chunk], ('student_id', 'module_id'), update=('score',))
+    db.session.commit()
+
+
+def import_scores(program_id: int, lines, chunk_size: int = 5000) -> dict:
+    '''
+    Load module scores from CSV text lines with the columns student,
+    module (the module number) and score, plus optional name and cohort.
+    The file is read as a stream and every chunk of rows is written with
+    two upserts, so existing scores are overwritten and the file can be
+    loaded again. Invalid rows are skipped and reported with their line.
+    '''
+    started = time.perf_counter()
+    reader = csv.DictReader(lines)
+    try:
+        header = [(column or '').strip() for column in reader.fieldnames or ()]
+    except (UnicodeDecodeError, csv.Error):
+        raise ScoreFileError('The file is not a readable UTF-8 CSV.')
+    missing = [column for column in SCORE_COLUMNS if column not in header]
+    if missing:
+        raise ScoreFileError(f'Missing CSV columns: {", ".join(missing)}.')
+    reader.fieldnames = header
+    profile = tuple(column for column in ('name', 'cohort') if column in header)
+    modules = {str(number).strip(): module_id for number, module_id in db.session.execute(
+        select(Module.number, Module.module_id).where(Module.program_id == program_id))
+        if number is not None}
+
+    errors, chunk, students = [], [], set()
+    rows = imported = 0
+    try:
+        for row in reader:
+            rows += 1
+            line = reader.line_num
+            number = (row.get('student') or '').strip()
+            module = (row.get('module') or '').strip()
+            try:
+                score = float(row.get('score'))
+            except (TypeError, ValueError):
+                score = None
+            if not number:
+                errors.append({'line': line, 'message': 'Student number is required'})
+            elif module not in modules:
+                errors.append({'line': line, 'student': number, 'message': f'Unknown module {module}'})
+            elif score is None or not 0 <= score <= 100:
+                errors.append({'line': line, 'student': number,
+                               'message': 'Score must be a number from 0 to 100'})
+            else:
+                students.add(number)
+                chunk.append((number, {column: (row.get(column) or '').strip() or None
+                                       for column in profile}, module, score))
+            if len(chunk) >= chunk_size:
+                _score_chunk(program_id, chunk, modules, profile)
+                imported += len(chunk)
+                chunk = []
+        if chunk:
+            _score_chunk(program_id, chunk, modules, profile)
+            imported += len(chunk)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ScoreFileError(f'Line {reader.line_num + 1} is not readable CSV ({e}); '
+                             f'the {imported} rows before it were imported.')
+
+    elapsed = time.perf_counter() - started
+    return {
+        'imported': imported,
+        'students': len(students),
+        'failed': len(errors),
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed else None
+    }
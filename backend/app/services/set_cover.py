@@ -0,0 +1,141 @@
+import math
+import time
+from typing import List, Sequence
+from app.services.matrices import ProgramMatrices
+from app.services.coverage import bitsets, bit_positions
+
+
+COSTS = ('count', 'credit')
+
+
+def _union(sets: Sequence[int], chosen) -> int:
+    covered = 0
+    for i in chosen:
+        covered |= sets[i]
+    return covered
+
+
+def greedy_cover(sets: Sequence[int], costs: Sequence[float], universe: int) -> List[int]:
+    '''
+    Repeatedly take the set with the lowest cost per newly covered element,
+    then drop any chosen set the others already cover, dearest first.
+    '''
+    chosen, uncovered = [], universe
+    while uncovered:
+        best, best_key = None, None
+        for i, mask in enumerate(sets):
+            gain = (mask & uncovered).bit_count()
+            if gain:
+                key = (costs[i] / gain, -gain, i)
+                if best_key is None or key < best_key:
+                    best, best_key = i, key
+        chosen.append(best)
+        uncovered &= ~sets[best]
+    for i in sorted(chosen, key=lambda i: -costs[i]):
+        rest = [j for j in chosen if j != i]
+        if _union(sets, rest) & universe == universe:
+            chosen = rest
+    return sorted(chosen)
+
+
+def _undominated(sets: Sequence[int], costs: Sequence[float]) -> List[int]:
+    # A set is useless if another covers all its elements for no more cost
+    order = sorted((i for i, mask in enumerate(sets) if mask),
+                   key=lambda i: (-sets[i].bit_count(), costs[i], i))
+    kept = []
+    for i in order:
+        if not any(sets[i] & ~sets[j] == 0 and costs[j] <= costs[i] for j in kept):
+            kept.append(i)
+    return kept
+
+
+def exact_cover(sets: Sequence[int], costs: Sequence[float], universe: int,
+                incumbent: List[int], time_limit: float = 0.2):
+    '''
+    Branch and bound for the cheapest cover, starting from an incumbent
+    solution. Branches on the uncovered element with the fewest candidate
+    sets and prunes on the larger of two lower bounds: the dearest
+    cheapest way to cover any single element, and the uncovered count
+    times the best cost per element. Gives up after time_limit seconds
+    with the best cover found so far.
+
+    Returns (cover, proven optimal, nodes visited).
+    '''
+    candidates = _undominated(sets, costs)
+    covering = {}
+    for element in bit_positions(universe):
+        covering[element] = sorted((i for i in candidates if sets[i] >> element & 1),
+                                   key=lambda i: (costs[i], -sets[i].bit_count()))
+    cheapest = {element: costs[options[0]] for element, options in covering.items()}
+    unit = all(cost == 1 for cost in costs)
+    best = {'cost': sum(costs[i] for i in incumbent), 'cover': list(incumbent)}
+    deadline = time.perf_counter() + time_limit
+    nodes, timed_out = 0, False
+
+    def bound(uncovered: int, elements: List[int]) -> float:
+        single = max(cheapest[element] for element in elements)
+        ratio = min(costs[i] / gain for i in candidates
+                    if (gain := (sets[i] & uncovered).bit_count()))
+        spread = len(elements) * ratio
+        return max(single, math.ceil(spread - 1e-9) if unit else spread)
+
+    def search(uncovered: int, chosen: List[int], cost: float):
+        nonlocal nodes, timed_out
+        if timed_out or (nodes & 255 == 0 and time.perf_counter() > deadline):
+            timed_out = True
+            return
+        nodes += 1
+        if not uncovered:
+            if cost < best['cost'] - 1e-9:
+                best['cost'], best['cover'] = cost, list(chosen)
+            return
+        elements = bit_positions(uncovered)
+        if cost + bound(uncovered, elements) >= best['cost'] - 1e-9:
+            return
+        element = min(elements, key=lambda element: len(covering[element]))
+        for i in covering[element]:
+            chosen.append(i)
+            search(uncovered & ~sets[i], chosen, cost + costs[i])
+            chosen.pop()
+
+    search(universe, [], 0.0)
+    return sorted(best['cover']), not timed_out, nodes
+
+
+def minimal_modules(matrices: ProgramMatrices, cost: str = 'count', min_weight: float = 1,
+                    time_limit: float = 0.2) -> dict:
+    '''
+    The smallest set of modules, or the one with the fewest credits, in
+    which every observation has a link of at least min_weight. Returns the
+    greedy solution and the branch and bound one, which is marked optimal
+    unless the time limit ran out first. With the credit cost, modules without
+    a credit count as 1. Observations no module links to strongly enough
+    cannot be covered and are listed apart.
+    '''
+    sets = bitsets(matrices.module_observation >= min_weight)
+    if cost == 'credit':
+        costs = [float(row['credit']) if row['credit'] is not None else 1.0
+                 for row in matrices.modules]
+    else:
+        costs = [1.0] * len(sets)
+    universe = _union(sets, range(len(sets)))
+    everything = (1 << len(matrices.observations)) - 1
+
+    greedy = greedy_cover(sets, costs, universe)
+    exact, optimal, nodes = exact_cover(sets, costs, universe, greedy, time_limit)
+
+    def solution(cover: List[int]) -> dict:
+        return {
+            'modules': [matrices.modules[i] for i in cover],
+            'count': len(cover),
+            'credit': sum(float(matrices.modules[i]['credit'] or 0) for i in cover)
+        }
+
+    return {
+        'program_id': matrices.program_id,
+        'cost': cost,
+        'min_weight': min_weight,
+        'greedy': solution(greedy),
+        'exact': dict(solution(exact), optimal=optimal, nodes=nodes),
+        'uncoverable_observations': [matrices.observations[o] for o in bit_positions(everything & ~universe)]
+    }
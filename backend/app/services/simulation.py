@@ -0,0 +1,186 @@
+import numpy as np
+from typing import Dict
+from app.common.program_cache import program_cache, program_version
+from app.services.matrices import ProgramMatrices, load_program_matrices, contribution_tables
+from app.services.attainment import (ATTAINMENT_TABLES, LEVELS, attainment, cohort_means,
+                                     load_scores, _group, _rounded)
+
+
+CONTRIBUTION_TABLES = ('module_observation', 'module_attribute', 'module_objective')
+
+
+class SimulationError(ValueError):
+    '''Raised when a what-if scenario names unknown rows or invalid weights.'''
+    pass
+
+
+class SimulationBase:
+    '''
+    The live state of a program that scenarios are applied to: its weight
+    matrices, score matrix and the baseline results, computed once per
+    data version so a scenario only pays for its own recomputation.
+    '''
+    __slots__ = ('matrices', 'scores', 'cohorts', 'contribution', 'attainment',
+                 'module_index', 'observation_index', 'attribute_index', 'objective_index')
+
+    def __init__(self, matrices: ProgramMatrices, scores: np.ndarray, cohorts: np.ndarray):
+        self.matrices = matrices
+        self.scores = scores
+        self.cohorts = cohorts
+        self.contribution = contribution_tables(matrices)
+        self.attainment = cohort_means(attainment(
+            scores, matrices.module_observation, matrices.observation_attribute,
+            matrices.attribute_objective), cohorts)
+        self.module_index = {row['module_id']: i for i, row in enumerate(matrices.modules)}
+        self.observation_index = {row['observation_id']: i for i, row in enumerate(matrices.observations)}
+        self.attribute_index = {row['attribute_id']: i for i, row in enumerate(matrices.attributes)}
+        self.objective_index = {row['objective_id']: i for i, row in enumerate(matrices.objectives)}
+
+
+def _load_base(program_id: int) -> SimulationBase:
+    matrices = load_program_matrices(program_id)
+    _, scores, cohorts = load_scores(program_id, matrices.modules)
+    return SimulationBase(matrices, scores, cohorts)
+
+
+def simulation_base(program_id: int) -> SimulationBase:
+    return program_cache.get_or_compute(
+        ('simulation', program_id), program_version(ATTAINMENT_TABLES),
+        lambda: _load_base(program_id))
+
+
+def _list(scenario: dict, name: str) -> list:
+    value = scenario.get(name) or []
+    if not isinstance(value, list):
+        raise SimulationError(f'{name} must be a list.')
+    return value
+
+
+def _position(index: dict, value, label: str) -> int:
+    position = index.get(value) if isinstance(value, int) else None
+    if position is None:
+        raise SimulationError(f'Unknown {label} {value!r}.')
+    return position
+
+
+def _weight(item: dict) -> float:
+    weight = item.get('weight')
+    if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0:
+        raise SimulationError('Weights must be numbers of at least 0, 0 removes the pair.')
+    return float(weight)
+
+
+def _pairs(items: list, name: str, row_index: dict, row_field: str,
+           column_index: dict, column_field: str):
+    for item in items:
+        if not isinstance(item, dict):
+            raise SimulationError(f'Every item of {name} must be an object.')
+        yield (_position(row_index, item.get(row_field), row_field),
+               _position(column_index, item.get(column_field), column_field),
+               _weight(item))
+
+
+def _covered(tables) -> tuple:
+    return tuple(table.sum(axis=0) > 0 for table in tables)
+
+
+def _coverage_change(labels, keys, before, after) -> Dict[str, list]:
+    return {name: [row[key] for row, was, now in zip(rows, before_level, after_level) if was and not now]
+            for name, rows, key, before_level, after_level in zip(LEVELS, labels, keys, before, after)}
+
+
+def _delta(means, base_means) -> Dict[str, list]:
+    # Null where either side has no attainment
+    return {level: _rounded(mean - base_mean, 2)
+            for level, mean, base_mean in zip(LEVELS, means, base_means)}
+
+
+def simulate(program_id: int, scenario: dict) -> dict:
+    '''
+    Apply a what-if scenario to an in-memory copy of the program and
+    return the recomputed contribution and attainment next to their
+    change from the live data. Nothing is written to the database.
+
+    The scenario may hold:
+    links          [{module_id, observation_id, weight}], 0 removes a link
+    relations      [{attribute_id, objective_id, weight}], 0 removes a relation
+    remove_modules [module_id], the modules stop supporting anything
+    add_modules    [{name, links: [{observation_id, weight}]}], modules without scores
+    '''
+    if not isinstance(scenario, dict):
+        raise SimulationError('The scenario must be an object.')
+    base = simulation_base(program_id)
+    matrices = base.matrices
+    added = _list(scenario, 'add_modules')
+    for module in added:
+        if not isinstance(module, dict) or not isinstance(module.get('name'), str):
+            raise SimulationError('Every added module needs a name.')
+        if not isinstance(module.get('links') or [], list):
+            raise SimulationError('The links of an added module must be a list.')
+    removed = [_position(base.module_index, module_id, 'module_id')
+               for module_id in _list(scenario, 'remove_modules')]
+
+    # Added modules become extra rows, removed ones keep their row with no
+    # weights, so every table lines up with the baseline
+    live = len(matrices.modules)
+    module_observation = np.vstack([
+        matrices.module_observation, np.zeros((len(added), len(matrices.observations)))])
+    attribute_objective = matrices.attribute_objective.copy()
+    for row, column, weight in _pairs(_list(scenario, 'links'), 'links', base.module_index,
+                                      'module_id', base.observation_index, 'observation_id'):
+        module_observation[row, column] = weight
+    for offset, module in enumerate(added):
+        for item in module.get('links') or []:
+            if not isinstance(item, dict):
+                raise SimulationError('Every link of an added module must be an object.')
+            column = _position(base.observation_index, item.get('observation_id'), 'observation_id')
+            module_observation[live + offset, column] = _weight(item)
+    module_observation[removed] = 0
+    for row, column, weight in _pairs(_list(scenario, 'relations'), 'relations', base.attribute_index,
+                                      'attribute_id', base.objective_index, 'objective_id'):
+        attribute_objective[row, column] = weight
+
+    scenario_matrices = ProgramMatrices(
+        program_id, matrices.modules, matrices.observations, matrices.attributes,
+        matrices.objectives, module_observation, matrices.observation_attribute, attribute_objective)
+    contribution = contribution_tables(scenario_matrices)
+    baseline = tuple(np.vstack([table, np.zeros((len(added), table.shape[1]))])
+                     for table in base.contribution)
+    scores = np.hstack([base.scores, np.full((len(base.scores), len(added)), np.nan)])
+    overall, cohorts = cohort_means(attainment(scores, module_observation, matrices.observation_attribute,
+                                               attribute_objective), base.cohorts)
+    base_overall, base_cohorts = base.attainment
+
+    labels = (matrices.observations, matrices.attributes, matrices.objectives)
+    keys = ('observation_id', 'attribute_id', 'objective_id')
+    before, after = _covered(baseline), _covered(contribution)
+    removed_ids = {matrices.modules[i]['module_id'] for i in removed}
+    return {
+        'program_id': program_id,
+        'modules': [
+            {'module_id': row['module_id'], 'number': row['number'], 'name': row['name'],
+             'added': False, 'removed': row['module_id'] in removed_ids} for row in matrices.modules
+        ] + [{'module_id': None, 'number': None, 'name': module['name'], 'added': True, 'removed': False}
+             for module in added],
+        'observations': matrices.observations,
+        'attributes': matrices.attributes,
+        'objectives': matrices.objectives,
+        'contribution': {
+            name: np.round(table, 4).tolist() for name, table in zip(CONTRIBUTION_TABLES, contribution)},
+        'contribution_delta': {
+            name: np.round(table - base_table, 4).tolist()
+            for name, table, base_table in zip(CONTRIBUTION_TABLES, contribution, baseline)},
+        'coverage': {
+            'lost': _coverage_change(labels, keys, before, after),
+            'gained': _coverage_change(labels, keys, after, before)
+        },
+        'attainment': {
+            'overall': _group(*overall, 2),
+            'cohorts': {label: _group(count, means, 2) for label, (count, means) in cohorts.items()}
+        },
+        'attainment_delta': {
+            'overall': _delta(overall[1], base_overall[1]),
+            'cohorts': {label: _delta(means, base_cohorts[label][1])
+                        for label, (_, means) in cohorts.items()}
+        }
+    }
@@ -0,0 +1,71 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from app import db
+from app.models.models import Program, Attribute, Objective, AttrObjRel, Observation, Module, ModObsRel
+from app.common.serializers import serializers
+from app.services.history import weights_as_of
+
+
+def _by_id(objs, key: str) -> list:
+    # selectinload does not guarantee any order
+    return sorted(objs, key=lambda obj: getattr(obj, key))
+
+
+def _pairs_as_of(pairs: dict, row_field: str, column_field: str, rows: set, columns: set) -> list:
+    return [{row_field: row, column_field: column, 'weight': weight}
+            for (row, column), weight in sorted(pairs.items())
+            if row in rows and column in columns]
+
+
+def load_program_tree(program_id: int, as_of: datetime = None) -> Optional[dict]:
+    '''
+    The whole hierarchy of a program as one document: objectives, graduate
+    attributes with their observations, modules and both weight tables.
+    Loaded with seven queries whatever the size of the program, or None if
+    the program does not exist.
+
+    With as_of the links and relations are the ones logged at that time
+    (see app.services.history), keyed by ids only, over the current
+    entities.
+    '''
+    program = db.session.execute(
+        select(Program).where(Program.program_id == program_id).options(
+            selectinload(Program.objectives),
+            selectinload(Program.attributes).selectinload(Attribute.observations),
+            selectinload(Program.attributes).selectinload(Attribute.relations),
+            selectinload(Program.modules).selectinload(Module.links))
+    ).scalar_one_or_none()
+    if program is None:
+        return None
+
+    attributes = _by_id(program.attributes, 'attribute_id')
+    modules = _by_id(program.modules, 'module_id')
+    tree = {
+        'program': serializers[Program](program),
+        'objectives': serializers[Objective].many(_by_id(program.objectives, 'objective_id')),
+        'attributes': [
+            dict(serializers[Attribute](attribute), observations=serializers[Observation].many(
+                _by_id(attribute.observations, 'observation_id')))
+            for attribute in attributes],
+        'modules': serializers[Module].many(modules),
+        'links': serializers[ModObsRel].many(
+            _by_id([link for module in modules for link in module.links], 'mod_obs_id')),
+        'relations': serializers[AttrObjRel].many(
+            _by_id([relation for attribute in attributes for relation in attribute.relations],
+                   'attr_obj_id'))
+    }
+
+    weights = weights_as_of(program_id, as_of) if as_of is not None else None
+    if weights is not None:
+        observations = {observation.observation_id
+                        for attribute in attributes for observation in attribute.observations}
+        tree['links'] = _pairs_as_of(
+            weights[ModObsRel.__tablename__], 'module_id', 'observation_id',
+            {module.module_id for module in modules}, observations)
+        tree['relations'] = _pairs_as_of(
+            weights[AttrObjRel.__tablename__], 'attribute_id', 'objective_id',
+            {attribute.attribute_id for attribute in attributes},
+            {objective.objective_id for objective in program.objectives})
+    return tree
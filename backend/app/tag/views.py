@@ -2,6 +2,9 @@ from flask import Blueprint, request, jsonify
 from app import db
 from app.models.models import Tag
 from app.common.decorators import token_required, role_required
+from app.common.versioning import versioned
+from app.common.pagination import paginate, PAGINATION_PARAMETERS
+from app.common.serializers import serializers
 from flasgger import swag_from
 from datetime import datetime
 
@@ -91,17 +94,13 @@ def create_tag(current_user):
     db.session.add(new_tag)
     db.session.commit()
 
-    return jsonify({
-        'tag_id': new_tag.tag_id,
-        'name': new_tag.name,
-        'user_id': new_tag.user_id,
-        'created_at': new_tag.created_at
-    }), 201
+    return jsonify(serializers[Tag](new_tag)), 201
 
 
 @tag_bp.route('/tags/<int:tag_id>', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('tag')
 @swag_from({
     'tags': ['Tag'],
     'description': 'Retrieve a specific tag by its ID.',
@@ -169,12 +168,7 @@ def get_tag(current_user, tag_id: int):
     if not tag:
         return jsonify({'message': 'Tag not found.'}), 404
 
-    return jsonify({
-        'tag_id': tag.tag_id,
-        'name': tag.name,
-        'user_id': tag.user_id,
-        'created_at': tag.created_at
-    }), 200
+    return jsonify(serializers[Tag](tag)), 200
 
 
 @tag_bp.route('/tags/<int:tag_id>', methods=['PUT'])
@@ -269,12 +263,7 @@ def update_tag(current_user, tag_id: int):
     tag.name = data.get('name', tag.name)
     db.session.commit()
 
-    return jsonify({
-        'tag_id': tag.tag_id,
-        'name': tag.name,
-        'user_id': tag.user_id,
-        'created_at': tag.created_at
-    }), 200
+    return jsonify(serializers[Tag](tag)), 200
 
 
 @tag_bp.route('/tags/<int:tag_id>', methods=['DELETE'])
@@ -339,6 +328,7 @@ def delete_tag(current_user, tag_id: int):
 @tag_bp.route('/tags', methods=['GET'])
 @token_required
 @role_required('staff')
+@versioned('tag')
 @swag_from({
     'tags': ['Tag'],
     'description': 'Retrieve a list of tags, with optional search filters.',
@@ -369,7 +359,7 @@ def delete_tag(current_user, tag_id: int):
             'format': 'date-time',
             'description': 'Filter tags created after a specific timestamp (YYYY-MM-DDTHH:MM:SS format)',
         }
-    ],
+    ] + PAGINATION_PARAMETERS,
     'responses': {
         '200': {
             'description': 'A list of tags',
@@ -409,7 +399,8 @@ def delete_tag(current_user, tag_id: int):
     }
 })
 def list_tags(current_user):
-    query = Tag.query
+    serializer = serializers[Tag]
+    query = serializer.select()
     name = request.args.get('name')
     user_id = request.args.get('user_id')
     created_before = request.args.get('created_before')
@@ -434,11 +425,7 @@ def list_tags(current_user):
         except ValueError:
             return jsonify({'message': 'Invalid created_after datetime format. Use YYYY-MM-DDTHH:MM:SS.'}), 400
 
-    tags = query.all()
+    tags, next_cursor = paginate(
+        query, {'name': Tag.name, 'created_at': Tag.created_at})
 
-    return jsonify(tags=[{
-        'tag_id': tag.tag_id,
-        'name': tag.name,
-        'user_id': tag.user_id,
-        'created_at': tag.created_at.isoformat()
-    } for tag in tags]), 200
+    return jsonify(tags=serializer.rows(tags), next_cursor=next_cursor), 200
@@ -12,3 +12,16 @@ def send_notification(user_id, message):
         notification = Notification(message=message, user_id=user_id)
         db.session.add(notification)
         db.session.commit()
+
+
+@celery.task(name='app.tasks.remove_files')
+def remove_files(paths):
+    '''Remove uploaded files whose rows were deleted, paths relative to UPLOAD_FOLDER.'''
+    from . import create_app
+    app = create_app()
+
+    with app.app_context():
+        from .common.local_storage import LocalFileManager
+
+        file_manager = LocalFileManager(app.config['UPLOAD_FOLDER'])
+        return sum(file_manager.delete(path) for path in paths)
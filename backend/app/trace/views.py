@@ -0,0 +1,163 @@
+from flask import Blueprint, request, jsonify
+from app.models.models import Program
+from flasgger import swag_from
+from app.common.decorators import token_required, role_required
+from app.common.versioning import versioned
+from app.common.program_cache import PROGRAM_TABLES
+from app.services.graph import program_graph
+
+trace_bp = Blueprint('trace', __name__, url_prefix='/programs')
+
+
+PROGRAM_ID_PARAMETER = {
+    'name': 'program_id',
+    'in': 'path',
+    'type': 'integer',
+    'required': True,
+    'description': 'The ID of the program'
+}
+
+
+@trace_bp.route('/<int:program_id>/trace/objectives/<int:objective_id>/modules', methods=['GET'])
+@token_required
+@role_required('staff')
+@versioned(*PROGRAM_TABLES)
+@swag_from({
+    'tags': ['Traceability'],
+    'description': 'Modules that ultimately support an objective through any observation and graduate attribute.',
+    'parameters': [
+        PROGRAM_ID_PARAMETER,
+        {
+            'name': 'objective_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The ID of the objective'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Supporting modules',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'objective': {'type': 'object'},
+                    'modules': {'type': 'array', 'items': {'type': 'object'}}
+                }
+            }
+        },
+        404: {
+            'description': 'Program or objective not found'
+        }
+    }
+})
+def trace_objective_modules(current_user, program_id: int, objective_id: int):
+    if not Program.query.get(program_id):
+        return jsonify(message='Program not found'), 404
+    graph = program_graph(program_id)
+    objective = graph.objective_index.get(objective_id)
+    if objective is None:
+        return jsonify(message='Objective not found in this program'), 404
+    return jsonify(objective=graph.objectives[objective],
+                   modules=graph.modules_supporting(objective)), 200
+
+
+@trace_bp.route('/<int:program_id>/trace/modules/<int:module_id>/objectives', methods=['GET'])
+@token_required
+@role_required('staff')
+@versioned(*PROGRAM_TABLES)
+@swag_from({
+    'tags': ['Traceability'],
+    'description': 'Objectives a module ultimately supports through its observations and graduate attributes.',
+    'parameters': [
+        PROGRAM_ID_PARAMETER,
+        {
+            'name': 'module_id',
+            'in': 'path',
+            'type': 'integer',
+            'required': True,
+            'description': 'The ID of the module'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Supported objectives',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'module': {'type': 'object'},
+                    'objectives': {'type': 'array', 'items': {'type': 'object'}}
+                }
+            }
+        },
+        404: {
+            'description': 'Program or module not found'
+        }
+    }
+})
+def trace_module_objectives(current_user, program_id: int, module_id: int):
+    if not Program.query.get(program_id):
+        return jsonify(message='Program not found'), 404
+    graph = program_graph(program_id)
+    module = graph.module_index.get(module_id)
+    if module is None:
+        return jsonify(message='Module not found in this program'), 404
+    return jsonify(module=graph.modules[module],
+                   objectives=graph.objectives_supported_by(module)), 200
+
+
+@trace_bp.route('/<int:program_id>/trace/impact', methods=['GET'])
+@token_required
+@role_required('staff')
+@versioned(*PROGRAM_TABLES)
+@swag_from({
+    'tags': ['Traceability'],
+    'description': 'What loses all coverage if the given modules are dropped: observations no other '
+                   'module supports, graduate attributes left without a covered observation and '
+                   'objectives left without a covered attribute.',
+    'parameters': [
+        PROGRAM_ID_PARAMETER,
+        {
+            'name': 'modules',
+            'in': 'query',
+            'type': 'string',
+            'required': True,
+            'description': 'Comma separated IDs of the modules to drop'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Targets that would lose coverage',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'modules': {'type': 'array', 'items': {'type': 'object'}},
+                    'observations': {'type': 'array', 'items': {'type': 'object'}},
+                    'attributes': {'type': 'array', 'items': {'type': 'object'}},
+                    'objectives': {'type': 'array', 'items': {'type': 'object'}}
+                }
+            }
+        },
+        400: {
+            'description': 'Missing or invalid module IDs'
+        },
+        404: {
+            'description': 'Program not found'
+        }
+    }
+})
+def trace_impact(current_user, program_id: int):
+    if not Program.query.get(program_id):
+        return jsonify(message='Program not found'), 404
+    try:
+        module_ids = [int(value) for value in request.args.get('modules', '').split(',') if value.strip()]
+    except ValueError:
+        return jsonify(message='modules must be a comma separated list of module IDs'), 400
+    if not module_ids:
+        return jsonify(message='modules is required'), 400
+
+    graph = program_graph(program_id)
+    unknown = [module_id for module_id in module_ids if module_id not in graph.module_index]
+    if unknown:
+        return jsonify(message=f'Modules not in this program: {", ".join(map(str, unknown))}'), 400
+    return jsonify(graph.impact(graph.module_index[module_id] for module_id in module_ids)), 200
@@ -1,9 +1,15 @@
-from flask import Blueprint, request, jsonify
+import csv
+import io
+from flask import Blueprint, request, jsonify, current_app
 from app import db
 from app.models.models import User
-from app.services.services import register_user
+from app.services.services import register_user, register_users, revoke_user_tokens
 from flasgger import swag_from
 from app.common.decorators import token_required, role_required
+from app.common.pagination import paginate, PAGINATION_PARAMETERS
+from app.common.serializers import serializers
+from app.common.user_cache import user_cache
+from app.common.token_cache import token_cache
 
 user_bp = Blueprint('user', __name__)
 
@@ -75,10 +81,103 @@ def create_user(current_user):
     if username and password and role:
         user = register_user(username, password, role)
         if user:
-            return jsonify(user=user.serialize()), 201
+            return jsonify(user=serializers[User](user)), 201
         return jsonify(message='Required fields are missing'), 400
 
 
+@user_bp.route('/users/bulk', methods=['POST'])
+@token_required
+@role_required('admin')
+@swag_from({
+    'tags': ['User'],
+    'description': 'Create many users at once from a JSON array or a CSV file with the columns username, password and role. '
+                   'Invalid rows are skipped and reported; the others are created.',
+    'consumes': ['application/json', 'multipart/form-data', 'text/csv'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': False,
+            'schema': {
+                'type': 'array',
+                'items': {
+                    'type': 'object',
+                    'properties': {
+                        'username': {'type': 'string'},
+                        'password': {'type': 'string'},
+                        'role': {'type': 'string'}
+                    }
+                }
+            },
+            'description': 'Users to create, as a JSON array'
+        },
+        {
+            'name': 'file',
+            'in': 'formData',
+            'type': 'file',
+            'required': False,
+            'description': 'Users to create, as a CSV file with a header row'
+        }
+    ],
+    'responses': {
+        '201': {
+            'description': 'Import report',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'created': {'type': 'integer'},
+                    'failed': {'type': 'integer'},
+                    'errors': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'row': {'type': 'integer'},
+                                'username': {'type': 'string'},
+                                'message': {'type': 'string'}
+                            }
+                        }
+                    },
+                    'elapsed_seconds': {'type': 'number'},
+                    'rows_per_second': {'type': 'number'}
+                }
+            }
+        },
+        '400': {
+            'description': 'No users were supplied or the payload could not be parsed',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'message': {
+                        'type': 'string',
+                        'example': 'No users supplied'
+                    }
+                }
+            }
+        }
+    }
+})
+def create_users_bulk(current_user):
+    try:
+        if 'file' in request.files:
+            text = request.files['file'].read().decode('utf-8-sig')
+            rows = list(csv.DictReader(io.StringIO(text)))
+        elif request.mimetype == 'text/csv':
+            rows = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+        else:
+            data = request.get_json(silent=True)
+            rows = data.get('users') if isinstance(data, dict) else data
+    except (UnicodeDecodeError, csv.Error):
+        return jsonify(message='The file is not a readable UTF-8 CSV'), 400
+
+    if not isinstance(rows, list) or not rows:
+        return jsonify(message='No users supplied'), 400
+
+    report = register_users(
+        rows, chunk_size=current_app.config.get('BULK_USER_CHUNK_SIZE', 500))
+    return jsonify(report), 201
+
+
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 @token_required
 @role_required('admin')
@@ -126,7 +225,7 @@ def create_user(current_user):
 def get_user(current_user, user_id: int):
     user = User.query.get(user_id)
     if user:
-        return jsonify(user=user.serialize()), 200
+        return jsonify(user=serializers[User](user)), 200
     return jsonify(message='User not found'), 404
 
 
@@ -195,7 +294,8 @@ def update_user(current_user, user_id: int):
         user.username = data.get('username', user.username)
         user.role = data.get('role', user.role)
         db.session.commit()
-        return jsonify(user=user.serialize()), 200
+        user_cache.invalidate(user_id)
+        return jsonify(user=serializers[User](user)), 200
     return jsonify(message='User not found'), 404
 
 
@@ -246,6 +346,8 @@ def delete_user(current_user, user_id: int):
     if user:
         db.session.delete(user)
         db.session.commit()
+        user_cache.invalidate(user_id)
+        revoke_user_tokens(user_id)
         return jsonify(message='User deleted'), 200
     return jsonify(message='User not found'), 404
 
@@ -256,6 +358,7 @@ def delete_user(current_user, user_id: int):
 @swag_from({
     'tags': ['User'],
     'description': 'List all users',
+    'parameters': PAGINATION_PARAMETERS,
     'responses': {
         '200': {
             'description': 'List of users',
@@ -288,5 +391,46 @@ def delete_user(current_user, user_id: int):
     }
 })
 def list_users(current_user):
-    users = User.query.all()
-    return jsonify(users=[user.serialize() for user in users]), 200
+    serializer = serializers[User]
+    users, next_cursor = paginate(serializer.select(), {'username': User.username})
+    return jsonify(users=serializer.rows(users), next_cursor=next_cursor), 200
+
+
+@user_bp.route('/users/cache-stats', methods=['GET'])
+@token_required
+@role_required('admin')
+@swag_from({
+    'tags': ['User'],
+    'description': 'Hit/miss counters of the per-process user and token caches',
+    'responses': {
+        '200': {
+            'description': 'Cache statistics of the worker that served the request',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'users': {
+                        'type': 'object',
+                        'properties': {
+                            'hits': {'type': 'integer'},
+                            'misses': {'type': 'integer'},
+                            'size': {'type': 'integer'},
+                            'maxsize': {'type': 'integer'},
+                            'ttl': {'type': 'number'}
+                        }
+                    },
+                    'tokens': {
+                        'type': 'object',
+                        'properties': {
+                            'hits': {'type': 'integer'},
+                            'misses': {'type': 'integer'},
+                            'size': {'type': 'integer'},
+                            'maxsize': {'type': 'integer'}
+                        }
+                    }
+                }
+            }
+        }
+    }
+})
+def get_user_cache_stats(current_user):
+    return jsonify(users=user_cache.stats(), tokens=token_cache.stats()), 200
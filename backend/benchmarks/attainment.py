@@ -0,0 +1,122 @@
+'''
+Student score import and attainment: loads a students x modules score
+CSV into one program, then computes attainment for that program alone
+and for several programs, one after the other versus on the process pool.
+
+Usage (from the backend directory):
+    python benchmarks/attainment.py [students] [modules] [programs]
+'''
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models.models import (Program, Attribute, Objective, AttrObjRel, Observation,  # noqa: E402
+                               Module, ModObsRel, Student, Score)
+from app.common.process_pool import process_pool  # noqa: E402
+from app.services.services import import_scores  # noqa: E402
+from app.services.attainment import (program_attainment, programs_attainment,  # noqa: E402
+                                     _attainment_task, _load_task)
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+def insert(model, rows):
+    result = db.session.execute(model.__table__.insert().returning(
+        model.__table__.primary_key.columns.values()[0]), rows)
+    return [row[0] for row in result]
+
+
+def populate(modules: int, rng) -> int:
+    program_id = insert(Program, [{'name': 'Bench'}])[0]
+    attributes = insert(Attribute, [{'name': f'A{i}', 'program_id': program_id} for i in range(12)])
+    objectives = insert(Objective, [{'name': f'G{i}', 'program_id': program_id} for i in range(6)])
+    observations = insert(Observation, [
+        {'name': f'O{i}', 'attribute_id': attributes[i % len(attributes)]} for i in range(48)])
+    module_ids = insert(Module, [
+        {'name': f'M{i}', 'number': str(i), 'program_id': program_id} for i in range(modules)])
+    db.session.execute(ModObsRel.__table__.insert(), [
+        {'module_id': m, 'observation_id': o, 'weight': int(rng.integers(1, 4))}
+        for m in module_ids for o in observations if rng.random() < 0.15])
+    db.session.execute(AttrObjRel.__table__.insert(), [
+        {'attribute_id': a, 'objective_id': g, 'weight': int(rng.integers(1, 4))}
+        for a in attributes for g in objectives if rng.random() < 0.5])
+    db.session.commit()
+    return program_id
+
+
+def score_csv(students: int, modules: int, rng) -> str:
+    scores = rng.integers(0, 101, size=(students, modules))
+    lines = ['student,module,score,cohort']
+    lines.extend(f's{s},{m},{scores[s, m]},{2020 + s % 4}'
+                 for s in range(students) for m in range(modules))
+    return '\n'.join(lines) + '\n'
+
+
+def copy_scores(source: int, target: int):
+    students = db.session.execute(
+        db.select(Student.number, Student.cohort).where(Student.program_id == source)).all()
+    ids = insert(Student, [{'number': number, 'cohort': cohort, 'program_id': target}
+                           for number, cohort in students])
+    modules = dict(db.session.execute(db.select(Module.number, Module.module_id).where(
+        Module.program_id == target)).all())
+    by_number = dict(zip((number for number, _ in students), ids))
+    db.session.execute(Score.__table__.insert(), [
+        {'student_id': by_number[number], 'module_id': modules[module_number], 'score': score}
+        for number, module_number, score in db.session.execute(
+            db.select(Student.number, Module.number, Score.score)
+            .join(Student, Student.student_id == Score.student_id)
+            .join(Module, Module.module_id == Score.module_id)
+            .where(Student.program_id == source))])
+    db.session.commit()
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    modules = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    programs = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    rng = np.random.default_rng(0)
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        program_ids = [populate(modules, rng) for _ in range(programs)]
+        report, elapsed = timed(import_scores, program_ids[0],
+                                io.StringIO(score_csv(students, modules, rng)))
+        print(f'import {report["imported"]} scores: {elapsed:.2f}s '
+              f'({report["rows_per_second"]:.0f} rows/s)')
+        for program_id in program_ids[1:]:
+            copy_scores(program_ids[0], program_id)
+
+        loaded, elapsed = timed(_load_task, program_ids[0], True, 2)
+        print(f'load {students} x {modules} scores: {elapsed:.2f}s')
+        _, elapsed = timed(_attainment_task, loaded[2])
+        print(f'compute one program, per student: {elapsed:.2f}s')
+        _, elapsed = timed(program_attainment, program_ids[0])
+        print(f'program_attainment (load + compute): {elapsed:.2f}s')
+
+        tasks = [_load_task(program_id, False, 2)[2] for program_id in program_ids]
+        _, elapsed = timed(lambda: [_attainment_task(task) for task in tasks])
+        print(f'compute {programs} programs in process: {elapsed:.2f}s')
+        process_pool.map(_attainment_task, tasks)  # start the workers
+        _, elapsed = timed(process_pool.map, _attainment_task, tasks)
+        print(f'compute {programs} programs on {process_pool.workers} pool workers: {elapsed:.2f}s')
+        _, elapsed = timed(programs_attainment, program_ids)
+        print(f'programs_attainment (load + pool): {elapsed:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+'''
+Per-request authentication overhead of token_required, with and without the
+verified-token and user caches.
+
+Usage (from the backend directory):
+    python benchmarks/auth_overhead.py [iterations]
+'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models.models import User  # noqa: E402
+from app.common.decorators import token_required  # noqa: E402
+from app.services.services import generate_token  # noqa: E402
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    JWT_SECRET = 'benchmark-secret-benchmark-secret'
+
+
+@token_required
+def endpoint(current_user):
+    return current_user.user_id
+
+
+def run(token_cache_size: int, user_cache_size: int, iterations: int) -> float:
+    class Cfg(BenchConfig):
+        TOKEN_CACHE_SIZE = token_cache_size
+        USER_CACHE_SIZE = user_cache_size
+
+    app = create_app(Cfg)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', password='x', role='admin')
+        db.session.add(user)
+        db.session.commit()
+        token = generate_token(user.user_id, user.role, user.username)
+        headers = {'Authorization': f'Bearer {token}'}
+
+        with app.test_request_context(headers=headers):
+            endpoint()  # warm up
+            start = time.perf_counter()
+            for _ in range(iterations):
+                endpoint()
+            elapsed = time.perf_counter() - start
+    return elapsed / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    cases = [
+        ('no caches (decode + SELECT)', 0, 0),
+        ('user cache only', 0, 1024),
+        ('token + user cache', 4096, 1024),
+    ]
+    print(f'{"case":32} {"us/request":>12}')
+    for label, token_size, user_size in cases:
+        print(f'{label:32} {run(token_size, user_size, iterations):12.1f}')
+
+
+if __name__ == '__main__':
+    main()
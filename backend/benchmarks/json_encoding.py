@@ -0,0 +1,75 @@
+'''
+Encoding cost of the list_modules payload with Flask's default JSON provider
+and with app.common.json_provider (stdlib fallback and orjson).
+
+Usage (from the backend directory):
+    python benchmarks/json_encoding.py [rows]
+'''
+import os
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from app.common import json_provider  # noqa: E402
+from app.common.json_provider import JSONProvider  # noqa: E402
+
+
+def module_rows(count: int):
+    return [{
+        'module_id': i,
+        'name': f'高等数学A（上）{i}',
+        'name_en': 'Advanced Mathematics A (I)',
+        'nature': '通识教育课程',
+        'category': '必修',
+        'number': f'{801001 + i:07d}',
+        'credit': Decimal('5.0000000000'),
+        'lec_hours': 80,
+        'lab_hours': 0,
+        'oncampus_prac': 0,
+        'offcampus_prac': 0,
+        'term': '一',
+        'offered_by': '',
+        'program_id': 1,
+    } for i in range(count)]
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rows = module_rows(count)
+    app = Flask(__name__)
+    app.debug = False
+
+    providers = [('flask default (stdlib)', DefaultJSONProvider(app))]
+    fast = JSONProvider(app)
+    fallback = JSONProvider(app)
+    fallback.fast = False
+    providers.append(('JSONProvider stdlib fallback', fallback))
+    if json_provider.orjson is not None:
+        providers.append(('JSONProvider orjson', fast))
+    else:
+        print('orjson is not installed, skipping the fast encoder')
+
+    print(f'{count} list_modules rows')
+    print(f'{"provider":32} {"ms":>10} {"bytes":>12}')
+    with app.app_context():
+        for label, provider in providers:
+            size = len(provider.response(modules=rows).get_data())
+            elapsed = best_of(lambda: provider.response(modules=rows).get_data())
+            print(f'{label:32} {elapsed:10.1f} {size:12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+'''
+Read path of the link list: ORM instances versus Core row tuples, on one
+program with 100k ModObsRel rows. Reports rows/s and the peak memory
+allocated while loading and serializing every row.
+
+Usage (from the backend directory):
+    python benchmarks/list_read_path.py [rows]
+'''
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models.models import Program, Attribute, Observation, Module, ModObsRel  # noqa: E402
+from app.common.pagination import fetch_all  # noqa: E402
+from app.common.serializers import serializers  # noqa: E402
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+def populate(count: int):
+    program = Program(name='Bench')
+    db.session.add(program)
+    db.session.flush()
+    attribute = Attribute(name='Attribute', program_id=program.program_id)
+    db.session.add(attribute)
+    db.session.flush()
+    observations = 100
+    modules = count // observations
+    db.session.execute(Observation.__table__.insert(), [
+        {'name': f'Observation {i}', 'attribute_id': attribute.attribute_id}
+        for i in range(observations)])
+    db.session.execute(Module.__table__.insert(), [
+        {'name': f'Module {i}', 'program_id': program.program_id, 'credit': 2}
+        for i in range(modules)])
+    db.session.execute(ModObsRel.__table__.insert(), [
+        {'module_id': m + 1, 'observation_id': o + 1, 'weight': (m + o) % 4}
+        for m in range(modules) for o in range(observations)])
+    db.session.commit()
+    return program.program_id
+
+
+def orm_objects(program_id):
+    serializer = serializers[ModObsRel]
+    links = ModObsRel.query.join(Module, Module.module_id == ModObsRel.module_id).filter(
+        Module.program_id == program_id).all()
+    return serializer.many(links)
+
+
+def core_rows(program_id):
+    serializer = serializers[ModObsRel]
+    query = serializer.select().join(Module, Module.module_id == ModObsRel.module_id).filter(
+        Module.program_id == program_id)
+    return serializer.rows(fetch_all(query))
+
+
+def measure(fn, program_id):
+    # Timed and traced in separate runs, tracemalloc slows allocation down
+    db.session.expunge_all()
+    start = time.perf_counter()
+    rows = len(fn(program_id))
+    elapsed = time.perf_counter() - start
+    db.session.expunge_all()
+    tracemalloc.start()
+    fn(program_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.expunge_all()
+    return rows, elapsed, peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        program_id = populate(count)
+        print(f'{count} ModObsRel rows')
+        print(f'{"path":28} {"rows/s":>12} {"peak MiB":>10}')
+        for label, fn in [('Model.query.all() objects', orm_objects),
+                          ('Core select row tuples', core_rows)]:
+            measure(fn, program_id)  # warm up
+            rows, elapsed, peak = measure(fn, program_id)
+            print(f'{label:28} {rows / elapsed:12.0f} {peak / 2 ** 20:10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""add weight history
+
+Revision ID: 4d8cc5e33c90
+Revises: 5c6e4b1b35a5
+Create Date: 2026-10-17 06:55:53.019244
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d8cc5e33c90'
+down_revision = '5c6e4b1b35a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('weight_change',
+    sa.Column('change_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('program_id', sa.Integer(), nullable=False),
+    sa.Column('table_name', sa.String(length=16), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('column_id', sa.Integer(), nullable=False),
+    sa.Column('weight', sa.Integer(), nullable=True),
+    sa.Column('changed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['program_id'], ['program.program_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('change_id')
+    )
+    with op.batch_alter_table('weight_change', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_weight_change_changed_at'), ['changed_at'], unique=False)
+        batch_op.create_index('ix_weight_change_program', ['program_id', 'change_id'], unique=False)
+
+    op.create_table('weight_snapshot',
+    sa.Column('snapshot_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('program_id', sa.Integer(), nullable=False),
+    sa.Column('change_id', sa.Integer(), nullable=False),
+    sa.Column('links', sa.LargeBinary(), nullable=False),
+    sa.Column('relations', sa.LargeBinary(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['program_id'], ['program.program_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('snapshot_id')
+    )
+    with op.batch_alter_table('weight_snapshot', schema=None) as batch_op:
+        batch_op.create_index('ix_weight_snapshot_program', ['program_id', 'change_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('weight_snapshot', schema=None) as batch_op:
+        batch_op.drop_index('ix_weight_snapshot_program')
+
+    op.drop_table('weight_snapshot')
+    with op.batch_alter_table('weight_change', schema=None) as batch_op:
+        batch_op.drop_index('ix_weight_change_program')
+        batch_op.drop_index(batch_op.f('ix_weight_change_changed_at'))
+
+    op.drop_table('weight_change')
@@ -0,0 +1,64 @@
+"""cascade deletes from program subtrees
+
+Revision ID: 5c6e4b1b35a5
+Revises: cdfdd39f6ea8
+Create Date: 2026-10-17 06:55:33.474467
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c6e4b1b35a5'
+down_revision = 'cdfdd39f6ea8'
+branch_labels = None
+depends_on = None
+
+# Table -> (column, referred table, referred column) of the foreign keys
+# that delete the row together with its parent
+CASCADES = {
+    'objective': [('program_id', 'program', 'program_id')],
+    'attribute': [('program_id', 'program', 'program_id')],
+    'attrobjrel': [('attribute_id', 'attribute', 'attribute_id'),
+                   ('objective_id', 'objective', 'objective_id')],
+    'observation': [('attribute_id', 'attribute', 'attribute_id')],
+    'module': [('program_id', 'program', 'program_id')],
+    'modobsrel': [('module_id', 'module', 'module_id'),
+                  ('observation_id', 'observation', 'observation_id')],
+    'student': [('program_id', 'program', 'program_id')],
+    'score': [('student_id', 'student', 'student_id'),
+              ('module_id', 'module', 'module_id')],
+    'material': [('module_id', 'module', 'module_id')],
+    'comment': [('material_id', 'material', 'material_id')]
+}
+
+# Names the unnamed foreign keys SQLite reflects, so batch mode can drop them
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _replace_foreign_keys(ondelete):
+    '''
+    Recreate the foreign keys in CASCADES with ondelete. They were created
+    unnamed, so the names the database gave them are looked up first;
+    SQLite reports none and falls back to NAMING_CONVENTION.
+    '''
+    inspector = sa.inspect(op.get_bind())
+    for table, foreign_keys in CASCADES.items():
+        names = {tuple(fk['constrained_columns']): fk['name']
+                 for fk in inspector.get_foreign_keys(table)}
+        with op.batch_alter_table(table, schema=None,
+                                  naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred, referred_column in foreign_keys:
+                name = f'fk_{table}_{column}_{referred}'
+                batch_op.drop_constraint(names.get((column,)) or name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], [referred_column],
+                                            ondelete=ondelete)
+
+
+def upgrade():
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    _replace_foreign_keys(None)
@@ -0,0 +1,44 @@
+"""deduplicate weight pairs and make them unique
+
+Revision ID: 70c8c7d5ec3f
+Revises: d3efc2ebf0a2
+Create Date: 2026-10-17 06:54:41.889812
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '70c8c7d5ec3f'
+down_revision = 'd3efc2ebf0a2'
+branch_labels = None
+depends_on = None
+
+# Weight table -> (primary key, pair columns)
+PAIRS = {
+    'attrobjrel': ('attr_obj_id', ('attribute_id', 'objective_id')),
+    'modobsrel': ('mod_obs_id', ('module_id', 'observation_id'))
+}
+
+
+def _constraint(table, columns):
+    return f'uq_{table}_{"_".join(columns)}'
+
+
+def upgrade():
+    for table, (key, columns) in PAIRS.items():
+        # Keep the most recently inserted row of every duplicated pair. The
+        # derived table lets MySQL delete from the table the subquery reads.
+        op.execute(sa.text(
+            f'DELETE FROM {table} WHERE {key} NOT IN ('
+            f'SELECT kept FROM (SELECT MAX({key}) AS kept FROM {table} '
+            f'GROUP BY {", ".join(columns)}) AS newest)'))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_unique_constraint(_constraint(table, columns), list(columns))
+
+
+def downgrade():
+    for table, (_, columns) in PAIRS.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(_constraint(table, columns), type_='unique')
@@ -0,0 +1,57 @@
+"""add student and score
+
+Revision ID: cdfdd39f6ea8
+Revises: 70c8c7d5ec3f
+Create Date: 2026-10-17 06:55:10.627216
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cdfdd39f6ea8'
+down_revision = '70c8c7d5ec3f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('student',
+    sa.Column('student_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('number', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('cohort', sa.String(), nullable=True),
+    sa.Column('program_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['program_id'], ['program.program_id'], ),
+    sa.PrimaryKeyConstraint('student_id'),
+    sa.UniqueConstraint('program_id', 'number', name='uq_student_program_id_number')
+    )
+    with op.batch_alter_table('student', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_student_cohort'), ['cohort'], unique=False)
+
+    op.create_table('score',
+    sa.Column('score_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('module_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['module_id'], ['module.module_id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['student.student_id'], ),
+    sa.PrimaryKeyConstraint('score_id'),
+    sa.UniqueConstraint('student_id', 'module_id', name='uq_score_student_id_module_id')
+    )
+    with op.batch_alter_table('score', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_score_module_id'), ['module_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('score', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_score_module_id'))
+
+    op.drop_table('score')
+    with op.batch_alter_table('student', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_student_cohort'))
+
+    op.drop_table('student')
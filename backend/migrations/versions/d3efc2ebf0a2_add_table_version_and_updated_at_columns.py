@@ -0,0 +1,40 @@
+"""add table_version and updated_at columns
+
+Revision ID: d3efc2ebf0a2
+Revises: d344cd395c06
+Create Date: 2026-10-17 06:54:29.787000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3efc2ebf0a2'
+down_revision = 'd344cd395c06'
+branch_labels = None
+depends_on = None
+
+# Tables whose rows carry their own last write time
+UPDATED_AT_TABLES = ('program', 'objective', 'attribute', 'attrobjrel', 'observation',
+                     'module', 'modobsrel', 'tag')
+
+
+def upgrade():
+    op.create_table('table_version',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    for table in UPDATED_AT_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    for table in reversed(UPDATED_AT_TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
+
+    op.drop_table('table_version')
@@ -0,0 +1,154 @@
+"""initial schema
+
+Revision ID: d74a03ff544a
+Revises:
+Create Date: 2026-10-17 06:52:53.061946
+
+Databases created with db.create_all() before migrations were tracked
+already have these tables: run "flask db stamp d74a03ff544a" on them
+once, then "flask db upgrade".
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd74a03ff544a'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('password', sa.String(), nullable=False),
+    sa.Column('role', sa.Enum('admin', 'staff', 'auditor', 'guest'), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('program',
+    sa.Column('program_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('version', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('program_id')
+    )
+    op.create_table('objective',
+    sa.Column('objective_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('program_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['program_id'], ['program.program_id'], ),
+    sa.PrimaryKeyConstraint('objective_id')
+    )
+    op.create_table('attribute',
+    sa.Column('attribute_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('program_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['program_id'], ['program.program_id'], ),
+    sa.PrimaryKeyConstraint('attribute_id')
+    )
+    op.create_table('attrobjrel',
+    sa.Column('attr_obj_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('attribute_id', sa.Integer(), nullable=False),
+    sa.Column('objective_id', sa.Integer(), nullable=False),
+    sa.Column('weight', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['attribute_id'], ['attribute.attribute_id'], ),
+    sa.ForeignKeyConstraint(['objective_id'], ['objective.objective_id'], ),
+    sa.PrimaryKeyConstraint('attr_obj_id')
+    )
+    op.create_table('observation',
+    sa.Column('observation_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('attribute_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['attribute_id'], ['attribute.attribute_id'], ),
+    sa.PrimaryKeyConstraint('observation_id')
+    )
+    op.create_table('module',
+    sa.Column('module_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('name_en', sa.String(), nullable=True),
+    sa.Column('nature', sa.String(), nullable=True),
+    sa.Column('category', sa.String(), nullable=True),
+    sa.Column('number', sa.String(), nullable=True),
+    sa.Column('credit', sa.Numeric(), nullable=True),
+    sa.Column('lec_hours', sa.Integer(), nullable=True),
+    sa.Column('lab_hours', sa.Integer(), nullable=True),
+    sa.Column('oncampus_prac', sa.Integer(), nullable=True),
+    sa.Column('offcampus_prac', sa.Integer(), nullable=True),
+    sa.Column('term', sa.String(), nullable=True),
+    sa.Column('offered_by', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('program_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['program_id'], ['program.program_id'], ),
+    sa.PrimaryKeyConstraint('module_id')
+    )
+    op.create_table('modobsrel',
+    sa.Column('mod_obs_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('module_id', sa.Integer(), nullable=False),
+    sa.Column('observation_id', sa.Integer(), nullable=False),
+    sa.Column('weight', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['module_id'], ['module.module_id'], ),
+    sa.ForeignKeyConstraint(['observation_id'], ['observation.observation_id'], ),
+    sa.PrimaryKeyConstraint('mod_obs_id')
+    )
+    op.create_table('tag',
+    sa.Column('tag_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.user_id'], ),
+    sa.PrimaryKeyConstraint('tag_id')
+    )
+    op.create_table('material',
+    sa.Column('material_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('file_path', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('module_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['module_id'], ['module.module_id'], ),
+    sa.ForeignKeyConstraint(['tag_id'], ['tag.tag_id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.user_id'], ),
+    sa.PrimaryKeyConstraint('material_id')
+    )
+    op.create_table('comment',
+    sa.Column('comment_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('text', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('material_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['material_id'], ['material.material_id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.user_id'], ),
+    sa.PrimaryKeyConstraint('comment_id')
+    )
+    op.create_table('notification',
+    sa.Column('notification_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.user_id'], ),
+    sa.PrimaryKeyConstraint('notification_id')
+    )
+
+
+def downgrade():
+    op.drop_table('notification')
+    op.drop_table('comment')
+    op.drop_table('material')
+    op.drop_table('tag')
+    op.drop_table('modobsrel')
+    op.drop_table('module')
+    op.drop_table('observation')
+    op.drop_table('attrobjrel')
+    op.drop_table('attribute')
+    op.drop_table('objective')
+    op.drop_table('program')
+    op.drop_table('user')
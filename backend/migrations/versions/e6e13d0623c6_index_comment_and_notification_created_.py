@@ -0,0 +1,33 @@
+"""index comment and notification created_at
+
+Revision ID: e6e13d0623c6
+Revises: d74a03ff544a
+Create Date: 2026-10-17 06:53:36.695146
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6e13d0623c6'
+down_revision = 'd74a03ff544a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset pagination orders the comment and notification lists by created_at
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_comment_created_at'), ['created_at'], unique=False)
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_notification_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notification_created_at'))
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_comment_created_at'))
@@ -0,0 +1,52 @@
+import pytest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models.models import Module, Program, Score, Student
+from app.services.services import import_scores
+
+
+@pytest.fixture
+def app(tmp_path):
+    class Config(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "scores.db"}'
+
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def program_id(app):
+    program = Program(name='Software Engineering')
+    db.session.add(program)
+    db.session.flush()
+    db.session.add_all([Module(name='Algorithms', number='M1', program_id=program.program_id),
+                        Module(name='Databases', number='M2', program_id=program.program_id)])
+    db.session.commit()
+    return program.program_id
+
+
+def test_blank_cells_of_a_new_student_keep_earlier_rows(program_id):
+    report = import_scores(program_id, [
+        'student,module,score,name,cohort',
+        'S1,M1,80,Alice,2023',
+        'S1,M2,70,,',
+    ])
+
+    assert report['imported'] == 2
+    student = Student.query.filter_by(program_id=program_id, number='S1').one()
+    assert (student.name, student.cohort) == ('Alice', '2023')
+    assert Score.query.filter_by(student_id=student.student_id).count() == 2
+
+
+def test_later_cells_of_a_student_overwrite_earlier_rows(program_id):
+    import_scores(program_id, [
+        'student,module,score,name,cohort',
+        'S1,M1,80,,2023',
+        'S1,M2,70,Alice,2024',
+    ])
+
+    student = Student.query.filter_by(program_id=program_id, number='S1').one()
+    assert (student.name, student.cohort) == ('Alice', '2024')